@@ -253,7 +253,9 @@ except ImportError as e:
 # Router Agent import - Following router_agent_implementation_plan.md
 try:
     from health_advisor.router.agent import router_agent
+    from data.json_store import user_scope
     from health_advisor.router.schema import RouterDecision
+    from health_advisor.router.fast_path import FastPathRouter, record_router_decision
     
     # --- THE NEW, STATEFUL MASTER ORCHESTRATOR ---
     class MasterAgent:
@@ -262,6 +264,8 @@ try:
         
         def __init__(self):
             self.session_storage = {}  # Simple in-memory session storage for MVP
+            # Local classifier for unambiguous messages; the router agent handles the rest
+            self.fast_path = FastPathRouter()
             # Initialize onboarding wrapper once to maintain session state
             try:
                 from profile_and_onboarding.onboarding_workflow import ProfileOnboardingWrapper
@@ -360,12 +364,27 @@ try:
                     meta={"error": True}
                 )
         
-        def run(self, prompt: str, files: Optional[List[str]] = None) -> ChatResult:
+        def run(self, prompt: str, files: Optional[List[str]] = None,
+                user_id: Optional[str] = None) -> ChatResult:
+            """
+            Route a message for one user.
+            
+            Args:
+                prompt: User's message
+                files: Optional file attachments
+                user_id: User whose health data partition is read and written;
+                    None uses the shared single-user data directory
+            """
+            # Every storage call made while handling this message, including
+            # those from specialist agents and tools, goes to the user's data
+            with user_scope(user_id):
+                return self._run(prompt, files, user_id)
+        
+        def _run(self, prompt: str, files: Optional[List[str]], user_id: Optional[str]) -> ChatResult:
             print(f"\n--- MasterAgent: Routing user prompt: '{prompt}' ---")
             
-            # In a real app, session_id would be managed per user conversation.
-            # We use a fixed one here for simplicity.
-            session_id = "user_main_session"
+            # One conversation per user; the single-user app keeps its fixed session
+            session_id = user_id or "user_main_session"
             session_state = self._get_session_state(session_id)
             
             # 1. HANDLE CONTROL MESSAGES & PENDING ACTIONS (SHORT-CIRCUIT)
@@ -426,34 +445,51 @@ try:
                     )
             
             # 3. GET ROUTING DECISION (STATE-AWARE)
-            try:
-                router_response = router_agent.run(prompt)
+            # Unambiguous messages are classified locally. While a profile
+            # change awaits confirmation, a reply may refer to it, so the
+            # router agent (which sees the conversation) decides instead.
+            fast_match = None
+            if not session_state.get("pending_profile_change") and not session_state.get("pending_action"):
+                fast_match = self.fast_path.route(prompt)
+            route_source = fast_match.source if fast_match else "router_agent"
+            
+            if fast_match:
+                decision = fast_match.decision
+            else:
+                try:
+                    router_response = router_agent.run(prompt)
                 
-                # Handle both structured and text responses
-                if hasattr(router_response, 'content') and isinstance(router_response.content, RouterDecision):
-                    decision = router_response.content
-                elif hasattr(router_response, 'content'):
-                    # Fallback if structured output fails
-                    print("Warning: Router returned non-structured response. Defaulting to logger.")
+                    # Handle both structured and text responses
+                    if hasattr(router_response, 'content') and isinstance(router_response.content, RouterDecision):
+                        decision = router_response.content
+                    elif hasattr(router_response, 'content'):
+                        # Fallback if structured output fails
+                        print("Warning: Router returned non-structured response. Defaulting to logger.")
+                        decision = RouterDecision(
+                            primary_intent="log",
+                            secondary_intent=None,
+                            confidence=0.5,
+                            rationale="Router failed to return structured output"
+                        )
+                    else:
+                        raise Exception("Invalid router response format")
+                    
+                except Exception as e:
+                    print(f"Warning: Router agent failed: {e}. Defaulting to logger.")
                     decision = RouterDecision(
                         primary_intent="log",
                         secondary_intent=None,
-                        confidence=0.5,
-                        rationale="Router failed to return structured output"
+                        confidence=0.3,
+                        rationale="Router agent error - defaulting to health logging"
                     )
-                else:
-                    raise Exception("Invalid router response format")
-                    
-            except Exception as e:
-                print(f"Warning: Router agent failed: {e}. Defaulting to logger.")
-                decision = RouterDecision(
-                    primary_intent="log",
-                    secondary_intent=None,
-                    confidence=0.3,
-                    rationale="Router agent error - defaulting to health logging"
-                )
+                
+                # Confident decisions become training examples for the fast path
+                try:
+                    record_router_decision(prompt, decision, model=router_agent.model.id)
+                except Exception as e:
+                    print(f"Warning: could not record routing decision: {e}")
             
-            print(f"Router Decision: Primary='{decision.primary_intent}', Secondary='{decision.secondary_intent}', Confidence={decision.confidence:.2f}")
+            print(f"Router Decision ({route_source}, fast-path hit rate {self.fast_path.stats.hit_rate:.0%}): Primary='{decision.primary_intent}', Secondary='{decision.secondary_intent}', Confidence={decision.confidence:.2f}")
             print(f"Rationale: {decision.rationale}")
             
             # 3. APPLY CONFIDENCE THRESHOLDS & HEURISTICS
@@ -503,7 +539,7 @@ try:
             else:  # Default to logger (including "log" and "clarify_response")
                 print("--> Routing to Logger Workflow")
                 if health_logger_v3:
-                    primary_result = health_logger_v3.run(prompt, files)
+                    primary_result = health_logger_v3.run(prompt, files, user_id=user_id)
                 else:
                     primary_result = ChatResult(text="❌ Health Logger not available", meta={"error": "agent_unavailable"})
             
@@ -525,6 +561,7 @@ try:
                             "primary_agent": final_intent,
                             "secondary_agent": decision.secondary_intent,
                             "router_confidence": decision.confidence,
+                            "route_source": route_source,
                             "chained_response": True
                         }
                     )
@@ -542,6 +579,7 @@ try:
                             "primary_agent": final_intent,
                             "secondary_agent": decision.secondary_intent,
                             "router_confidence": decision.confidence,
+                            "route_source": route_source,
                             "chained_response": True
                         }
                     )
@@ -554,6 +592,8 @@ try:
                     "routed_by": "MasterAgent",
                     "final_intent": final_intent,
                     "router_confidence": decision.confidence,
+                    "route_source": route_source,
+                    "fast_path_hit_rate": self.fast_path.stats.hit_rate,
                     "had_secondary_intent": decision.secondary_intent is not None
                 })
             
@@ -9,7 +9,9 @@ from dotenv import load_dotenv
 import gradio as gr
 import pandas as pd
 import plotly.express as px
-from data.daily_history import load_history, compile_day
+from data.daily_history import get_history_columns, compile_day
+from data.json_store import partition_users, sweep_expired_episodes, user_scope
+from core.policies import EPISODE_SWEEP_INTERVAL_MINUTES
 
 try:
     from apscheduler.schedulers.background import BackgroundScheduler
@@ -41,15 +43,28 @@ else:
     print("Warning: OPENAI_API_KEY not set or OpenAI not installed. Audio transcription will be disabled.")
 
 # --- Daily history scheduler ---
+def run_in_every_partition(job, description: str):
+    """Run a storage job once per data partition (shared data and each user)."""
+    def run():
+        for user_id in partition_users():
+            try:
+                with user_scope(user_id):
+                    job()
+            except Exception as e:
+                print(f"Warning: could not {description} for {user_id or 'shared data'}: {e}")
+    return run
+
+compile_all_days = run_in_every_partition(compile_day, "compile today's history")
+sweep_all_expired_episodes = run_in_every_partition(sweep_expired_episodes, "close expired episodes")
+
 if BackgroundScheduler:
     scheduler = BackgroundScheduler()
-    scheduler.add_job(compile_day, "cron", hour=23, minute=59)
+    scheduler.add_job(compile_all_days, "cron", hour=23, minute=59)
+    # Auto-close episodes that exceeded MAX_EPISODE_DURATION_HOURS
+    scheduler.add_job(sweep_all_expired_episodes, "interval", minutes=EPISODE_SWEEP_INTERVAL_MINUTES)
     scheduler.start()
     # Ensure today's history exists
-    try:
-        compile_day()
-    except Exception as e:
-        print(f"Warning: could not compile today's history: {e}")
+    compile_all_days()
 else:
     print("Warning: APScheduler not installed; daily history compilation disabled.")
 
@@ -375,11 +390,11 @@ def create_calendar_view(df):
 def load_daily_history_ui():
     """Load and display daily health history data."""
     try:
-        records = [r.__dict__ for r in load_history()]
-        print(f"Loading daily history: {len(records)} records found")
+        columns = get_history_columns()
+        print(f"Loading daily history: {len(columns)} records found")
         
-        if records:
-            df = pd.DataFrame(records)
+        if len(columns):
+            df = pd.DataFrame(columns.to_columns())
             df['date'] = pd.to_datetime(df['date'])
             
             # Create a calendar-style visualization
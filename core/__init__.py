@@ -4,5 +4,6 @@ Core module for shared, app-wide primitives.
 This module contains:
 - ontology: Condition families, normalization rules
 - timeutils: Timezone handling, date parsing
+- day_buckets: Local-day bucketing of epoch timestamps
 - policies: App-wide constants
 """
\ No newline at end of file
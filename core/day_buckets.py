@@ -0,0 +1,221 @@
+"""
+Timezone-aware day bucketing for epoch timestamps.
+
+Daily history, rollups and recall ranges all need "which local day does
+this instant fall on" for many timestamps at once.  Calling
+``datetime.fromtimestamp(ts, zone)`` per record resolves the zone's rules
+every time; a ``DayBucketer`` instead keeps a table of the zone's UTC
+offset changes (DST and rule changes) and turns an epoch into a local day
+ordinal with one binary search and one division.  Batches go through
+NumPy when it is installed.
+
+Day ordinals are ``date.toordinal()`` values, the same representation as
+``data.daily_history.HistoryColumns``.
+"""
+
+from __future__ import annotations
+
+import bisect
+import functools
+import threading
+from datetime import date, datetime, time, timezone, tzinfo
+from typing import Dict, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
+from core.timeutils import get_timezone, iso_to_epoch
+
+SECONDS_PER_DAY = 86400
+UNIX_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+# Below this many timestamps a Python loop is as fast as NumPy
+NUMPY_MIN_EPOCHS = 256
+
+# Offsets are probed once per this many seconds when building the table;
+# zones never change offset twice within it
+_PROBE_SECONDS = SECONDS_PER_DAY
+
+
+def _year_start(year: int) -> float:
+    return datetime(year, 1, 1, tzinfo=timezone.utc).timestamp()
+
+
+def _epoch_year(ts: float) -> int:
+    return date.fromordinal(int(ts // SECONDS_PER_DAY) + UNIX_EPOCH_ORDINAL).year
+
+
+class DayBucketer:
+    """
+    Local-day ordinals of epoch timestamps in one timezone.
+
+    The offset table covers whole UTC years and grows on demand when a
+    timestamp outside it is bucketed.  Fixed-offset zones such as UTC skip
+    the table entirely.  Instances are shared through ``get_day_bucketer``
+    and are safe to use from several threads.
+    """
+
+    def __init__(self, zone: tzinfo):
+        self.zone = zone
+        self._fixed_offset: Optional[float] = None
+        if isinstance(zone, timezone):
+            self._fixed_offset = zone.utcoffset(None).total_seconds()
+        # (first year, last year, transition epochs, offsets) replaced as a whole
+        self._table: Optional[Tuple[int, int, List[float], List[float]]] = None
+        self._arrays = None  # NumPy copies of the current table
+        self._lock = threading.Lock()
+
+    def _offset_at(self, ts: float) -> float:
+        return datetime.fromtimestamp(ts, tz=self.zone).utcoffset().total_seconds()
+
+    def _build(self, first_year: int, last_year: int) -> Tuple[int, int, List[float], List[float]]:
+        """Offset transitions from the start of first_year to the end of last_year."""
+        start, end = _year_start(first_year), _year_start(last_year + 1)
+        starts, offsets = [start], [self._offset_at(start)]
+        probe = start
+        while probe < end:
+            following = min(probe + _PROBE_SECONDS, end)
+            offset = self._offset_at(following)
+            if offset != offsets[-1]:
+                # Find the first second with the new offset
+                lo, hi = int(probe), int(following)
+                while hi - lo > 1:
+                    mid = (lo + hi) // 2
+                    if self._offset_at(mid) == offset:
+                        hi = mid
+                    else:
+                        lo = mid
+                starts.append(float(hi))
+                offsets.append(offset)
+            probe = following
+        return first_year, last_year, starts, offsets
+
+    def _table_for(self, low: float, high: float) -> Tuple[int, int, List[float], List[float]]:
+        """The offset table, extended to cover low..high first if needed."""
+        table = self._table
+        if table is not None and _year_start(table[0]) <= low and high < _year_start(table[1] + 1):
+            return table
+        with self._lock:
+            table = self._table
+            first, last = _epoch_year(low), _epoch_year(high)
+            if table is not None:
+                first, last = min(first, table[0]), max(last, table[1])
+                if (first, last) == table[:2]:
+                    return table
+            table = self._table = self._build(first, last)
+            self._arrays = None
+            return table
+
+    def day_ordinal(self, ts: float) -> int:
+        """Local day of ts as a date ordinal."""
+        if self._fixed_offset is not None:
+            return int((ts + self._fixed_offset) // SECONDS_PER_DAY) + UNIX_EPOCH_ORDINAL
+        _, _, starts, offsets = self._table_for(ts, ts)
+        offset = offsets[bisect.bisect_right(starts, ts) - 1]
+        return int((ts + offset) // SECONDS_PER_DAY) + UNIX_EPOCH_ORDINAL
+
+    def day(self, ts: float) -> str:
+        """Local day of ts as YYYY-MM-DD."""
+        return date.fromordinal(self.day_ordinal(ts)).isoformat()
+
+    def day_ordinals(self, epochs: Sequence[float]):
+        """
+        Local day ordinals of many timestamps.
+
+        Args:
+            epochs: Epoch seconds in any order (a list, array or ndarray)
+
+        Returns:
+            An int64 ndarray when NumPy is used, else a list of ints
+        """
+        if len(epochs) == 0:
+            return []
+        if NUMPY_AVAILABLE and len(epochs) >= NUMPY_MIN_EPOCHS:
+            return self._day_ordinals_numpy(np.asarray(epochs, dtype=np.float64))
+        if self._fixed_offset is not None:
+            offset = self._fixed_offset
+            return [int((ts + offset) // SECONDS_PER_DAY) + UNIX_EPOCH_ORDINAL for ts in epochs]
+        _, _, starts, offsets = self._table_for(min(epochs), max(epochs))
+        search = bisect.bisect_right
+        return [
+            int((ts + offsets[search(starts, ts) - 1]) // SECONDS_PER_DAY) + UNIX_EPOCH_ORDINAL
+            for ts in epochs
+        ]
+
+    def _day_ordinals_numpy(self, values):
+        if self._fixed_offset is not None:
+            shifted = values + self._fixed_offset
+        else:
+            table = self._table_for(float(values.min()), float(values.max()))
+            arrays = self._arrays
+            if arrays is None or arrays[0] is not table:
+                arrays = self._arrays = (table, np.asarray(table[2]), np.asarray(table[3]))
+            positions = np.searchsorted(arrays[1], values, side="right") - 1
+            shifted = values + arrays[2][positions]
+        return np.floor_divide(shifted, SECONDS_PER_DAY).astype(np.int64) + UNIX_EPOCH_ORDINAL
+
+    def day_counts(self, epochs: Sequence[float]) -> Dict[int, int]:
+        """Number of timestamps on each local day, keyed by day ordinal."""
+        ordinals = self.day_ordinals(epochs)
+        if NUMPY_AVAILABLE and isinstance(ordinals, np.ndarray):
+            days, counts = np.unique(ordinals, return_counts=True)
+            return dict(zip(days.tolist(), counts.tolist()))
+        counts: Dict[int, int] = {}
+        for ordinal in ordinals:
+            counts[ordinal] = counts.get(ordinal, 0) + 1
+        return counts
+
+    def day_start(self, ordinal: int) -> float:
+        """Epoch of the first instant of a local day (its midnight, or the end of a DST gap)."""
+        return datetime.combine(date.fromordinal(ordinal), time(), tzinfo=self.zone).timestamp()
+
+    def day_span(self, first: int, last: int) -> Tuple[float, float]:
+        """[start, end) epochs covering the local days first..last inclusive."""
+        return self.day_start(first), self.day_start(last + 1)
+
+    def today(self, now: Optional[datetime] = None) -> date:
+        """The local date at now (naive values are UTC; defaults to the current time)."""
+        now = now or datetime.utcnow()
+        if now.tzinfo is None:
+            now = now.replace(tzinfo=timezone.utc)
+        return date.fromordinal(self.day_ordinal(now.timestamp()))
+
+
+@functools.lru_cache(maxsize=64)
+def get_day_bucketer(name: Optional[str] = None) -> DayBucketer:
+    """
+    The shared bucketer for an IANA timezone name.
+
+    Unknown names and None fall back to UTC, as in ``get_timezone``.
+    """
+    return DayBucketer(get_timezone(name))
+
+
+def local_day_bounds(start_iso: str, end_iso: str, name: Optional[str] = None) -> Tuple[str, str]:
+    """
+    Local dates spanned by a UTC range, such as one from parse_time_range.
+
+    Plain YYYY-MM-DD values are already days and are returned unchanged;
+    naive timestamps are UTC.
+
+    Args:
+        start_iso: Range start, ISO timestamp or date
+        end_iso: Range end, ISO timestamp or date
+        name: IANA timezone of the days
+
+    Returns:
+        (first day, last day) as YYYY-MM-DD
+    """
+    bucketer = get_day_bucketer(name)
+
+    def local(value: str) -> str:
+        if len(value) <= 10:
+            return value
+        ts = iso_to_epoch(value)
+        return value[:10] if ts is None else bucketer.day(ts)
+
+    return local(start_iso), local(end_iso)
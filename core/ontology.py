@@ -3,36 +3,250 @@ Core ontology definitions for health conditions and normalization rules.
 
 This module centralizes the health domain knowledge used across the application
 for consistent condition classification and matching.
+
+The vocabulary lives in ``core/ontology_data.json`` (condition families,
+body-region hints and related families, with a version number).  It is
+loaded into an ``Ontology`` of precomputed lookup tables.  The file is
+checked for edits at most once every ``ONTOLOGY_RECHECK_SECONDS``, so
+changes are picked up without a restart while lookups in between cost no
+filesystem call; ``reload_ontology`` checks at once.  If the file becomes
+unreadable, the last good version stays in use.
 """
 
-from typing import Optional, Dict, List
-
-# Condition families for semantic matching
-CONDITION_FAMILIES = {
-    "migraine": ["migraine", "headache", "head pain", "temple pain", "behind eye", "neck-related head pain"],
-    "sleep": ["sleep", "insomnia", "sleep quality", "nap", "tired", "fatigue"],
-    "reflux": ["reflux", "heartburn", "gerd", "acid", "indigestion"],
-    "asthma": ["asthma", "wheeze", "wheezing", "shortness of breath"],
-    "anxiety": ["anxiety", "anxious", "panic", "worry", "stress"],
-    "depression": ["depression", "depressed", "sad", "down", "low mood"],
-    "back_pain": ["back pain", "backache", "lower back", "spine pain"],
-    "neck_pain": ["neck pain", "neck ache", "stiff neck"],
-    "pain": ["pain", "ache", "hurt", "sore"]  # Generic pain family
-}
-
-BODY_REGION_HINTS = {
-    "migraine": ["temple", "behind eye", "photophobia", "nausea", "throbbing", "neck", "head"],
-    "reflux": ["burning chest", "acid", "sour taste", "chest"],
-    "asthma": ["wheeze", "short of breath", "tight chest", "chest"],
-    "back_pain": ["lower back", "spine", "back"],
-    "neck_pain": ["neck", "cervical", "stiff neck"]
-}
+import functools
+import json
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, FrozenSet, List, Mapping, NamedTuple, Optional, Pattern, Tuple
+
+ONTOLOGY_FILE = Path(__file__).with_name("ontology_data.json")
+
+# Seconds between checks of ONTOLOGY_FILE for edits
+ONTOLOGY_RECHECK_SECONDS = 2.0
+
+# Pairwise conditions_match results kept per ontology version
+CONDITIONS_MATCH_CACHE_SIZE = 4096
+
+
+class ConditionMention(NamedTuple):
+    """A synonym of a condition family found in text."""
+    condition: str
+    synonym: str
+    start: int
+    end: int
+
+
+def _trie_regex(words) -> str:
+    """
+    Regular expression matching any of words, factored by common prefix.
+
+    Each branch point offers one alternative per distinct next character,
+    so a failed match is rejected after a single character comparison per
+    branch, whatever the number of words.  Longer continuations are tried
+    before stopping at a shorter word, which gives longest-match priority.
+    """
+    trie: Dict[str, dict] = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def render(node: Dict[str, dict]) -> str:
+        branches = [re.escape(char) + render(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if "" in node:
+            return "(?:" + body + ")?"
+        return body
+
+    return render(trie)
+
+
+class ConditionMatcher:
+    """
+    All condition synonyms compiled into one prefix-factored regular expression.
+
+    The text is scanned once, and the cost per position does not grow with
+    the number of synonyms.  At each position the longest synonym wins
+    ("back pain" rather than "back").  Synonyms must start at a word
+    boundary but may be followed by more letters, so "headaches" still
+    matches "headache" while "sundown" no longer matches "down".
+    """
+
+    def __init__(self, families: Dict[str, List[str]]):
+        self.families = families
+        self._synonym_conditions: Dict[str, str] = {}
+        # A synonym listed by several families belongs to the first of them
+        for condition, synonyms in families.items():
+            for synonym in synonyms:
+                self._synonym_conditions.setdefault(synonym.lower(), condition)
+        self._priority = {condition: rank for rank, condition in enumerate(families)}
+        self.pattern: Optional[Pattern[str]] = (
+            re.compile(r"\b" + _trie_regex(self._synonym_conditions)) if self._synonym_conditions else None
+        )
+
+    def find_all(self, text: str) -> List[ConditionMention]:
+        """Non-overlapping mentions in text, left to right."""
+        if not text or self.pattern is None:
+            return []
+        return [
+            ConditionMention(self._synonym_conditions[match.group()], match.group(), match.start(), match.end())
+            for match in self.pattern.finditer(text.lower())
+        ]
+
+    def best(self, text: str) -> Optional[str]:
+        """The mentioned family that comes first in the ontology, if any."""
+        conditions = {mention.condition for mention in self.find_all(text)}
+        return min(conditions, key=self._priority.__getitem__) if conditions else None
+
+
+class Ontology:
+    """
+    One version of the ontology file with its lookup tables.
+
+    Attributes:
+        version: Version number from the data file
+        families: Family -> synonyms, in priority order
+        body_region_hints: Family -> body-region hint words
+        synonym_families: Synonym -> families listing it
+        related: Family -> families to include when searching for it
+        region_families: Hint word -> families it suggests
+        matcher: Compiled matcher over every synonym
+    """
+
+    def __init__(self, data: Mapping[str, Any]):
+        self.version = data.get("version")
+        self.families: Dict[str, List[str]] = data.get("condition_families", {})
+        self.body_region_hints: Dict[str, List[str]] = data.get("body_region_hints", {})
+
+        synonym_families: Dict[str, List[str]] = {}
+        for family, synonyms in self.families.items():
+            for synonym in synonyms:
+                synonym_families.setdefault(synonym, []).append(family)
+        self.synonym_families: Dict[str, FrozenSet[str]] = {
+            synonym: frozenset(families) for synonym, families in synonym_families.items()
+        }
+
+        self.related: Dict[str, Tuple[str, ...]] = {
+            family: tuple(related for related in data.get("related_conditions", {}).get(family, [family])
+                          if related in self.families)
+            for family in self.families
+        }
+
+        region_families: Dict[str, List[str]] = {}
+        for family, hints in self.body_region_hints.items():
+            for hint in hints:
+                region_families.setdefault(hint, []).append(family)
+        self.region_families: Dict[str, Tuple[str, ...]] = {
+            hint: tuple(families) for hint, families in region_families.items()
+        }
+
+        self.matcher = ConditionMatcher(self.families)
+        self.conditions_match = functools.lru_cache(maxsize=CONDITIONS_MATCH_CACHE_SIZE)(self._conditions_match)
+
+    def _conditions_match(self, condition1: str, condition2: str) -> bool:
+        if condition1 == condition2:
+            return True
+        families1 = self.synonym_families.get(condition1)
+        families2 = self.synonym_families.get(condition2)
+        return bool(families1 and families2 and families1 & families2)
+
+
+def _build_ontology(data: Any) -> Optional[Ontology]:
+    if not data or "condition_families" not in data:
+        return None
+    return Ontology(data)
+
+
+_last_good_ontology: Optional[Ontology] = None
+# (file, (mtime_ns, size)) last checked, and when to check again
+_checked: Optional[Tuple[Path, Optional[Tuple[int, int]]]] = None
+_next_check = 0.0
+_load_lock = threading.Lock()
+
+
+def _file_signature(path: Path) -> Optional[Tuple[int, int]]:
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _load(path: Path) -> Optional[Ontology]:
+    try:
+        return _build_ontology(json.loads(path.read_text(encoding="utf-8")))
+    except (OSError, ValueError) as e:
+        print(f"Warning: could not load the condition ontology from {path}: {e}")
+        return None
+
+
+def get_ontology() -> Ontology:
+    """
+    The ontology for the current version of ONTOLOGY_FILE.
+
+    Built once per file version; the previous version is kept if the
+    file is missing or cannot be parsed.
+    """
+    global _last_good_ontology, _checked, _next_check
+    ontology = _last_good_ontology
+    if ontology is not None and time.monotonic() < _next_check and _checked and _checked[0] == ONTOLOGY_FILE:
+        return ontology
+    with _load_lock:
+        path = ONTOLOGY_FILE
+        signature = _file_signature(path)
+        if _last_good_ontology is None or _checked != (path, signature):
+            loaded = _load(path) if signature is not None else None
+            if loaded is not None:
+                _last_good_ontology = loaded
+            _checked = (path, signature)
+        _next_check = time.monotonic() + ONTOLOGY_RECHECK_SECONDS
+        if _last_good_ontology is None:
+            raise RuntimeError(f"Cannot load the condition ontology from {path}")
+        return _last_good_ontology
+
+
+def reload_ontology() -> Ontology:
+    """Check ONTOLOGY_FILE for edits now instead of waiting for the next recheck."""
+    global _next_check
+    _next_check = 0.0
+    return get_ontology()
+
+
+def __getattr__(name: str) -> Any:
+    # CONDITION_FAMILIES and BODY_REGION_HINTS reflect the loaded ontology
+    if name == "CONDITION_FAMILIES":
+        return get_ontology().families
+    if name == "BODY_REGION_HINTS":
+        return get_ontology().body_region_hints
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def find_condition_mentions(text: str) -> List[ConditionMention]:
+    """
+    Find every condition family mentioned in text.
+
+    Args:
+        text: Free text to scan
+
+    Returns:
+        Mentions with their family, matched synonym and character span, in text order
+    """
+    return get_ontology().matcher.find_all(text)
 
 
 def normalize_condition(text: str) -> Optional[str]:
     """
     Normalize condition text to canonical form using condition families.
     
+    When several families are mentioned, the one listed first in the
+    ontology wins, so specific families take precedence over the generic
+    "pain" family.
+    
     Args:
         text: User's description of condition
         
@@ -41,15 +255,16 @@ def normalize_condition(text: str) -> Optional[str]:
     """
     if not text:
         return None
-        
-    text_lower = text.lower()
-    
-    # Direct family matching
-    for condition, synonyms in CONDITION_FAMILIES.items():
-        if any(synonym in text_lower for synonym in synonyms):
-            return condition
+    return get_ontology().matcher.best(text)
+
+
+def conditions_match(condition1: str, condition2: str) -> bool:
+    """
+    Check if two conditions are the same or listed in the same family.
     
-    return None
+    Results are cached per ontology version.
+    """
+    return get_ontology().conditions_match(condition1, condition2)
 
 
 def get_related_conditions(condition: str) -> List[str]:
@@ -66,14 +281,7 @@ def get_related_conditions(condition: str) -> List[str]:
     normalized = normalize_condition(condition)
     if not normalized:
         return []
-    
-    # If searching for generic "pain", include all pain-related conditions
-    if normalized == "pain":
-        pain_related = ["pain", "migraine", "back_pain", "neck_pain"]
-        return [cond for cond in pain_related if cond in CONDITION_FAMILIES]
-    
-    # Otherwise, return just the normalized condition
-    return [normalized]
+    return list(get_ontology().related.get(normalized, (normalized,)))
 
 
 def get_condition_synonyms(canonical_condition: str) -> List[str]:
@@ -86,7 +294,7 @@ def get_condition_synonyms(canonical_condition: str) -> List[str]:
     Returns:
         List of synonyms for the condition
     """
-    return CONDITION_FAMILIES.get(canonical_condition, [])
+    return list(get_ontology().families.get(canonical_condition, []))
 
 
 def get_body_region_hints(condition: str) -> List[str]:
@@ -99,4 +307,17 @@ def get_body_region_hints(condition: str) -> List[str]:
     Returns:
         List of body region hints
     """
-    return BODY_REGION_HINTS.get(condition, [])
\ No newline at end of file
+    return list(get_ontology().body_region_hints.get(condition, []))
+
+
+def get_region_conditions(hint: str) -> List[str]:
+    """
+    Get the condition families a body-region hint points to.
+    
+    Args:
+        hint: Body-region word, e.g. "chest"
+        
+    Returns:
+        List of condition names, in ontology order
+    """
+    return list(get_ontology().region_families.get(hint.lower(), ()))
@@ -15,6 +15,9 @@ EPISODE_LINKING_WINDOW_HOURS = 12
 # Maximum episode duration before auto-closing (in hours)
 MAX_EPISODE_DURATION_HOURS = 72
 
+# How often the scheduled sweeper closes stale episodes (in minutes)
+EPISODE_SWEEP_INTERVAL_MINUTES = 30
+
 # Minimum severity change to trigger episode update
 MIN_SEVERITY_CHANGE_THRESHOLD = 1
 
@@ -78,6 +81,9 @@ SESSION_TIMEOUT_MINUTES = 60
 # Default time window for recall queries when not specified
 DEFAULT_RECALL_WINDOW_DAYS = 7
 
+# Number of distinct time expressions whose parse is memoized
+TIME_EXPRESSION_CACHE_SIZE = 1024
+
 # Maximum number of episodes to return in recall queries
 MAX_RECALL_RESULTS = 50
 
@@ -85,6 +91,19 @@ MAX_RECALL_RESULTS = 50
 CORRELATION_WINDOW_HOURS = 24
 
 
+# === ROUTER POLICIES ===
+
+# Fast-path decisions below this confidence fall through to the router agent
+FAST_PATH_MIN_CONFIDENCE = 0.85
+
+# Probability the fast-path model must give its top intent to be used
+FAST_PATH_MODEL_MIN_PROBABILITY = 0.9
+
+# Router agent decisions at least this confident are recorded in the event
+# log as training examples for the fast-path model
+ROUTER_TRAINING_MIN_CONFIDENCE = 0.8
+
+
 # === COACH AGENT POLICIES ===
 
 # Maximum length of coaching responses
@@ -105,7 +124,8 @@ DATA_FILES = {
     "observations": "data/observations.json", 
     "interventions": "data/interventions.json",
     "events": "data/events.jsonl",
-    "user_profiles": "data/user_profiles.json"
+    "user_profiles": "data/user_profiles.json",
+    "sqlite_db": "data/health.db"
 }
 
 # Backup retention policy
@@ -114,6 +134,29 @@ BACKUP_RETENTION_DAYS = 30
 # Auto-save interval for data files (in seconds)
 AUTO_SAVE_INTERVAL_SECONDS = 300
 
+# Episode storage mode: "json" rewrites episodes.json on every change,
+# "wal" appends deltas to a write-ahead log and compacts in the background
+EPISODE_STORAGE_MODE = "json"
+
+# Number of write-ahead log records before a background compaction
+WAL_COMPACTION_THRESHOLD = 200
+
+# events.jsonl is rotated into a numbered segment once it reaches this size
+# or its first event is this old
+EVENT_SEGMENT_MAX_BYTES = 4 * 1024 * 1024
+EVENT_SEGMENT_MAX_AGE_DAYS = 30
+
+# Rotated segments beyond the newest few are gzip-compressed
+EVENT_SEGMENTS_KEPT_UNCOMPRESSED = 2
+
+# Rotated segments record a byte offset every this many events
+EVENT_INDEX_STRIDE = 256
+
+# A logger submission repeating one seen this recently is treated as a
+# duplicate; the persisted hash index keeps at most this many entries
+IDEMPOTENCY_TTL_SECONDS = 120
+IDEMPOTENCY_MAX_ENTRIES = 1000
+
 
 def get_policy_value(policy_name: str, default: Any = None) -> Any:
     """
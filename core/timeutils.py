@@ -5,54 +5,367 @@ This module centralizes all date/time logic used across the application
 for consistent temporal operations.
 """
 
-from datetime import datetime, timedelta
-from typing import Tuple, Optional
+import functools
 import re
+from datetime import date, datetime, timedelta, timezone, tzinfo
+from typing import List, NamedTuple, Optional, Tuple
 
+try:
+    from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+    ZONEINFO_AVAILABLE = True
+except ImportError:  # Python < 3.9
+    ZONEINFO_AVAILABLE = False
 
-def parse_natural_time_range(query: str, user_timezone: str = "UTC") -> Tuple[datetime, datetime, str]:
+from core.policies import DEFAULT_RECALL_WINDOW_DAYS, DEFAULT_USER_TIMEZONE, TIME_EXPRESSION_CACHE_SIZE
+
+
+# === NATURAL-LANGUAGE TIME RANGES ===
+#
+# Parsing happens in two steps.  parse_time_expression turns the text into
+# a TimeExpression that does not depend on the current time, and is
+# memoized, since the agents ask about the same few phrases over and over.
+# resolve_time_expression then anchors it to "now" in the user's timezone.
+
+_MONTH_NAMES = ["january", "february", "march", "april", "may", "june", "july",
+                "august", "september", "october", "november", "december"]
+_WEEKDAY_NAMES = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+_NUMBER_WORDS = {
+    "a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6,
+    "seven": 7, "eight": 8, "nine": 9, "ten": 10, "eleven": 11, "twelve": 12,
+    "couple": 2, "few": 3,
+}
+# Days per unit; "month" keeps the 30-day window "last month" has always meant
+_UNIT_DAYS = {"hour": 1 / 24, "day": 1, "week": 7, "fortnight": 14, "month": 30, "year": 365}
+
+_MONTH = r"(jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?|sept?(?:ember)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)\.?"
+_DAY = r"(\d{1,2})(?:st|nd|rd|th)?"
+_YEAR = r"(?:,?\s+(\d{4}))?"
+_DATE_RE = re.compile(
+    r"\b(?:(\d{4})-(\d{2})-(\d{2})"
+    rf"|{_MONTH}\s+{_DAY}{_YEAR}"
+    rf"|{_DAY}\s+(?:of\s+)?{_MONTH}{_YEAR}"
+    r"|(\d{1,2})/(\d{1,2})(?:/(\d{2}|\d{4}))?)\b"
+)
+# Words that make a bare "8/3" a date; without one (or a year) it reads as
+# a score, since "migraines rated 8/10" is far more common here than a date
+_DATE_CUES = ("on", "since", "from", "between", "after", "before", "until", "till", "starting", "by")
+_RANGE_JOINERS = ("and", "to", "-", "until", "till", "through", "thru")
+# "a couple of", "few", "a few of" count as numbers themselves
+_NUMBER = r"(?:a\s+)?(\d+|" + "|".join(_NUMBER_WORDS) + r")(?:(?<=couple)\s+of|(?<=few)\s+of)?"
+_UNIT = r"(hour|day|week|fortnight|month|year)s?"
+_LAST_N_RE = re.compile(rf"\b(?:last|past|previous|recent)\s+{_NUMBER}\s+{_UNIT}\b")
+_N_AGO_RE = re.compile(rf"\b(since\s+|from\s+)?{_NUMBER}\s+{_UNIT}\s+ago\b")
+_LAST_UNIT_RE = re.compile(rf"\b(?:last|past|previous)\s+{_UNIT}\b")
+_THIS_UNIT_RE = re.compile(r"\b(?:this|current)\s+(week|month|year)\b")
+_MONTH_ONLY_RE = re.compile(rf"\b(?:(in|during|throughout|for|of|since)\s+)?{_MONTH}(?:\s+(\d{{4}}))?\b")
+_WEEKDAY_RE = re.compile(r"\b(since\s+|last\s+)?(" + "|".join(_WEEKDAY_NAMES) + r")s?\b")
+
+
+class DateSpec(NamedTuple):
+    """A calendar date from text; year is None when the text left it out."""
+    year: Optional[int]
+    month: int
+    day: int
+
+
+class TimeExpression(NamedTuple):
+    """
+    A parsed time expression, independent of the current time.
+
+    kind is one of: "last" (value=days), "days_ago" (value=days), "today",
+    "yesterday", "this" (unit), "day", "since" and "range" (dates), "month"
+    (month, year), "weekday" (weekday, strict) or "default".
+    """
+    kind: str
+    value: float = 0
+    unit: str = ""
+    dates: Tuple[DateSpec, ...] = ()
+    month: int = 0
+    year: Optional[int] = None
+    weekday: int = 0
+    strict: bool = False
+    text: str = ""
+
+
+def _month_number(name: str) -> int:
+    name = name.lower().rstrip(".")
+    for number, month in enumerate(_MONTH_NAMES, 1):
+        if month.startswith(name[:3]):
+            return number
+    raise ValueError(name)
+
+
+def _number(token: str) -> int:
+    return int(token) if token.isdigit() else _NUMBER_WORDS[token]
+
+
+def _year(token: Optional[str]) -> Optional[int]:
+    if not token:
+        return None
+    year = int(token)
+    return year + 2000 if year < 100 else year
+
+
+def _slash_date_cued(text: str, match: re.Match, found: List[Tuple[int, int, DateSpec]]) -> bool:
+    """Whether a yearless M/D is a date: the whole query, after a cue word, or ending a range."""
+    before = text[:match.start()].rstrip()
+    if not before and not text[match.end():].strip(" ?.!"):
+        return True
+    if before.rsplit(" ", 1)[-1] in _DATE_CUES:
+        return True
+    return bool(found) and text[found[-1][1]:match.start()].strip() in _RANGE_JOINERS
+
+
+def _find_dates(text: str) -> List[Tuple[int, int, DateSpec]]:
+    """Dates mentioned in text as (start, end, date), skipping impossible ones."""
+    found = []
+    for match in _DATE_RE.finditer(text):
+        g = match.groups()
+        try:
+            if g[0]:
+                spec = DateSpec(int(g[0]), int(g[1]), int(g[2]))
+            elif g[3]:
+                spec = DateSpec(_year(g[5]), _month_number(g[3]), int(g[4]))
+            elif g[6]:
+                spec = DateSpec(_year(g[8]), _month_number(g[7]), int(g[6]))
+            else:
+                if not g[11] and not _slash_date_cued(text, match, found):
+                    continue
+                spec = DateSpec(_year(g[11]), int(g[9]), int(g[10]))
+            # Validate against a leap year when the year is unknown
+            date(spec.year or 2000, spec.month, spec.day)
+        except ValueError:
+            continue
+        found.append((match.start(), match.end(), spec))
+    return found
+
+
+@functools.lru_cache(maxsize=TIME_EXPRESSION_CACHE_SIZE)
+def parse_time_expression(query: str) -> TimeExpression:
+    """
+    Recognize the time expression in a query.
+
+    Understands ISO and written dates ("2025-08-01", "Aug 1st", "1 August
+    2025", and "8/1" on its own or after a cue such as "on" or "since"),
+    "since <date|month|weekday>", "between/from <date> and/to <date>",
+    "last/past N days|weeks|months|years", "N days ago", "last
+    week/month/year", "this week/month/year", "today", "yesterday", month
+    names ("in August") and weekdays ("on Monday", "last Tuesday").
+
+    Args:
+        query: Natural language query containing a time expression
+
+    Returns:
+        The first matching expression, or kind "default" if there is none
+    """
+    text = " ".join(query.lower().split())
+    dates = _find_dates(text)
+
+    # Explicit ranges: "between Aug 1 and Aug 5", "from 8/1 to 8/5"
+    if len(dates) >= 2:
+        (start1, end1, first), (start2, _, second) = dates[0], dates[1]
+        joiner = text[end1:start2].strip()
+        lead = text[:start1].rstrip()
+        if joiner in _RANGE_JOINERS and \
+                (lead.endswith(("between", "from")) or joiner != "and"):
+            return TimeExpression("range", dates=(first, second), text=text)
+
+    for start, _, spec in dates:
+        if text[:start].rstrip().endswith(("since", "after", "starting")):
+            return TimeExpression("since", dates=(spec,), text=text)
+
+    match = _LAST_N_RE.search(text)
+    if match:
+        count, unit = _number(match.group(1)), match.group(2)
+        return TimeExpression("last", value=count * _UNIT_DAYS[unit], unit=f"{count} {unit}", text=text)
+    match = _N_AGO_RE.search(text)
+    if match:
+        count, unit = _number(match.group(2)), match.group(3)
+        if unit == "day" and not match.group(1):
+            # "3 days ago" is a single day; "since 3 days ago" is a window
+            return TimeExpression("days_ago", value=count, text=text)
+        return TimeExpression("last", value=count * _UNIT_DAYS[unit], unit=f"{count} {unit}", text=text)
+    match = _LAST_UNIT_RE.search(text)
+    if match:
+        unit = match.group(1)
+        return TimeExpression("last", value=_UNIT_DAYS[unit], unit=f"1 {unit}", text=text)
+    match = _THIS_UNIT_RE.search(text)
+    if match:
+        return TimeExpression("this", unit=match.group(1), text=text)
+
+    if re.search(r"\byesterday\b", text):
+        return TimeExpression("yesterday", text=text)
+    if re.search(r"\b(?:today|tonight|this morning|this afternoon|this evening)\b", text):
+        return TimeExpression("today", text=text)
+
+    if dates:
+        return TimeExpression("day", dates=(dates[0][2],), text=text)
+
+    for match in _MONTH_ONLY_RE.finditer(text):
+        context, name, year = match.groups()
+        # "may" and "march" are also ordinary words; require a preposition or a year
+        if not context and not year:
+            continue
+        month = _month_number(name)
+        if context == "since":
+            return TimeExpression("since", dates=(DateSpec(_year(year), month, 1),), text=text)
+        return TimeExpression("month", month=month, year=_year(year), text=text)
+
+    match = _WEEKDAY_RE.search(text)
+    if match:
+        qualifier = (match.group(1) or "").strip()
+        weekday = _WEEKDAY_NAMES.index(match.group(2))
+        if qualifier == "since":
+            return TimeExpression("since", weekday=weekday, strict=True, text=text)
+        return TimeExpression("weekday", weekday=weekday, strict=qualifier == "last", text=text)
+
+    return TimeExpression("default", text=text)
+
+
+@functools.lru_cache(maxsize=64)
+def get_timezone(name: Optional[str]) -> tzinfo:
+    """A timezone by IANA name, falling back to UTC if it is unknown."""
+    if not name or name.upper() == "UTC" or not ZONEINFO_AVAILABLE:
+        return timezone.utc
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        return timezone.utc
+
+
+def _resolve_date(spec: DateSpec, today: date) -> date:
+    """The date, taking the most recent occurrence not after today when the year is missing."""
+    if spec.year is not None:
+        return date(spec.year, spec.month, spec.day)
+    year = today.year
+    while True:
+        try:
+            candidate = date(year, spec.month, spec.day)
+        except ValueError:  # February 29th outside a leap year
+            year -= 1
+            continue
+        if candidate <= today:
+            return candidate
+        year -= 1
+
+
+def _format_date(day: date) -> str:
+    return f"{day:%B} {day.day}, {day.year}"
+
+
+def resolve_time_expression(expression: TimeExpression, user_timezone: Optional[str] = None,
+                            now: Optional[datetime] = None) -> Tuple[datetime, datetime, str]:
+    """
+    Anchor a parsed expression to the current time.
+
+    Day boundaries are midnights in the user's timezone.
+
+    Args:
+        expression: Result of parse_time_expression
+        user_timezone: IANA timezone name (defaults to DEFAULT_USER_TIMEZONE)
+        now: Current time; naive values are UTC (defaults to now)
+
+    Returns:
+        Tuple of (start, end, label) with start and end as naive UTC datetimes
+    """
+    zone = get_timezone(user_timezone or DEFAULT_USER_TIMEZONE)
+    now = now or datetime.utcnow()
+    if now.tzinfo is None:
+        now = now.replace(tzinfo=timezone.utc)
+    local_now = now.astimezone(zone)
+    today = local_now.date()
+
+    def midnight(day: date) -> datetime:
+        return datetime(day.year, day.month, day.day, tzinfo=zone)
+
+    def whole_days(first: date, last: date) -> Tuple[datetime, datetime]:
+        return midnight(first), midnight(last + timedelta(days=1)) - timedelta(microseconds=1)
+
+    kind = expression.kind
+    if kind == "last":
+        count, unit = expression.unit.split()
+        start, end = local_now - timedelta(days=expression.value), local_now
+        if unit in ("month", "week") and count == "1":
+            label = f"the last {int(expression.value)} days"
+        else:
+            label = f"the last {count} {unit}{'s' if count != '1' else ''}"
+    elif kind == "today":
+        start, end = whole_days(today, today)
+        label = "today"
+    elif kind == "yesterday":
+        yesterday = today - timedelta(days=1)
+        start, end = whole_days(yesterday, yesterday)
+        label = "yesterday"
+    elif kind == "this":
+        if expression.unit == "week":
+            first = today - timedelta(days=today.weekday())
+        elif expression.unit == "month":
+            first = today.replace(day=1)
+        else:
+            first = today.replace(month=1, day=1)
+        start, end = midnight(first), local_now
+        label = f"this {expression.unit}"
+    elif kind == "days_ago":
+        day = today - timedelta(days=int(expression.value))
+        start, end = whole_days(day, day)
+        label = _format_date(day)
+    elif kind == "day":
+        day = _resolve_date(expression.dates[0], today)
+        start, end = whole_days(day, day)
+        label = _format_date(day)
+    elif kind == "since":
+        if expression.dates:
+            first = _resolve_date(expression.dates[0], today)
+        else:
+            first = today - timedelta(days=(today.weekday() - expression.weekday) % 7 or 7)
+        start, end = midnight(first), local_now
+        label = f"since {_format_date(first)}"
+    elif kind == "range":
+        last = _resolve_date(expression.dates[1], today)
+        first = _resolve_date(expression.dates[0], last)
+        first, last = min(first, last), max(first, last)
+        start, end = whole_days(first, last)
+        label = f"{_format_date(first)} to {_format_date(last)}"
+    elif kind == "month":
+        year = expression.year
+        if year is None:
+            year = today.year if expression.month <= today.month else today.year - 1
+        first = date(year, expression.month, 1)
+        following = date(year + expression.month // 12, expression.month % 12 + 1, 1)
+        start, end = whole_days(first, following - timedelta(days=1))
+        end = min(end, local_now)
+        label = f"{first:%B} {year}"
+    elif kind == "weekday":
+        days_back = (today.weekday() - expression.weekday) % 7
+        if expression.strict and days_back == 0:
+            days_back = 7
+        day = today - timedelta(days=days_back)
+        start, end = whole_days(day, day)
+        label = f"{day:%A}, {_format_date(day)}"
+    else:
+        start, end = local_now - timedelta(days=DEFAULT_RECALL_WINDOW_DAYS), local_now
+        label = f"the last {DEFAULT_RECALL_WINDOW_DAYS} days (default range)"
+
+    def to_utc(value: datetime) -> datetime:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+    return to_utc(start), to_utc(end), label
+
+
+def parse_natural_time_range(query: str, user_timezone: Optional[str] = None,
+                             now: Optional[datetime] = None) -> Tuple[datetime, datetime, str]:
     """
     Parse natural language time expressions into structured date ranges.
     
     Args:
         query: Natural language query containing time expressions
-        user_timezone: User's timezone (currently defaults to UTC)
+        user_timezone: User's IANA timezone (defaults to DEFAULT_USER_TIMEZONE)
+        now: Current time, for testing (defaults to now)
         
     Returns:
-        Tuple of (start_datetime, end_datetime, human_readable_label)
+        Tuple of (start_datetime, end_datetime, human_readable_label), as naive UTC
     """
-    now = datetime.utcnow()
-    query_lower = query.lower()
-    
-    # Enhanced date parsing with more patterns
-    if "last week" in query_lower or "past week" in query_lower:
-        end_date = now
-        start_date = now - timedelta(days=7)
-        label = "the last 7 days"
-    elif "yesterday" in query_lower:
-        start_date = now - timedelta(days=1)
-        start_date = start_date.replace(hour=0, minute=0, second=0, microsecond=0)
-        end_date = start_date + timedelta(days=1) - timedelta(microseconds=1)
-        label = "yesterday"
-    elif "last month" in query_lower or "past month" in query_lower:
-        end_date = now
-        start_date = now - timedelta(days=30)
-        label = "the last 30 days"
-    elif "last 3 days" in query_lower or "past 3 days" in query_lower:
-        end_date = now
-        start_date = now - timedelta(days=3)
-        label = "the last 3 days"
-    elif "today" in query_lower:
-        start_date = now.replace(hour=0, minute=0, second=0, microsecond=0)
-        end_date = start_date + timedelta(days=1) - timedelta(microseconds=1)
-        label = "today"
-    else:
-        # Default to last 7 days if no specific range is found
-        end_date = now
-        start_date = now - timedelta(days=7)
-        label = "the last 7 days (default range)"
-
-    return start_date, end_date, label
+    return resolve_time_expression(parse_time_expression(query), user_timezone, now)
 
 
 def format_timestamp(dt: datetime, include_seconds: bool = False) -> str:
@@ -92,6 +405,27 @@ def parse_iso_timestamp(timestamp_str: str) -> Optional[datetime]:
         return None
 
 
+def iso_to_epoch(timestamp_str: str) -> Optional[float]:
+    """
+    Convert an ISO timestamp string to epoch seconds.
+    
+    Naive timestamps are treated as UTC, matching how the data layer
+    stores them.
+    
+    Args:
+        timestamp_str: ISO format timestamp string
+        
+    Returns:
+        Epoch seconds or None if parsing fails
+    """
+    dt = parse_iso_timestamp(timestamp_str) if isinstance(timestamp_str, str) else timestamp_str
+    if dt is None:
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
 def get_current_utc_iso() -> str:
     """
     Get the current time as an ISO format string in UTC.
@@ -4,5 +4,13 @@ Data persistence layer for the health companion app.
 This module contains:
 - storage_interface: Abstract storage API definitions
 - json_store: JSON file implementation of storage
+- episode_wal: Write-ahead log backend for episode storage
+- sqlite_store: SQLite implementation of storage with indexed queries
+- file_io: Cross-process file locking and atomic writes shared by all writers
+- dataset_cache: Shared, version-checked cache of parsed data files for readers
+- tables: Time-sorted episode and observation tables for range queries
+- keyword_index: Inverted keyword index over observation and episode text
+- event_log: Segmented events.jsonl with tail and since-timestamp reads
+- idempotency: Persisted index of recent event hashes for duplicate submissions
 - schemas: Pydantic models for persisted data
 """
\ No newline at end of file
@@ -3,21 +3,42 @@
 This module aggregates raw health logs into a per-day summary so that the
 UI and Recall Agent can query compact daily snapshots instead of scanning
 all raw data files.  Each record contains pain statistics and counts of
-logged episodes and observations for that day.
+logged episodes and observations for that day, plus a per-condition
+breakdown with the mix of interventions used.
+
+Records are kept current by the JSON store: every commit passes the
+before/after contribution of each episode it touched and the day of each
+new observation to ``apply_changes``, which adjusts only those days.
+Days are local days in the partition owner's timezone, found with the
+cached offset tables of ``core.day_buckets``.  Pain
+statistics are stored as a histogram of episode max severities so that an
+episode whose severity changes can be subtracted out exactly.  Days that
+predate the incremental updates start from zero; ``compile_day`` rebuilds a
+day from the source files, and ``compile_range`` rebuilds any span of days
+in one pass (also available as ``python -m data.daily_history``).
 """
 
 from __future__ import annotations
 
+import argparse
+import bisect
 import json
-from dataclasses import dataclass, asdict
-from datetime import datetime, timedelta
+import math
+import time
+from array import array
+from dataclasses import dataclass, asdict, field
+from datetime import date as date_cls, timedelta
 from pathlib import Path
-from typing import List, Optional
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from core.day_buckets import get_day_bucketer
+from core.timeutils import iso_to_epoch
+from data.dataset_cache import derived, load_json, prime, thaw
+from data.file_io import atomic_write_json, file_lock
 
-DATA_DIR = Path("data")
-DAILY_HISTORY_FILE = DATA_DIR / "daily_history.json"
-EPISODES_FILE = DATA_DIR / "episodes.json"
-OBSERVATIONS_FILE = DATA_DIR / "observations.json"
+
+# (day, condition, max severity, intervention types) of one episode
+EpisodeContribution = Tuple[str, str, Optional[int], Tuple[str, ...]]
 
 
 @dataclass
@@ -29,20 +50,25 @@ class DailyHistory:
     max_pain: Optional[int] = None
     episodes: int = 0
     observations: int = 0
+    pain_levels: Dict[str, int] = field(default_factory=dict)  # max severity -> episode count
+    conditions: Dict[str, Dict[str, Any]] = field(default_factory=dict)
 
 
 def _read_json(path: Path, default):
-    if path.exists():
-        try:
-            return json.loads(path.read_text())
-        except json.JSONDecodeError:
-            return default
-    return default
+    """Read-only view of a data file from the shared dataset cache."""
+    return load_json(path, default)
+
+
+def _history_file() -> Path:
+    """Daily history file of the partition in scope, where the JSON store writes it."""
+    # json_store imports this module, so it is imported here
+    from data import json_store
+    return json_store.daily_history_file()
 
 
 def _load_history() -> List[DailyHistory]:
     """Load existing daily history records."""
-    records = _read_json(DAILY_HISTORY_FILE, [])
+    records = _read_json(_history_file(), [])
     return [DailyHistory(**r) for r in records]
 
 # Public alias
@@ -50,64 +76,465 @@ load_history = _load_history
 
 
 def _save_history(records: List[DailyHistory]):
-    DATA_DIR.mkdir(exist_ok=True)
-    DAILY_HISTORY_FILE.write_text(json.dumps([asdict(r) for r in records], indent=2))
+    path = _history_file()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    atomic_write_json(path, [asdict(r) for r in records])
 
 
-def compile_day(date: Optional[str] = None) -> DailyHistory:
-    """Compile daily history for the given date (UTC)."""
-    if date is None:
-        date = datetime.utcnow().date().isoformat()
-    day_start = datetime.fromisoformat(date)
-    day_end = day_start + timedelta(days=1)
-
-    episodes = _read_json(EPISODES_FILE, {})
-    observations = _read_json(OBSERVATIONS_FILE, [])
-
-    severities: List[int] = []
-    for ep in episodes.values():
-        try:
-            ts = datetime.fromisoformat(ep["started_at"])
-        except Exception:
-            continue
-        if day_start <= ts < day_end and ep.get("max_severity") is not None:
-            severities.append(int(ep["max_severity"]))
-
-    episode_count = len(severities)
-    max_pain = max(severities) if severities else None
-    avg_pain = sum(severities) / episode_count if episode_count else None
-
-    observation_count = 0
-    for ob in observations:
-        try:
-            ts = datetime.fromisoformat(ob["timestamp"])
-        except Exception:
-            continue
-        if day_start <= ts < day_end:
-            observation_count += 1
+def _contribution(episode: Mapping[str, Any], day: str) -> EpisodeContribution:
+    severity = episode.get("max_severity")
+    interventions = tuple(
+        intervention.get("type") or "other" for intervention in episode.get("interventions") or ()
+    )
+    return (
+        day,
+        episode.get("condition") or "unknown",
+        int(severity) if severity is not None else None,
+        interventions,
+    )
+
+
+def episode_contribution(episode: Optional[Mapping[str, Any]],
+                         tz: Optional[str] = None) -> Optional[EpisodeContribution]:
+    """What an episode adds to its start day's record (local day in tz, default UTC), or None."""
+    if not episode or not episode.get("started_at"):
+        return None
+    ts = iso_to_epoch(episode["started_at"])
+    if ts is None:
+        return None
+    return _contribution(episode, get_day_bucketer(tz).day(ts))
+
+
+def observation_day(observation: Mapping[str, Any], tz: Optional[str] = None) -> Optional[str]:
+    """Local day (in tz, default UTC) an observation is counted on, or None without a valid timestamp."""
+    ts = iso_to_epoch(observation["timestamp"]) if observation.get("timestamp") else None
+    return get_day_bucketer(tz).day(ts) if ts is not None else None
+
+
+def _empty_record(date: str) -> Dict[str, Any]:
+    return asdict(DailyHistory(date=date))
+
+
+def _bump(counts: Dict[str, int], key: str, sign: int) -> None:
+    value = counts.get(key, 0) + sign
+    if value > 0:
+        counts[key] = value
+    else:
+        counts.pop(key, None)
+
+
+def _pain_stats(pain_levels: Mapping[str, int]) -> Tuple[Optional[float], Optional[int]]:
+    """(avg, max) of a severity histogram."""
+    total = sum(pain_levels.values())
+    if not total:
+        return None, None
+    levels = [int(level) for level in pain_levels]
+    return sum(int(level) * n for level, n in pain_levels.items()) / total, max(levels)
+
+
+def _add_episode(record: Dict[str, Any], contribution: EpisodeContribution, sign: int) -> None:
+    """Add (sign=1) or remove (sign=-1) an episode's contribution to a day record."""
+    _, condition, severity, interventions = contribution
+    record["episodes"] = max(0, record.get("episodes", 0) + sign)
+    conditions = record.setdefault("conditions", {})
+    summary = conditions.setdefault(condition, {"episodes": 0, "pain_levels": {}, "interventions": {}})
+    summary["episodes"] = max(0, summary["episodes"] + sign)
+    if severity is not None:
+        _bump(record.setdefault("pain_levels", {}), str(severity), sign)
+        _bump(summary["pain_levels"], str(severity), sign)
+    for intervention_type in interventions:
+        _bump(summary["interventions"], intervention_type, sign)
+    if not summary["episodes"]:
+        del conditions[condition]
+
+
+def _finalize(record: Dict[str, Any]) -> None:
+    """Recompute the derived pain statistics of a day record."""
+    record["avg_pain"], record["max_pain"] = _pain_stats(record.get("pain_levels") or {})
+    for summary in (record.get("conditions") or {}).values():
+        summary["avg_pain"], summary["max_pain"] = _pain_stats(summary["pain_levels"])
+
+
+def _write_records(path: Path, records: Dict[str, Dict[str, Any]]) -> None:
+    """Write day records sorted by date; caller holds the file lock."""
+    ordered = [records[date] for date in sorted(records)]
+    path.parent.mkdir(parents=True, exist_ok=True)
+    atomic_write_json(path, ordered)
+    prime(path, ordered)
+
+
+def apply_changes(path: Path,
+                  episode_changes: Iterable[Tuple[Optional[EpisodeContribution], Optional[EpisodeContribution]]],
+                  observation_days: Iterable[Optional[str]] = ()) -> None:
+    """
+    Fold committed writes into the daily history file.
+
+    Args:
+        path: Daily history file to update
+        episode_changes: (before, after) contribution of each touched episode
+        observation_days: Day of each newly saved observation
+    """
+    episode_changes = [(before, after) for before, after in episode_changes if before != after]
+    observation_days = [day for day in observation_days if day]
+    if not episode_changes and not observation_days:
+        return
+
+    with file_lock(path):
+        records = {record["date"]: record for record in thaw(load_json(path, []))}
+        touched = set()
+
+        def day_record(date: str) -> Dict[str, Any]:
+            touched.add(date)
+            if date not in records:
+                records[date] = _empty_record(date)
+            return records[date]
+
+        for before, after in episode_changes:
+            if before is not None:
+                _add_episode(day_record(before[0]), before, -1)
+            if after is not None:
+                _add_episode(day_record(after[0]), after, 1)
+        for date in observation_days:
+            record = day_record(date)
+            record["observations"] = record.get("observations", 0) + 1
+
+        for date in touched:
+            _finalize(records[date])
+        _write_records(path, records)
+
+
+@dataclass
+class CompileReport:
+    """Outcome of a compile_range run."""
+
+    records: List[DailyHistory]
+    episodes: int  # source records scanned
+    observations: int
+    seconds: float
+
+    @property
+    def records_per_second(self) -> float:
+        total = self.episodes + self.observations
+        return total / self.seconds if self.seconds > 0 else float(total)
+
+
+def compile_range(start_date: str, end_date: str, tz: Optional[str] = None,
+                  path: Optional[Path] = None, user_id: Optional[str] = None) -> CompileReport:
+    """
+    Rebuild daily history records for every day from start_date to end_date.
+
+    Episodes and observations in the range are bucketed in a single pass
+    over the time-sorted tables, converting their timestamps to local days
+    in one batch, and the history file is written once.  Sources, history
+    file and timezone all come from one data partition.
+
+    Args:
+        start_date: First day, YYYY-MM-DD
+        end_date: Last day (inclusive), YYYY-MM-DD
+        tz: IANA timezone whose local days are used (default: the
+            partition owner's, as used by the incremental updates)
+        path: History file to update (default: the partition's)
+        user_id: Partition to rebuild (default: the user in scope)
+
+    Returns:
+        CompileReport with the records and scan throughput
+    """
+    # json_store imports this module, so its loaders are imported here
+    from data import json_store
+
+    if user_id is not None:
+        with json_store.user_scope(user_id):
+            return compile_range(start_date, end_date, tz=tz, path=path)
+
+    started = time.perf_counter()
+    tz = tz if tz is not None else json_store.current_timezone()
+    bucketer = get_day_bucketer(tz)
+    first, last = date_cls.fromisoformat(start_date), date_cls.fromisoformat(end_date)
+    if last < first:
+        raise ValueError(f"end_date {end_date} is before start_date {start_date}")
+    path = path or json_store.daily_history_file()
+
+    start_ts, end_ts = bucketer.day_span(first.toordinal(), last.toordinal())
+    days = {
+        (first + timedelta(days=offset)).isoformat(): _empty_record((first + timedelta(days=offset)).isoformat())
+        for offset in range((last - first).days + 1)
+    }
+
+    # The WAL-aware loader sees episodes not yet compacted into the snapshot
+    episode_table = json_store.episode_table()
+    lo, hi = episode_table.span(start_ts, end_ts, inclusive_end=False)
+    episode_days = bucketer.day_ordinals(episode_table.ts[lo:hi])
+    for episode, ordinal in zip(episode_table.records[lo:hi], episode_days):
+        day = date_cls.fromordinal(int(ordinal)).isoformat()
+        _add_episode(days[day], _contribution(episode, day), 1)
+    episode_count = hi - lo
+
+    observation_table = json_store.observation_table()
+    lo, hi = observation_table.span(start_ts, end_ts, inclusive_end=False)
+    for ordinal, count in bucketer.day_counts(observation_table.ts[lo:hi]).items():
+        days[date_cls.fromordinal(ordinal).isoformat()]["observations"] += count
+
+    for record in days.values():
+        _finalize(record)
 
-    record = DailyHistory(
-        date=date,
-        avg_pain=avg_pain,
-        max_pain=max_pain,
+    with file_lock(path):
+        records = {r["date"]: r for r in thaw(load_json(path, []))}
+        records.update(days)
+        _write_records(path, records)
+
+    return CompileReport(
+        records=[DailyHistory(**days[day]) for day in sorted(days)],
         episodes=episode_count,
-        observations=observation_count,
+        observations=hi - lo,
+        seconds=time.perf_counter() - started,
     )
 
-    records = [r for r in _load_history() if r.date != date]
-    records.append(record)
-    records.sort(key=lambda r: r.date)
-    _save_history(records)
-    return record
+
+def compile_day(date: Optional[str] = None, tz: Optional[str] = None,
+                path: Optional[Path] = None, user_id: Optional[str] = None) -> DailyHistory:
+    """
+    Rebuild the daily history record for one day from the source files.
+
+    Args:
+        date: Day to rebuild, YYYY-MM-DD (default: today in tz)
+        tz: IANA timezone whose local days are used (default: the partition owner's)
+        path: History file to update (default: the partition's)
+        user_id: Partition to rebuild (default: the user in scope)
+    """
+    from data import json_store
+
+    if user_id is not None:
+        with json_store.user_scope(user_id):
+            return compile_day(date, tz=tz, path=path)
+
+    tz = tz if tz is not None else json_store.current_timezone()
+    if date is None:
+        date = get_day_bucketer(tz).today().isoformat()
+    return compile_range(date, date, tz=tz, path=path).records[0]
+
+
+def _ordinal(value: str) -> int:
+    """Day ordinal of a YYYY-MM-DD date or the date part of an ISO timestamp."""
+    return date_cls.fromisoformat(value[:10]).toordinal()
+
+
+class HistoryColumns:
+    """
+    Daily history as parallel columns sorted by date.
+
+    ``ordinals`` holds ``date.toordinal()`` of each day, ascending; the
+    metric columns are arrays at the same positions, with NaN for a
+    missing pain value.  A date range is two binary searches and a slice,
+    and the result converts straight to a column dict (for DataFrames) or
+    row dicts (for tools) without building a DailyHistory per day.
+    """
+
+    __slots__ = ("ordinals", "avg_pain", "max_pain", "episodes", "observations")
+
+    METRICS = ("avg_pain", "max_pain", "episodes", "observations")
+
+    def __init__(self, ordinals=None, avg_pain=None, max_pain=None, episodes=None, observations=None):
+        self.ordinals = ordinals if ordinals is not None else array('l')
+        self.avg_pain = avg_pain if avg_pain is not None else array('d')
+        self.max_pain = max_pain if max_pain is not None else array('d')
+        self.episodes = episodes if episodes is not None else array('l')
+        self.observations = observations if observations is not None else array('l')
+
+    def __len__(self) -> int:
+        return len(self.ordinals)
+
+    def slice(self, start_date: Optional[str] = None, end_date: Optional[str] = None) -> "HistoryColumns":
+        """Days from start_date to end_date inclusive (either bound optional)."""
+        lo = bisect.bisect_left(self.ordinals, _ordinal(start_date)) if start_date else 0
+        hi = bisect.bisect_right(self.ordinals, _ordinal(end_date)) if end_date else len(self.ordinals)
+        hi = max(lo, hi)
+        return HistoryColumns(*(getattr(self, name)[lo:hi] for name in self.__slots__))
+
+    def dates(self) -> List[str]:
+        return [date_cls.fromordinal(ordinal).isoformat() for ordinal in self.ordinals]
+
+    def to_columns(self) -> Dict[str, List[Any]]:
+        """{column: values} with ISO dates and None for missing pain values."""
+        return {
+            "date": self.dates(),
+            "avg_pain": [None if math.isnan(v) else v for v in self.avg_pain],
+            "max_pain": [None if math.isnan(v) else int(v) for v in self.max_pain],
+            "episodes": list(self.episodes),
+            "observations": list(self.observations),
+        }
+
+    def to_rows(self) -> List[Dict[str, Any]]:
+        """One dict per day with the same keys as DailyHistory's summary fields."""
+        columns = self.to_columns()
+        return [dict(zip(columns, values)) for values in zip(*columns.values())]
+
+
+def build_history_columns(records: Iterable[Mapping[str, Any]]) -> HistoryColumns:
+    """Build columns from daily history records (the history file's contents)."""
+    ordered = sorted(
+        (date_cls.fromisoformat(r["date"]).toordinal(), r) for r in records if r.get("date")
+    )
+    nan = float("nan")
+    return HistoryColumns(
+        array('l', (ordinal for ordinal, _ in ordered)),
+        array('d', (nan if r.get("avg_pain") is None else r["avg_pain"] for _, r in ordered)),
+        array('d', (nan if r.get("max_pain") is None else r["max_pain"] for _, r in ordered)),
+        array('l', (r.get("episodes", 0) for _, r in ordered)),
+        array('l', (r.get("observations", 0) for _, r in ordered)),
+    )
+
+
+def get_history_columns(start_date: Optional[str] = None, end_date: Optional[str] = None,
+                        path: Optional[Path] = None) -> HistoryColumns:
+    """
+    Columnar daily history within an optional date range.
+
+    The full columns are built once per version of the history file and
+    shared through the dataset cache; a range is a slice of them.  The
+    history file is the partition in scope's unless ``path`` selects another.
+    """
+    columns = derived(path or _history_file(), "history_columns", build_history_columns, [])
+    if start_date or end_date:
+        return columns.slice(start_date, end_date)
+    return columns
+
+
+ROLLUP_RESOLUTIONS = ("week", "month")
+
+
+def _period(day: date_cls, resolution: str) -> Tuple[str, date_cls, date_cls]:
+    """(label, first day, last day) of the week or month containing day."""
+    if resolution == "week":
+        start = day - timedelta(days=day.weekday())
+        year, week, _ = day.isocalendar()
+        return f"{year}-W{week:02d}", start, start + timedelta(days=6)
+    start = day.replace(day=1)
+    next_month = (start + timedelta(days=32)).replace(day=1)
+    return start.strftime("%Y-%m"), start, next_month - timedelta(days=1)
+
+
+def build_rollups(records: Iterable[Mapping[str, Any]]) -> Dict[str, Dict[str, List[Dict[str, Any]]]]:
+    """
+    Weekly and monthly per-condition totals from daily history records.
+
+    Returns:
+        {resolution: {condition: [bucket, ...]}} with buckets sorted by
+        period_start; each bucket has episodes, days_with_episodes,
+        avg_pain/max_pain (from the merged severity histogram) and the
+        intervention mix
+    """
+    buckets: Dict[Tuple[str, str, str], Dict[str, Any]] = {}
+    for record in records:
+        conditions = record.get("conditions") or {}
+        if not conditions:
+            continue
+        day = date_cls.fromisoformat(record["date"])
+        for resolution in ROLLUP_RESOLUTIONS:
+            label, start, end = _period(day, resolution)
+            for condition, summary in conditions.items():
+                bucket = buckets.get((resolution, condition, label))
+                if bucket is None:
+                    bucket = buckets[(resolution, condition, label)] = {
+                        "period": label, "period_start": start.isoformat(), "period_end": end.isoformat(),
+                        "condition": condition, "episodes": 0, "days_with_episodes": 0,
+                        "pain_levels": {}, "interventions": {},
+                    }
+                bucket["episodes"] += summary.get("episodes", 0)
+                bucket["days_with_episodes"] += 1
+                for level, count in (summary.get("pain_levels") or {}).items():
+                    _bump(bucket["pain_levels"], level, count)
+                for intervention_type, count in (summary.get("interventions") or {}).items():
+                    _bump(bucket["interventions"], intervention_type, count)
+
+    rollups: Dict[str, Dict[str, List[Dict[str, Any]]]] = {resolution: {} for resolution in ROLLUP_RESOLUTIONS}
+    for (resolution, condition, _), bucket in buckets.items():
+        bucket["avg_pain"], bucket["max_pain"] = _pain_stats(bucket["pain_levels"])
+        rollups[resolution].setdefault(condition, []).append(bucket)
+    for by_condition in rollups.values():
+        for condition_buckets in by_condition.values():
+            condition_buckets.sort(key=lambda bucket: bucket["period_start"])
+    return rollups
+
+
+def _build_rollup_index(records: Iterable[Mapping[str, Any]]):
+    """build_rollups with each bucket list paired with its period_start column."""
+    return {
+        resolution: {
+            condition: ([bucket["period_start"] for bucket in buckets], buckets)
+            for condition, buckets in by_condition.items()
+        }
+        for resolution, by_condition in build_rollups(records).items()
+    }
+
+
+def get_rollups(resolution: str = "month", conditions: Optional[Iterable[str]] = None,
+                start_date: Optional[str] = None, end_date: Optional[str] = None,
+                path: Optional[Path] = None) -> List[Dict[str, Any]]:
+    """
+    Weekly or monthly per-condition rollups overlapping a date range.
+
+    Rollups are rebuilt from the daily history once per version of the
+    history file, so they are as current as the daily records.
+
+    Args:
+        resolution: "week" or "month"
+        conditions: Conditions to include (default: all)
+        start_date: Include periods ending on or after this date (optional)
+        end_date: Include periods starting on or before this date (optional)
+        path: History file to read (default: the partition's)
+
+    Returns:
+        Buckets ordered by period_start, then condition
+    """
+    if resolution not in ROLLUP_RESOLUTIONS:
+        raise ValueError(f"resolution must be one of {ROLLUP_RESOLUTIONS}, got {resolution!r}")
+    by_condition = derived(path or _history_file(), "rollups", _build_rollup_index, [])[resolution]
+    selected = by_condition if conditions is None else {c: by_condition[c] for c in conditions if c in by_condition}
+
+    low = start_date[:10] if start_date else None
+    high = end_date[:10] if end_date else None
+    rows = []
+    for starts, buckets in selected.values():
+        # Periods do not overlap, so only the bucket just before the first
+        # one starting after start_date can still reach into the range
+        lo = max(0, bisect.bisect_right(starts, low) - 1) if low else 0
+        hi = bisect.bisect_right(starts, high) if high else len(starts)
+        rows.extend(bucket for bucket in buckets[lo:hi] if not low or bucket["period_end"] >= low)
+    rows.sort(key=lambda bucket: (bucket["period_start"], bucket["condition"]))
+    return [thaw(bucket) for bucket in rows]
 
 
 def get_history(start_date: Optional[str] = None, end_date: Optional[str] = None) -> List[DailyHistory]:
-    """Retrieve compiled daily history records within an optional date range."""
-    records = _load_history()
-    if start_date and end_date:
-        return [r for r in records if start_date <= r.date <= end_date]
-    if start_date:
-        return [r for r in records if r.date >= start_date]
-    if end_date:
-        return [r for r in records if r.date <= end_date]
-    return records
+    """Retrieve the partition's compiled daily history records within an optional date range."""
+    records = _read_json(_history_file(), [])
+    dates = [r["date"] for r in records]
+    lo = bisect.bisect_left(dates, start_date) if start_date else 0
+    hi = bisect.bisect_right(dates, end_date) if end_date else len(dates)
+    return [DailyHistory(**thaw(r)) for r in records[lo:hi]]
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Backfill daily history from the command line."""
+    from data import json_store
+
+    parser = argparse.ArgumentParser(description="Rebuild daily health history for a range of days.")
+    parser.add_argument("--start", required=True, help="First day, YYYY-MM-DD")
+    parser.add_argument("--end", default=None, help="Last day, YYYY-MM-DD (default: today in --tz)")
+    parser.add_argument("--user", default=None, help="User whose partition to rebuild (default: shared data)")
+    parser.add_argument("--tz", default=None,
+                        help="IANA timezone for day boundaries (default: the user's profile timezone)")
+    parser.add_argument("--output", type=Path, default=None,
+                        help="History file to write (default: the partition's daily_history.json)")
+    args = parser.parse_args(argv)
+
+    with json_store.user_scope(args.user):
+        tz = args.tz or json_store.current_timezone()
+        end = args.end or get_day_bucketer(tz).today().isoformat()
+        report = compile_range(args.start, end, tz=tz, path=args.output)
+    print(f"Compiled {len(report.records)} days from {report.episodes} episodes and "
+          f"{report.observations} observations in {report.seconds:.2f}s "
+          f"({report.records_per_second:,.0f} records/sec)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+# data/dataset_cache.py
+# Process-wide cache of parsed data files, validated by file signature
+
+"""
+Shared read path for the JSON data files.
+
+The Recall Agent chains several tools per question and each of them used to
+re-read and re-parse ``episodes.json``/``observations.json``; daily history
+compilation did the same.  ``load_json`` parses a file once per version and
+hands every caller the same read-only view until the file changes.
+
+A version is identified by ``(mtime_ns, size, inode)``.  All writers in this
+repo replace files atomically (see ``data.file_io``), so writes from other
+processes normally change the signature.  Filesystem timestamps are coarse
+and inode numbers get reused, though, so two quick writes of the same size
+can share a signature.  As in git's "racy clean" check, an entry whose file
+was modified less than ``RACY_WINDOW_NS`` before it was cached is only
+trusted after its content digest matches; that costs a read and a hash,
+never a parse.  Writers in this process call ``prime`` with the data they
+just wrote so the next read does not have to parse it again.
+
+Views are frozen: dicts become ``FrozenDict`` (a dict that refuses
+mutation, so it still serializes with ``json``) and lists become tuples.
+Use ``thaw`` to get a mutable deep copy.
+
+``derived`` memoizes values computed from a dataset (sorted columns,
+indexes) and drops them together with the dataset when the file changes.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
+PathLike = Union[str, Path]
+Signature = Tuple[int, int, int]
+
+# Files modified this close to caching time are verified by content digest
+RACY_WINDOW_NS = 2_000_000_000
+
+
+class FrozenDict(dict):
+    """A dict that cannot be modified after construction."""
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("cached dataset views are read-only; use thaw() for a copy")
+
+    __setitem__ = __delitem__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+    __ior__ = _readonly
+
+    def __deepcopy__(self, memo):
+        return thaw(self)
+
+    def __reduce__(self):
+        return (FrozenDict, (dict(self),))
+
+
+def freeze(value: Any) -> Any:
+    """Recursively convert dicts and lists into read-only equivalents."""
+    if isinstance(value, FrozenDict):
+        return value
+    if isinstance(value, dict):
+        return FrozenDict((key, freeze(item)) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+def thaw(value: Any) -> Any:
+    """Recursively convert a frozen view back into plain dicts and lists."""
+    if isinstance(value, dict):
+        return {key: thaw(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [thaw(item) for item in value]
+    return value
+
+
+class _Entry:
+    __slots__ = ("signature", "data", "digest", "cached_at_ns", "derived")
+
+    def __init__(self, signature: Signature, data: Any, digest: bytes):
+        self.signature = signature
+        self.data = data
+        self.digest = digest
+        self.cached_at_ns = time.time_ns()
+        self.derived: Dict[str, Any] = {}
+
+    def is_racy(self) -> bool:
+        return self.signature[0] >= self.cached_at_ns - RACY_WINDOW_NS
+
+
+def _digest(raw: bytes) -> bytes:
+    return hashlib.blake2b(raw, digest_size=16).digest()
+
+
+_lock = threading.RLock()
+_entries: Dict[str, _Entry] = {}
+_stats = {"reads": 0, "parses": 0}
+
+
+def _key(path: PathLike) -> str:
+    return os.path.abspath(path)
+
+
+def file_version(path: PathLike) -> Optional[Signature]:
+    """(mtime_ns, size, inode) of path, or None if it does not exist."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+
+def _read_bytes(path: PathLike) -> Optional[bytes]:
+    try:
+        with open(path, 'rb') as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def _current_entry(path: PathLike) -> Optional[_Entry]:
+    """Cached entry for path if it still matches the file on disk."""
+    key = _key(path)
+    signature = file_version(path)
+    if signature is None:
+        _entries.pop(key, None)
+        return None
+    entry = _entries.get(key)
+    if entry is not None and entry.signature == signature and not entry.is_racy():
+        return entry
+
+    raw = _read_bytes(path)
+    if raw is None:
+        _entries.pop(key, None)
+        return None
+    digest = _digest(raw)
+    if entry is not None and entry.digest == digest:
+        # Same content; re-stamp it so it becomes clean once the window passes
+        entry.signature = file_version(path) or signature
+        entry.cached_at_ns = time.time_ns()
+        return entry
+    try:
+        data = json.loads(raw)
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        _entries.pop(key, None)
+        return None
+    _stats["parses"] += 1
+    entry = _Entry(signature, freeze(data), digest)
+    _entries[key] = entry
+    return entry
+
+
+def load_json(path: PathLike, default: Any = None) -> Any:
+    """
+    Parsed contents of a JSON file as a read-only view.
+
+    Args:
+        path: File to load
+        default: Returned (frozen) when the file is missing or unparseable
+
+    Returns:
+        FrozenDict/tuple view shared by all callers until the file changes
+    """
+    with _lock:
+        entry = _current_entry(path)
+        if entry is None:
+            return freeze(default)
+        _stats["reads"] += 1
+        return entry.data
+
+
+def derived(path: PathLike, name: str, builder: Callable[[Any], Any], default: Any = None) -> Any:
+    """
+    Value computed from a dataset, cached for the current file version.
+
+    Args:
+        path: Source JSON file
+        name: Cache slot for this derived value
+        builder: Called with the dataset view when the slot is empty
+        default: Dataset passed to the builder when the file is missing
+    """
+    with _lock:
+        entry = _current_entry(path)
+        if entry is None:
+            return builder(freeze(default))
+        if name not in entry.derived:
+            entry.derived[name] = builder(entry.data)
+        return entry.derived[name]
+
+
+def cached_derived(path: PathLike, name: str) -> Any:
+    """
+    Derived value already computed for the current version, or None.
+
+    Unlike ``derived`` this never builds; writers use it to pick up an
+    index they can update incrementally and carry over with ``prime``.
+    """
+    with _lock:
+        entry = _current_entry(path)
+        if entry is None:
+            return None
+        return entry.derived.get(name)
+
+
+def prime(path: PathLike, data: Any, derived_values: Optional[Dict[str, Any]] = None) -> None:
+    """
+    Record data just written to path as the cached current version.
+
+    Must be called while the writer still holds the file's lock, so that
+    the stat taken here belongs to the write.
+
+    Args:
+        path: File that was just written
+        data: The data written to it
+        derived_values: Derived values already brought up to date for data
+    """
+    with _lock:
+        signature = file_version(path)
+        raw = _read_bytes(path)
+        if signature is None or raw is None:
+            _entries.pop(_key(path), None)
+            return
+        entry = _Entry(signature, freeze(data), _digest(raw))
+        entry.derived.update(derived_values or {})
+        _entries[_key(path)] = entry
+
+
+def invalidate(path: Optional[PathLike] = None) -> None:
+    """Drop the cached dataset for path, or every dataset if path is None."""
+    with _lock:
+        if path is None:
+            _entries.clear()
+        else:
+            _entries.pop(_key(path), None)
+
+
+def get_cache_stats() -> Dict[str, int]:
+    """Counts of dataset reads and actual file parses in this process."""
+    with _lock:
+        return dict(_stats, datasets=len(_entries))
@@ -0,0 +1,297 @@
+# data/episode_wal.py
+# Write-ahead log + in-memory episode map for the JSON episode store
+
+"""
+Append-only episode storage.
+
+Instead of rewriting ``episodes.json`` on every mutation, each change is
+appended to ``episodes.wal.jsonl`` as a compact delta record and applied to
+an in-memory episode map that stays hot for the life of the process.  Once
+the log grows past a threshold it is compacted in a background thread: the
+current map is written to the snapshot file and the log is truncated.
+
+Several processes may share one log.  Under the log's file lock each
+instance first catches up on records other processes appended past its
+last offset, and reloads snapshot plus log when another process has
+compacted, so appends and snapshots never start from a stale map.
+
+Delta records are designed to be idempotent so that replaying a log segment
+on top of a snapshot that already contains it is harmless:
+
+    {"op": "put",   "id": "...", "record": {...}}                 # full record
+    {"op": "patch", "id": "...", "set": {...}, "push": {field: [index, item]}}
+
+``push`` entries carry the list index the item was appended at, so a replay
+overwrites instead of appending twice.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from data.file_io import atomic_write_text, file_lock
+
+
+def apply_delta(episodes: Dict[str, Dict[str, Any]], delta: Dict[str, Any]) -> None:
+    """
+    Apply a single delta record to an episode map in place.
+
+    Args:
+        episodes: Episode map keyed by episode ID
+        delta: Delta record produced by the JSON store
+    """
+    op = delta.get("op")
+    episode_id = delta.get("id")
+
+    if op == "put":
+        episodes[episode_id] = dict(delta["record"])
+        return
+
+    if op == "patch":
+        episode = episodes.get(episode_id)
+        if episode is None:
+            return
+        for key, value in (delta.get("set") or {}).items():
+            episode[key] = value
+        for field, (index, item) in (delta.get("push") or {}).items():
+            items = episode.setdefault(field, [])
+            if index < len(items):
+                items[index] = item
+            else:
+                items.append(item)
+
+
+def rebase_delta(episodes: Dict[str, Dict[str, Any]], delta: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Re-point a delta's list pushes at the current end of each list.
+
+    Used when a delta built against one view of the episodes is applied to
+    a fresher copy that may already have items appended by another writer.
+    """
+    if not delta.get("push"):
+        return delta
+    episode = episodes.get(delta.get("id")) or {}
+    push = {
+        field: [len(episode.get(field) or []), item]
+        for field, (_, item) in delta["push"].items()
+    }
+    return {**delta, "push": push}
+
+
+def _signature(path: Path) -> Optional[Tuple[int, int, int]]:
+    """(inode, mtime_ns, size) of a file, or None if it does not exist."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+class EpisodeWAL:
+    """
+    In-memory episode map backed by a snapshot file and a write-ahead log.
+
+    Appends are O(1) per mutation regardless of how many episodes exist;
+    the O(n) snapshot write happens only during compaction, off the request
+    path.
+    """
+
+    def __init__(self, snapshot_path: Path, log_path: Optional[Path] = None,
+                 compact_threshold: int = 200):
+        self.snapshot_path = Path(snapshot_path)
+        self.log_path = Path(log_path) if log_path else self.snapshot_path.with_suffix(".wal.jsonl")
+        self.rotated_log_path = self.log_path.with_suffix(".compacting")
+        self.compact_threshold = compact_threshold
+
+        self._lock = threading.RLock()
+        self._compactor: Optional[threading.Thread] = None
+        self._log_records = 0
+        self.episodes: Dict[str, Dict[str, Any]] = {}
+        # What the map reflects on disk: the snapshot's signature, and the
+        # log file (inode) and byte offset replayed so far
+        self._snapshot_signature: Optional[Tuple[int, int, int]] = None
+        self._log_inode: Optional[int] = None
+        self._log_offset = 0
+        # Bumped whenever the map picks up changes made by another process
+        self.generation = 0
+        # Bumped on every change to the map, including this instance's appends
+        self.version = 0
+        with file_lock(self.log_path):
+            self._recover()
+
+    # === RECOVERY ===
+
+    def _recover(self):
+        """Rebuild the in-memory map from the snapshot plus any log segments."""
+        self.episodes = {}
+        self._snapshot_signature = _signature(self.snapshot_path)
+        if self.snapshot_path.exists():
+            try:
+                with open(self.snapshot_path, "r") as f:
+                    self.episodes = json.load(f)
+            except json.JSONDecodeError:
+                self.episodes = {}
+
+        # A rotated segment exists while a compaction is running or if one
+        # was interrupted
+        self._replay(self.rotated_log_path)
+        log = _signature(self.log_path)
+        self._log_inode = log[0] if log else None
+        self._log_records, self._log_offset = self._replay(self.log_path)
+
+    def _replay(self, path: Path, offset: int = 0) -> Tuple[int, int]:
+        """
+        Replay a log segment from offset into the map.
+
+        Returns:
+            (records applied, offset just past the last complete line)
+        """
+        if not path.exists():
+            return 0, offset
+        with open(path, "rb") as f:
+            f.seek(offset)
+            data = f.read()
+        # A final line without a newline is still being written (or was torn
+        # by a crash); it is picked up by a later sync once complete
+        complete = data[:data.rfind(b"\n") + 1]
+        count = 0
+        for line in complete.splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                apply_delta(self.episodes, json.loads(line))
+            except (json.JSONDecodeError, KeyError, TypeError, ValueError):
+                continue
+            count += 1
+        return count, offset + len(complete)
+
+    def _sync(self) -> None:
+        """
+        Catch up with changes other processes made on disk.
+
+        Caller holds the log's file lock.  New log records are replayed
+        from the last offset; if another process compacted (the snapshot
+        changed or the log was rotated away), the map is rebuilt.
+        """
+        log = _signature(self.log_path)
+        compacted = (
+            _signature(self.snapshot_path) != self._snapshot_signature
+            or (log is None and self._log_inode is not None)
+            or (log is not None and self._log_inode is not None and log[0] != self._log_inode)
+            or (log is not None and log[2] < self._log_offset)
+        )
+        if compacted:
+            self._recover()
+            self.generation += 1
+            self.version += 1
+            return
+        if log is None or log[2] == self._log_offset:
+            return
+        self._log_inode = log[0]
+        count, self._log_offset = self._replay(self.log_path, self._log_offset)
+        self._log_records += count
+        if count:
+            self.generation += 1
+            self.version += 1
+
+    def refresh(self) -> None:
+        """Pick up records other processes wrote since the last sync."""
+        with self._lock:
+            with file_lock(self.log_path):
+                self._sync()
+
+    # === MUTATION ===
+
+    def append(self, delta: Dict[str, Any]) -> None:
+        """Append a delta to the log and apply it to the in-memory map."""
+        self.append_many([delta])
+
+    def append_many(self, deltas: List[Dict[str, Any]]) -> None:
+        """
+        Append a batch of deltas with a single write.
+
+        The batch is serialized before anything touches the log, so a
+        record that cannot be encoded leaves both the log and the
+        in-memory map unchanged.
+        """
+        if not deltas:
+            return
+        payload = "".join(
+            json.dumps(delta, separators=(",", ":"), default=str) + "\n" for delta in deltas
+        )
+        with self._lock:
+            self.log_path.parent.mkdir(parents=True, exist_ok=True)
+            with file_lock(self.log_path):
+                self._sync()
+                with open(self.log_path, "ab") as f:
+                    f.write(payload.encode("utf-8"))
+                    self._log_offset = f.tell()
+                self._log_inode = _signature(self.log_path)[0]
+                for delta in deltas:
+                    apply_delta(self.episodes, delta)
+                self._log_records += len(deltas)
+                self.version += 1
+            if self._log_records >= self.compact_threshold:
+                self.compact(background=True)
+
+    # === COMPACTION ===
+
+    def compact(self, background: bool = False) -> None:
+        """
+        Fold the log into the snapshot file.
+
+        The map is first synced with the files under the log's lock, so
+        the snapshot includes every process's records.  The active log is
+        then rotated aside, and appends continue into a fresh log while
+        the snapshot is written.
+
+        Args:
+            background: Run the snapshot write in a daemon thread
+        """
+        with self._lock:
+            if self._compactor is not None and self._compactor.is_alive():
+                return
+            with file_lock(self.log_path):
+                self._sync()
+                # If another compaction is running or was interrupted, its
+                # rotated segment is already in the map and is folded into
+                # this snapshot as well
+                if not self.rotated_log_path.exists():
+                    if not self.log_path.exists():
+                        return
+                    os.replace(self.log_path, self.rotated_log_path)
+                    self._log_inode = None
+                    self._log_offset = 0
+                    self._log_records = 0
+                payload = json.dumps(self.episodes, indent=2, default=str)
+
+            if background:
+                self._compactor = threading.Thread(
+                    target=self._write_snapshot, args=(payload,), daemon=True
+                )
+                self._compactor.start()
+                return
+
+        self._write_snapshot(payload)
+
+    def _write_snapshot(self, payload: str) -> None:
+        atomic_write_text(self.snapshot_path, payload)
+        try:
+            self.rotated_log_path.unlink()
+        except FileNotFoundError:
+            pass
+
+    def wait_for_compaction(self, timeout: Optional[float] = None) -> None:
+        """Block until a running background compaction finishes."""
+        compactor = self._compactor
+        if compactor is not None:
+            compactor.join(timeout)
+
+    def pending_records(self) -> int:
+        """Number of log records not yet folded into the snapshot."""
+        return self._log_records
@@ -0,0 +1,255 @@
+# data/event_log.py
+# Segmented, tail-readable event log behind events.jsonl
+
+"""
+Rotating JSONL event log.
+
+New events are appended to the active file (``events.jsonl``), exactly as
+before.  Once that file reaches ``max_segment_bytes`` or its first event is
+older than ``max_segment_age``, it is renamed to a numbered segment
+(``events.000001.jsonl``) and a fresh active file is started.  Rotated
+segments beyond the newest ``keep_uncompressed`` are gzip-compressed.
+
+A manifest (``events.segments.json``) lists the rotated segments with their
+first/last timestamps and event counts, plus a sparse index: the byte
+offset and timestamp of every ``index_stride``-th event.  Reads use it to
+avoid touching the start of the log:
+
+- ``tail(n)`` reads the active file backwards and only moves on to older
+  segments if it needs more events.
+- ``since(ts)`` skips segments that ended before ``ts`` and seeks into the
+  one it starts in with the sparse index.
+
+Rotation happens under the active file's lock, so it composes with the
+other writers in ``data.file_io``.
+"""
+
+from __future__ import annotations
+
+import bisect
+import gzip
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union
+
+from core.policies import (
+    EVENT_INDEX_STRIDE, EVENT_SEGMENT_MAX_AGE_DAYS, EVENT_SEGMENT_MAX_BYTES,
+    EVENT_SEGMENTS_KEPT_UNCOMPRESSED
+)
+from core.timeutils import iso_to_epoch
+from data.dataset_cache import load_json
+from data.file_io import atomic_write_json, file_lock, iter_lines_reverse
+
+PathLike = Union[str, Path]
+
+
+def _event_ts(event: Dict[str, Any]) -> Optional[float]:
+    value = event.get("timestamp")
+    return iso_to_epoch(value) if value else None
+
+
+def _parse(line: str) -> Optional[Dict[str, Any]]:
+    try:
+        event = json.loads(line)
+    except json.JSONDecodeError:
+        return None
+    return event if isinstance(event, dict) else None
+
+
+class EventLog:
+    """
+    Append-only event log split into rotated segments.
+    """
+
+    def __init__(self, path: PathLike,
+                 max_segment_bytes: int = EVENT_SEGMENT_MAX_BYTES,
+                 max_segment_age: float = EVENT_SEGMENT_MAX_AGE_DAYS * 86400,
+                 keep_uncompressed: int = EVENT_SEGMENTS_KEPT_UNCOMPRESSED,
+                 index_stride: int = EVENT_INDEX_STRIDE):
+        """
+        Args:
+            path: Active log file, e.g. data/events.jsonl
+            max_segment_bytes: Rotate once the active file is this large
+            max_segment_age: Rotate once the active file's first event is this old (seconds)
+            keep_uncompressed: Number of newest rotated segments left as plain text
+            index_stride: Record a byte offset every this many events
+        """
+        self.path = Path(path)
+        self.manifest_path = self.path.with_name(f"{self.path.stem}.segments.json")
+        self.max_segment_bytes = max_segment_bytes
+        self.max_segment_age = max_segment_age
+        self.keep_uncompressed = keep_uncompressed
+        self.index_stride = max(1, index_stride)
+
+    # === WRITES ===
+
+    def append(self, events: Iterable[Dict[str, Any]]) -> None:
+        """Append events with a single write, rotating the active file first if it is due."""
+        text = "".join(json.dumps(event, default=str) + "\n" for event in events)
+        if not text:
+            return
+        with file_lock(self.path):
+            if self._rotation_due():
+                self._rotate()
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "a") as f:
+                f.write(text)
+
+    def _rotation_due(self) -> bool:
+        try:
+            size = self.path.stat().st_size
+        except FileNotFoundError:
+            return False
+        if size == 0:
+            return False
+        if size >= self.max_segment_bytes:
+            return True
+        with open(self.path, "r", encoding="utf-8") as f:
+            first = _parse(f.readline())
+        first_ts = _event_ts(first) if first else None
+        return first_ts is not None and time.time() - first_ts >= self.max_segment_age
+
+    def _segments(self) -> List[Dict[str, Any]]:
+        return list(load_json(self.manifest_path, {}).get("segments", []))
+
+    def _rotate(self) -> None:
+        """Turn the active file into the next segment; caller holds the lock."""
+        segments = [dict(segment) for segment in self._segments()]
+        seq = segments[-1]["seq"] + 1 if segments else 1
+        name = f"{self.path.stem}.{seq:06d}{self.path.suffix}"
+        segment_path = self.path.with_name(name)
+        os.replace(self.path, segment_path)
+        segments.append(self._describe(segment_path, seq))
+
+        for segment in segments[:max(0, len(segments) - self.keep_uncompressed)]:
+            if not segment["compressed"]:
+                self._compress(segment)
+        atomic_write_json(self.manifest_path, {"segments": segments})
+
+    def _describe(self, segment_path: Path, seq: int) -> Dict[str, Any]:
+        """Scan a freshly rotated segment once for its manifest entry."""
+        offsets = []
+        first_ts = last_ts = None
+        count = 0
+        offset = 0
+        with open(segment_path, "rb") as f:
+            for raw in f:
+                event = _parse(raw.decode("utf-8")) if raw.strip() else None
+                ts = _event_ts(event) if event else None
+                if ts is not None:
+                    if count % self.index_stride == 0:
+                        offsets.append([ts, offset])
+                    first_ts = ts if first_ts is None else first_ts
+                    last_ts = ts
+                    count += 1
+                offset += len(raw)
+        return {
+            "name": segment_path.name, "seq": seq, "compressed": False,
+            "first_ts": first_ts, "last_ts": last_ts, "count": count, "offsets": offsets,
+        }
+
+    def _compress(self, segment: Dict[str, Any]) -> None:
+        plain = self.path.with_name(segment["name"])
+        packed = plain.with_name(plain.name + ".gz")
+        with open(plain, "rb") as src, gzip.open(packed, "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        plain.unlink()
+        segment.update(name=packed.name, compressed=True, offsets=[])
+
+    # === READS ===
+
+    def _segment_lines_reverse(self, segment: Dict[str, Any]) -> Iterator[str]:
+        path = self.path.with_name(segment["name"])
+        if segment["compressed"]:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                lines = [line for line in f if line.strip()]
+            yield from reversed(lines)
+        else:
+            yield from iter_lines_reverse(path)
+
+    def iter_reverse(self) -> Iterator[Dict[str, Any]]:
+        """Events from newest to oldest, across the active file and all segments."""
+        for line in iter_lines_reverse(self.path):
+            event = _parse(line)
+            if event is not None:
+                yield event
+        for segment in reversed(self._segments()):
+            for line in self._segment_lines_reverse(segment):
+                event = _parse(line)
+                if event is not None:
+                    yield event
+
+    def tail(self, limit: int) -> List[Dict[str, Any]]:
+        """The most recent events, newest first."""
+        events = []
+        for event in self.iter_reverse():
+            if len(events) >= limit:
+                break
+            events.append(event)
+        return events
+
+    def since(self, since_ts: float) -> List[Dict[str, Any]]:
+        """
+        Events with a timestamp at or after since_ts (epoch seconds), oldest first.
+
+        Events are appended in time order, so reading stops at the first
+        older event in the active file and at the first segment that ended
+        before since_ts.
+        """
+        newest_first: List[Dict[str, Any]] = []
+        for line in iter_lines_reverse(self.path):
+            event = _parse(line)
+            ts = _event_ts(event) if event else None
+            if ts is None:
+                continue
+            if ts < since_ts:
+                return newest_first[::-1]
+            newest_first.append(event)
+
+        older: List[List[Dict[str, Any]]] = []
+        for segment in reversed(self._segments()):
+            if segment["last_ts"] is None or segment["last_ts"] < since_ts:
+                break
+            older.append(self._segment_since(segment, since_ts))
+        return [event for chunk in reversed(older) for event in chunk] + newest_first[::-1]
+
+    def _segment_since(self, segment: Dict[str, Any], since_ts: float) -> List[Dict[str, Any]]:
+        path = self.path.with_name(segment["name"])
+        if segment["compressed"]:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                lines: Iterable[str] = f.readlines()
+        else:
+            offsets = segment["offsets"]
+            # Start at the last indexed event before since_ts
+            position = bisect.bisect_left([ts for ts, _ in offsets], since_ts) - 1
+            start = offsets[position][1] if position >= 0 else 0
+            with open(path, "rb") as f:
+                f.seek(start)
+                lines = [raw.decode("utf-8") for raw in f]
+        events = []
+        for line in lines:
+            event = _parse(line) if line.strip() else None
+            ts = _event_ts(event) if event else None
+            if ts is not None and ts >= since_ts:
+                events.append(event)
+        return events
+
+    def iter_all(self) -> Iterator[Dict[str, Any]]:
+        """Every event, oldest first (for exports and imports)."""
+        for segment in self._segments():
+            path = self.path.with_name(segment["name"])
+            opener = gzip.open if segment["compressed"] else open
+            with opener(path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    event = _parse(line) if line.strip() else None
+                    if event is not None:
+                        yield event
+        if self.path.exists():
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    event = _parse(line) if line.strip() else None
+                    if event is not None:
+                        yield event
@@ -0,0 +1,271 @@
+# data/file_io.py
+# Cross-process file locking and atomic writes for the data files
+
+"""
+Shared write path for everything under data/.
+
+Every writer goes through this module so that several Gradio workers and
+the batch scripts can run against the same data directory:
+
+- ``file_lock`` takes an exclusive advisory lock on a ``<name>.lock``
+  sidecar (fcntl on POSIX, msvcrt on Windows).  Locks are re-entrant
+  within a thread, and ``file_locks`` acquires several in a fixed order
+  so multi-file commits cannot deadlock.
+- ``atomic_write_text``/``atomic_write_json`` write to a temp file in the
+  same directory, fsync it and ``os.replace`` it over the target, so
+  readers only ever see the old or the new file, never a truncated one.
+- ``locked_append`` appends to JSONL logs under the same lock, and
+  ``iter_lines_reverse``/``read_tail_lines`` read them from the end.
+
+Whole-file writes drop the path from ``data.dataset_cache``.
+
+Lock acquisitions that had to wait are counted; see ``get_lock_stats``.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Union
+
+from data import dataset_cache
+
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:  # Windows
+    fcntl = None
+    FCNTL_AVAILABLE = False
+
+try:
+    import msvcrt
+    MSVCRT_AVAILABLE = True
+except ImportError:
+    msvcrt = None
+    MSVCRT_AVAILABLE = False
+
+PathLike = Union[str, Path]
+
+_WINDOWS_RETRY_SECONDS = 0.01
+
+_held = threading.local()
+_stats_lock = threading.Lock()
+_lock_stats: Dict[str, float] = {"acquired": 0, "contended": 0, "wait_seconds": 0.0}
+
+
+# === LOCKING ===
+
+def lock_path_for(path: PathLike) -> Path:
+    """Sidecar lock file guarding path"""
+    path = Path(path)
+    return path.with_name(path.name + ".lock")
+
+
+def _try_lock(fd: int) -> bool:
+    if FCNTL_AVAILABLE:
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except BlockingIOError:
+            return False
+    if MSVCRT_AVAILABLE:
+        try:
+            os.lseek(fd, 0, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            return False
+    return True
+
+
+def _lock_blocking(fd: int) -> None:
+    if FCNTL_AVAILABLE:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        return
+    # msvcrt has no unbounded blocking mode; poll the non-blocking lock
+    while not _try_lock(fd):
+        time.sleep(_WINDOWS_RETRY_SECONDS)
+
+
+def _unlock(fd: int) -> None:
+    if FCNTL_AVAILABLE:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+    elif MSVCRT_AVAILABLE:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+
+def _record_acquire(contended: bool, waited: float) -> None:
+    with _stats_lock:
+        _lock_stats["acquired"] += 1
+        if contended:
+            _lock_stats["contended"] += 1
+            _lock_stats["wait_seconds"] += waited
+
+
+@contextmanager
+def file_lock(path: PathLike) -> Iterator[None]:
+    """
+    Hold an exclusive cross-process lock on path.
+
+    Re-entrant within a thread: nested calls for the same path do not
+    block on themselves.
+    """
+    lock_path = lock_path_for(path)
+    key = str(lock_path.resolve())
+    held = getattr(_held, "paths", None)
+    if held is None:
+        held = _held.paths = set()
+    if key in held:
+        yield
+        return
+
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        start = time.perf_counter()
+        contended = not _try_lock(fd)
+        if contended:
+            _lock_blocking(fd)
+        _record_acquire(contended, time.perf_counter() - start)
+
+        held.add(key)
+        try:
+            yield
+        finally:
+            held.discard(key)
+            _unlock(fd)
+    finally:
+        os.close(fd)
+
+
+@contextmanager
+def file_locks(paths: Iterable[PathLike]) -> Iterator[None]:
+    """Hold locks on several paths, acquired in a fixed order."""
+    ordered = sorted({str(Path(p).resolve()) for p in paths})
+    with ExitStack() as stack:
+        for path in ordered:
+            stack.enter_context(file_lock(path))
+        yield
+
+
+def get_lock_stats() -> Dict[str, float]:
+    """
+    Lock acquisition counters for this process.
+
+    Returns:
+        Dict with ``acquired`` (total locks taken), ``contended`` (how many
+        had to wait for another holder) and ``wait_seconds`` (total wait)
+    """
+    with _stats_lock:
+        return dict(_lock_stats)
+
+
+def reset_lock_stats() -> None:
+    with _stats_lock:
+        _lock_stats.update({"acquired": 0, "contended": 0, "wait_seconds": 0.0})
+
+
+# === ATOMIC WRITES ===
+
+def write_temp(path: PathLike, text: str) -> Path:
+    """
+    Write text to a fsynced temp file next to path and return its path.
+
+    The caller swaps it in with ``os.replace``; this split lets multi-file
+    commits stage every file before any of them becomes visible.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(temp_path, "w") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+    except BaseException:
+        try:
+            temp_path.unlink()
+        except FileNotFoundError:
+            pass
+        raise
+    return temp_path
+
+
+def atomic_write_text(path: PathLike, text: str) -> None:
+    """Replace path with text atomically, under the path's lock."""
+    with file_lock(path):
+        os.replace(write_temp(path, text), path)
+        dataset_cache.invalidate(path)
+
+
+def atomic_write_json(path: PathLike, data: Any, indent: int = 2, **dump_kwargs: Any) -> None:
+    """Serialize data and replace path with it atomically."""
+    dump_kwargs.setdefault("default", str)
+    atomic_write_text(path, json.dumps(data, indent=indent, **dump_kwargs))
+
+
+def create_if_missing(path: PathLike, data: Any) -> None:
+    """Write data as JSON to path unless it exists; checked under the lock."""
+    if Path(path).exists():
+        return
+    with file_lock(path):
+        if not Path(path).exists():
+            atomic_write_json(path, data)
+
+
+def locked_append(path: PathLike, text: str) -> None:
+    """Append text to path under the path's lock."""
+    path = Path(path)
+    with file_lock(path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "a") as f:
+            f.write(text)
+
+
+# === TAIL READS ===
+
+TAIL_BLOCK_SIZE = 64 * 1024
+
+
+def iter_lines_reverse(path: PathLike, block_size: int = TAIL_BLOCK_SIZE) -> Iterator[str]:
+    """
+    Non-empty lines of a text file from last to first.
+
+    Reads fixed-size blocks backwards from the end, so the cost is
+    proportional to the lines consumed rather than to the file size.
+    """
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return
+    with f:
+        position = f.seek(0, os.SEEK_END)
+        remainder = b""
+        while position > 0:
+            step = min(block_size, position)
+            position -= step
+            f.seek(position)
+            lines = (f.read(step) + remainder).split(b"\n")
+            # The first piece may be the end of a line that starts in an earlier block
+            remainder = lines.pop(0)
+            for line in reversed(lines):
+                if line.strip():
+                    yield line.decode("utf-8")
+        if remainder.strip():
+            yield remainder.decode("utf-8")
+
+
+def read_tail_lines(path: PathLike, count: int) -> List[str]:
+    """The last count non-empty lines of a text file, oldest first."""
+    lines = []
+    for line in iter_lines_reverse(path):
+        if len(lines) >= count:
+            break
+        lines.append(line)
+    lines.reverse()
+    return lines
@@ -0,0 +1,136 @@
+# data/idempotency.py
+# Bounded, persisted index of recent event hashes
+
+"""
+Idempotency index for logger submissions.
+
+``event_hash`` is the SHA1 of a text plus its UTC minute bucket.  The
+logger workflow hashes each submission as received (prompt plus
+attachment names) and this index remembers recent hashes, so a retried or
+double-clicked submission can be recognised before the extractor runs or
+the data files are touched.  ``append_event`` stamps events with the same
+function applied to the text it logs, which is usually the extracted
+notes, so event hashes are not submission keys.
+
+A submission made at 12:00:59 and retried at 12:01:02 lands in different
+buckets, so lookups check the current and the previous minute.
+
+Entries expire after ``ttl_seconds`` and the index holds at most
+``max_entries`` hashes, evicting the oldest first (an LRU keyed by
+insertion time).  It is persisted next to the data files and reloaded when
+another process has changed it, so duplicate detection survives restarts
+and works across workers.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import List, Optional, Union
+
+from core.policies import IDEMPOTENCY_MAX_ENTRIES, IDEMPOTENCY_TTL_SECONDS
+from data.file_io import atomic_write_json, file_lock
+
+PathLike = Union[str, Path]
+
+
+def event_hash(text: str, timestamp: datetime) -> str:
+    """The event_hash for text submitted at timestamp (UTC)."""
+    bucket = timestamp.replace(second=0, microsecond=0).isoformat()
+    return hashlib.sha1((text.strip() + bucket).encode()).hexdigest()
+
+
+def submission_hashes(text: str, timestamp: datetime) -> List[str]:
+    """Hashes for the current and previous minute bucket, current first."""
+    return [event_hash(text, timestamp), event_hash(text, timestamp - timedelta(minutes=1))]
+
+
+class IdempotencyIndex:
+    """
+    Event hash -> epoch seen, oldest first.
+    """
+
+    def __init__(self, path: PathLike, ttl_seconds: float = IDEMPOTENCY_TTL_SECONDS,
+                 max_entries: int = IDEMPOTENCY_MAX_ENTRIES):
+        """
+        Args:
+            path: JSON file the index is persisted to
+            ttl_seconds: How long a hash counts as a duplicate
+            max_entries: Most hashes kept; the oldest are evicted first
+        """
+        self.path = Path(path)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, float]" = OrderedDict()
+        self._signature: Optional[List[int]] = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _file_signature(self) -> Optional[List[int]]:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return [stat.st_mtime_ns, stat.st_size]
+
+    def _refresh(self) -> None:
+        """Reload the persisted entries if another process changed them."""
+        signature = self._file_signature()
+        if signature == self._signature:
+            return
+        entries: "OrderedDict[str, float]" = OrderedDict()
+        if signature is not None:
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    stored = json.load(f)
+                for key, seen in sorted(stored.get("entries", {}).items(), key=lambda item: item[1]):
+                    entries[key] = float(seen)
+            except (OSError, ValueError, AttributeError):
+                entries = OrderedDict()
+        self._entries = entries
+        self._signature = signature
+
+    def _expire(self, now: float) -> None:
+        cutoff = now - self.ttl_seconds
+        while self._entries:
+            key, seen = next(iter(self._entries.items()))
+            if seen >= cutoff and len(self._entries) <= self.max_entries:
+                break
+            del self._entries[key]
+
+    def _save(self) -> None:
+        atomic_write_json(self.path, {"entries": dict(self._entries)})
+        self._signature = self._file_signature()
+
+    def claim(self, hashes: List[str], now: Optional[float] = None) -> bool:
+        """
+        Record hashes[0] unless any of hashes was seen within the TTL.
+
+        Returns:
+            True if the submission is new, False if it is a duplicate
+        """
+        now = time.time() if now is None else now
+        with self._lock, file_lock(self.path):
+            self._refresh()
+            self._expire(now)
+            if any(key in self._entries for key in hashes):
+                return False
+            self._entries[hashes[0]] = now
+            self._expire(now)
+            self._save()
+            return True
+
+    def release(self, key: str) -> None:
+        """Forget a claimed hash, e.g. when its submission failed and may be retried."""
+        with self._lock, file_lock(self.path):
+            self._refresh()
+            if self._entries.pop(key, None) is not None:
+                self._save()
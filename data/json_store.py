@@ -2,19 +2,38 @@
 # JSON file implementation of the health data storage interface
 
 from __future__ import annotations
+import functools
 import json
 import os
+import re
 import uuid
-import hashlib
+import threading
+from collections import ChainMap
+from contextlib import contextmanager
+from contextvars import ContextVar
 from datetime import datetime, timedelta
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Iterator, Mapping, Sequence, Tuple
 from pathlib import Path
 
 from data.storage_interface import HealthDataStorage
+from data.episode_wal import EpisodeWAL, apply_delta, rebase_delta
+from data.event_log import EventLog
+from data.idempotency import IdempotencyIndex, event_hash, submission_hashes
+from data.file_io import atomic_write_json, create_if_missing, file_locks, write_temp
+from data.dataset_cache import cached_derived, load_json, prime, thaw
+from data.keyword_index import (
+    EPISODE_INDEX, OBSERVATION_INDEX, KeywordIndex, build_episode_index,
+    index_episode, index_observation, load_episode_index, load_observation_index
+)
+from data.open_episode_index import OpenEpisodeIndex
+from data.tables import EpisodeTable, TimeTable, build_episode_table, load_episode_table, load_observation_table
+from data import daily_history
 from core.ontology import CONDITION_FAMILIES, BODY_REGION_HINTS, normalize_condition
+from core.timeutils import iso_to_epoch
 from core.policies import (
     EPISODE_LINKING_WINDOW_HOURS, MAX_EPISODE_DURATION_HOURS,
-    DATA_FILES, MAX_EVENTS_IN_MEMORY
+    DATA_FILES, MAX_EVENTS_IN_MEMORY, EPISODE_STORAGE_MODE, WAL_COMPACTION_THRESHOLD,
+    DEFAULT_USER_TIMEZONE
 )
 from data.schemas.episodes import EpisodeData, EpisodeCandidate, ObservationData, InterventionData
 
@@ -27,93 +46,562 @@ EPISODES_FILE = DATA_DIR / "episodes.json"
 OBSERVATIONS_FILE = DATA_DIR / "observations.json"
 INTERVENTIONS_FILE = DATA_DIR / "interventions.json"
 EVENTS_FILE = DATA_DIR / "events.jsonl"
+OPEN_INDEX_FILE = DATA_DIR / "open_episodes.index.json"
+DAILY_HISTORY_FILE = DATA_DIR / "daily_history.json"
+IDEMPOTENCY_FILE = DATA_DIR / "event_hashes.json"
+
+# "json" (rewrite episodes.json per change) or "wal" (append-only log)
+STORAGE_MODE = os.getenv("EPISODE_STORAGE_MODE", EPISODE_STORAGE_MODE)
+
+# Per-partition state, keyed by the partition's episodes.json path
+_episode_wals: Dict[Path, EpisodeWAL] = {}
+_open_indexes: Dict[Path, OpenEpisodeIndex] = {}
+_wal_keyword_indexes: Dict[Path, Tuple[EpisodeWAL, int, KeywordIndex]] = {}
+_wal_episode_tables: Dict[Path, Tuple[EpisodeWAL, int, EpisodeTable]] = {}
+_idempotency_indexes: Dict[Path, IdempotencyIndex] = {}
+
+# User whose partition the storage functions read and write; None is the
+# shared top-level data directory used before data was partitioned
+_current_user: ContextVar[Optional[str]] = ContextVar("health_data_user", default=None)
+
+# Transactions committed inside the innermost track_commits block
+_commit_log: ContextVar[Optional[List["StorageTransaction"]]] = ContextVar("health_data_commits", default=None)
+
+_SAFE_USER_ID = re.compile(r"[^A-Za-z0-9_.-]")
+
+def user_subdir(user_id: Optional[str] = None) -> Path:
+    """
+    A user's partition relative to the data directory.
+    
+    Args:
+        user_id: User to resolve (defaults to the user in scope)
+        
+    Returns:
+        users/<user_id>, or "." for the shared top-level partition
+    """
+    if user_id is None:
+        user_id = _current_user.get()
+    if not user_id:
+        return Path(".")
+    return Path("users") / (_SAFE_USER_ID.sub("_", user_id).lstrip(".") or "_")
+
+def user_data_dir(user_id: Optional[str] = None) -> Path:
+    """Directory holding a user's data files (DATA_DIR when there is no user)"""
+    subdir = user_subdir(user_id)
+    return DATA_DIR if subdir == Path(".") else DATA_DIR / subdir
+
+def partition_users() -> List[Optional[str]]:
+    """
+    Users that have a data partition, for jobs that visit every partition::
+    
+        for user_id in partition_users():
+            with user_scope(user_id):
+                sweep_expired_episodes()
+    
+    Returns:
+        None (the shared top-level partition) followed by the user IDs
+        found under users/, sorted
+    """
+    users_dir = DATA_DIR / "users"
+    found = sorted(entry.name for entry in users_dir.iterdir() if entry.is_dir()) if users_dir.is_dir() else []
+    return [None] + found
+
+def current_user() -> Optional[str]:
+    """User whose partition storage calls currently use"""
+    return _current_user.get()
+
+def current_timezone() -> str:
+    """
+    IANA timezone of the user in scope, which sets the partition's day boundaries.
+    
+    Read from the user's profile (``user_tz``); DEFAULT_USER_TIMEZONE when
+    no user is in scope or the profile has none.
+    """
+    user_id = _current_user.get()
+    if user_id:
+        try:
+            # Imported here: the profile store itself builds on this module
+            from profile_and_onboarding.storage import get_profile_store
+            profile = get_profile_store().get_profile(user_id)
+            if profile and profile.user_tz:
+                return profile.user_tz
+        except Exception as e:
+            print(f"Warning: could not read timezone from profile: {e}")
+    return DEFAULT_USER_TIMEZONE
+
+@contextmanager
+def user_scope(user_id: Optional[str]) -> Iterator[None]:
+    """
+    Route every storage call in the block to a user's partition::
+    
+        with user_scope("alice"):
+            create_episode("migraine", fields)
+    
+    Scopes follow contextvars semantics, so concurrent requests in
+    threads or asyncio tasks each keep their own user.
+    """
+    token = _current_user.set(user_id)
+    try:
+        yield
+    finally:
+        _current_user.reset(token)
+
+@contextmanager
+def track_commits() -> Iterator[List["StorageTransaction"]]:
+    """
+    Collect the transactions committed in the block::
+    
+        with track_commits() as commits:
+            run_logger_turn()
+        if not commits:
+            ...  # nothing was written
+    
+    Like user_scope, tracking follows contextvars semantics.
+    """
+    commits: List[StorageTransaction] = []
+    token = _commit_log.set(commits)
+    try:
+        yield commits
+    finally:
+        _commit_log.reset(token)
+
+def _with_user(func):
+    """Accept a user_id keyword that scopes the call to that user's partition"""
+    @functools.wraps(func)
+    def wrapper(*args, user_id: Optional[str] = None, **kwargs):
+        if user_id is None:
+            return func(*args, **kwargs)
+        with user_scope(user_id):
+            return func(*args, **kwargs)
+    return wrapper
+
+def _file(path: Path) -> Path:
+    """A data file's location in the current user's partition"""
+    user_dir = user_data_dir()
+    return path if user_dir == DATA_DIR else user_dir / path.name
 
 def _ensure_data_dir():
-    """Ensure data directory and files exist"""
-    DATA_DIR.mkdir(exist_ok=True)
+    """Ensure the current partition's directory and files exist"""
+    user_data_dir().mkdir(parents=True, exist_ok=True)
     
     # Initialize files if they don't exist
-    if not EPISODES_FILE.exists():
-        EPISODES_FILE.write_text(json.dumps({}, indent=2))
-    if not OBSERVATIONS_FILE.exists():
-        OBSERVATIONS_FILE.write_text(json.dumps([], indent=2))
-    if not INTERVENTIONS_FILE.exists():
-        INTERVENTIONS_FILE.write_text(json.dumps([], indent=2))
-    if not EVENTS_FILE.exists():
-        EVENTS_FILE.touch()
-
-def _load_episodes() -> Dict[str, Dict[str, Any]]:
-    """Load episodes from storage"""
+    create_if_missing(_file(EPISODES_FILE), {})
+    create_if_missing(_file(OBSERVATIONS_FILE), [])
+    create_if_missing(_file(INTERVENTIONS_FILE), [])
+    events_file = _file(EVENTS_FILE)
+    if not events_file.exists():
+        events_file.touch()
+
+def _wal_enabled() -> bool:
+    return STORAGE_MODE == "wal"
+
+def _get_episode_wal() -> EpisodeWAL:
+    """Get the partition's episode WAL, opening it on first use"""
+    episodes_file = _file(EPISODES_FILE)
+    wal = _episode_wals.get(episodes_file)
+    if wal is None:
+        _ensure_data_dir()
+        wal = _episode_wals[episodes_file] = EpisodeWAL(
+            episodes_file, compact_threshold=WAL_COMPACTION_THRESHOLD
+        )
+    return wal
+
+def _index_source_paths() -> List[Path]:
+    """Files whose changes invalidate the open-episode index"""
+    if _wal_enabled():
+        wal = _get_episode_wal()
+        return [wal.snapshot_path, wal.log_path]
+    return [_file(EPISODES_FILE)]
+
+def _get_open_index() -> OpenEpisodeIndex:
+    """
+    Get the open-episode index, reloading or rebuilding it if the episode
+    files were changed outside this process.
+    """
+    source_paths = _index_source_paths()
+    index_file = _file(OPEN_INDEX_FILE)
+    index = _open_indexes.get(_file(EPISODES_FILE))
+    if index is None or index.index_path != index_file or index.source_paths != source_paths:
+        index = _open_indexes[_file(EPISODES_FILE)] = OpenEpisodeIndex(index_file, source_paths)
+    if not index.is_current() and not index.load():
+        index.rebuild(_load_episodes())
+        index.save()
+    return index
+
+def _load_episodes() -> Mapping[str, Dict[str, Any]]:
+    """
+    Load episodes from storage.
+    
+    In JSON mode this is the shared read-only view from data.dataset_cache;
+    use thaw() on a record before changing it.
+    """
+    if _wal_enabled():
+        wal = _get_episode_wal()
+        # Other processes may have appended to or compacted the shared log
+        wal.refresh()
+        return wal.episodes
     _ensure_data_dir()
-    try:
-        with open(EPISODES_FILE, 'r') as f:
-            return json.load(f)
-    except (json.JSONDecodeError, FileNotFoundError):
-        return {}
+    return load_json(_file(EPISODES_FILE), {})
+
+def _episode_keyword_index() -> KeywordIndex:
+    """Keyword index over the committed episodes"""
+    if _wal_enabled():
+        # The WAL keeps episodes in memory rather than in a cached file
+        wal = _get_episode_wal()
+        wal.refresh()
+        cached = _wal_keyword_indexes.get(wal.snapshot_path)
+        if cached is None or cached[0] is not wal or cached[1] != wal.generation:
+            cached = _wal_keyword_indexes[wal.snapshot_path] = (wal, wal.generation, build_episode_index(wal.episodes))
+        return cached[2]
+    _ensure_data_dir()
+    return load_episode_index(_file(EPISODES_FILE))
+
+@_with_user
+def episode_table() -> EpisodeTable:
+    """
+    The partition's episodes sorted by start time, for range queries.
+    
+    In WAL mode the table is built from the in-memory map, so it includes
+    records not yet compacted into episodes.json.
+    """
+    if _wal_enabled():
+        wal = _get_episode_wal()
+        wal.refresh()
+        cached = _wal_episode_tables.get(wal.snapshot_path)
+        if cached is None or cached[0] is not wal or cached[1] != wal.version:
+            cached = _wal_episode_tables[wal.snapshot_path] = (wal, wal.version, build_episode_table(wal.episodes))
+        return cached[2]
+    _ensure_data_dir()
+    return load_episode_table(_file(EPISODES_FILE))
+
+@_with_user
+def observation_keyword_index() -> KeywordIndex:
+    """Keyword index over the partition's observations (rebuilt when observations.json changes)"""
+    _ensure_data_dir()
+    return load_observation_index(_file(OBSERVATIONS_FILE))
+
+@_with_user
+def daily_history_file() -> Path:
+    """The partition's daily history file"""
+    return _file(DAILY_HISTORY_FILE)
+
+@_with_user
+def observation_table() -> TimeTable:
+    """The partition's observations sorted by timestamp, for range queries"""
+    _ensure_data_dir()
+    return load_observation_table(_file(OBSERVATIONS_FILE))
 
 def _save_episodes(episodes: Dict[str, Dict[str, Any]]):
     """Save episodes to storage"""
     _ensure_data_dir()
-    with open(EPISODES_FILE, 'w') as f:
-        json.dump(episodes, f, indent=2, default=str)
+    atomic_write_json(_file(EPISODES_FILE), episodes)
+
+def _load_json_list(path: Path) -> Sequence[Dict[str, Any]]:
+    """Load a JSON list file (observations, interventions) as a read-only view"""
+    return load_json(path, [])
+
+def _stage_json(path: Path, data: Any) -> Path:
+    """Write data to a temp file next to path and return the temp path"""
+    return write_temp(path, json.dumps(data, indent=2, default=str))
+
+# === UNIT OF WORK ===
+
+_tx_state = threading.local()
+
+class StorageTransaction:
+    """
+    Collects the mutations of one logger turn and commits them together.
+    
+    Episode changes are staged as deltas (see data.episode_wal) on a
+    copy-on-write overlay, so reads inside the transaction see its own
+    uncommitted writes. New observations, interventions and events are
+    buffered in memory.
+    
+    On commit the affected files are locked, re-read and the buffered
+    changes are merged onto what is on disk, so concurrent workers do not
+    overwrite each other. Every file is then written at most once: JSON
+    files are staged to temp files and swapped in with os.replace, WAL
+    deltas and events go out in a single append each. If staging fails
+    nothing is swapped in and the transaction is lost.
+    """
+    
+    def __init__(self, user_id: Optional[str] = None):
+        self.user_id = user_id
+        self._base_episodes: Optional[Dict[str, Dict[str, Any]]] = None
+        self._episode_overlay: Dict[str, Dict[str, Any]] = {}
+        self._episode_deltas: List[Dict[str, Any]] = []
+        self._observations: List[Dict[str, Any]] = []
+        self._interventions: List[Dict[str, Any]] = []
+        self._events: List[Dict[str, Any]] = []
+        self._history_tz: Optional[str] = None
+    
+    def episodes(self) -> Mapping[str, Dict[str, Any]]:
+        """Committed episodes with this transaction's changes layered on top"""
+        if self._base_episodes is None:
+            self._base_episodes = _load_episodes()
+        return ChainMap(self._episode_overlay, self._base_episodes)
+    
+    def apply_episode_delta(self, delta: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Stage an episode delta.
+        
+        Returns:
+            The staged episode record after the change, if it exists
+        """
+        episode_id = delta["id"]
+        if delta["op"] == "patch" and episode_id not in self._episode_overlay:
+            committed = self.episodes().get(episode_id)
+            if committed is None:
+                return None
+            # Copy on first write so the committed map stays untouched
+            self._episode_overlay[episode_id] = thaw(committed)
+        apply_delta(self._episode_overlay, delta)
+        self._episode_deltas.append(delta)
+        return self._episode_overlay.get(episode_id)
+    
+    def add_observation(self, record: Dict[str, Any]) -> None:
+        self._observations.append(record)
+    
+    def add_intervention(self, record: Dict[str, Any]) -> None:
+        self._interventions.append(record)
+    
+    def add_event(self, event: Dict[str, Any]) -> None:
+        self._events.append(event)
+    
+    def commit(self) -> None:
+        """Flush all staged changes, one write per file"""
+        if not (self._episode_deltas or self._observations
+                or self._interventions or self._events):
+            return
+        with user_scope(self.user_id):
+            self._commit()
+        commits = _commit_log.get()
+        if commits is not None:
+            commits.append(self)
+    
+    def _commit(self) -> None:
+        _ensure_data_dir()
+        episodes_file = _file(EPISODES_FILE)
+        observations_file = _file(OBSERVATIONS_FILE)
+        interventions_file = _file(INTERVENTIONS_FILE)
+        
+        lock_paths: List[Path] = []
+        if self._episode_deltas:
+            lock_paths.extend(_index_source_paths())
+        if self._observations:
+            lock_paths.append(observations_file)
+        if self._interventions:
+            lock_paths.append(interventions_file)
+        
+        with file_locks(lock_paths):
+            # Sync the index before writing so our own write is not mistaken
+            # for an external change
+            index = _get_open_index() if self._episode_deltas else None
+            
+            # Phase 1: stage every JSON file; nothing visible has changed yet
+            staged: List[Tuple[Path, Path, Any]] = []
+            committed_episodes = None
+            # Keyword indexes already built for the current file versions are
+            # updated in place and carried over to the new versions
+            keyword_indexes: Dict[Path, Dict[str, KeywordIndex]] = {}
+            # What each touched episode contributed to its day before this commit
+            history_before: Dict[str, Any] = {}
+            try:
+                if self._episode_deltas and not _wal_enabled():
+                    committed_episodes = dict(_load_episodes())
+                    history_before = self._day_contributions(committed_episodes)
+                    for episode_id in self._episode_overlay:
+                        if episode_id in committed_episodes:
+                            committed_episodes[episode_id] = thaw(committed_episodes[episode_id])
+                    for delta in self._episode_deltas:
+                        apply_delta(committed_episodes, rebase_delta(committed_episodes, delta))
+                    staged.append((_stage_json(episodes_file, committed_episodes), episodes_file, committed_episodes))
+                    keywords = cached_derived(episodes_file, EPISODE_INDEX)
+                    if keywords is not None:
+                        keyword_indexes[episodes_file] = {EPISODE_INDEX: keywords}
+                if self._observations:
+                    observations = list(_load_json_list(observations_file)) + self._observations
+                    staged.append((_stage_json(observations_file, observations), observations_file, observations))
+                    keywords = cached_derived(observations_file, OBSERVATION_INDEX)
+                    if keywords is not None:
+                        keyword_indexes[observations_file] = {OBSERVATION_INDEX: keywords}
+                if self._interventions:
+                    interventions = list(_load_json_list(interventions_file)) + self._interventions
+                    staged.append((_stage_json(interventions_file, interventions), interventions_file, interventions))
+                if self._episode_deltas and _wal_enabled():
+                    wal = _get_episode_wal()
+                    # Catch up with other writers, then point list pushes at
+                    # the current end of each list as JSON mode does
+                    wal.refresh()
+                    history_before = self._day_contributions(wal.episodes)
+                    scratch = {
+                        episode_id: thaw(wal.episodes[episode_id])
+                        for episode_id in self._episode_overlay if episode_id in wal.episodes
+                    }
+                    deltas = []
+                    for delta in self._episode_deltas:
+                        delta = rebase_delta(scratch, delta)
+                        apply_delta(scratch, delta)
+                        deltas.append(delta)
+                    wal.append_many(deltas)
+                    committed_episodes = wal.episodes
+            except Exception:
+                for temp_path, _, _ in staged:
+                    temp_path.unlink(missing_ok=True)
+                raise
+            
+            # Phase 2: swap the staged files in and hand the new contents to
+            # the shared read cache so readers do not parse them again
+            for temp_path, final_path, data in staged:
+                os.replace(temp_path, final_path)
+                prime(final_path, data, keyword_indexes.get(final_path))
+            
+            self._update_keyword_indexes(keyword_indexes, committed_episodes)
+            
+            if index is not None:
+                for episode_id in self._episode_overlay:
+                    episode = committed_episodes.get(episode_id)
+                    if episode is not None:
+                        index.upsert(episode)
+                index.save()
+            
+            self._update_daily_history(history_before, committed_episodes)
+        
+        if self._events:
+            EventLog(_file(EVENTS_FILE)).append(self._events)
+
+    def _update_keyword_indexes(self, keyword_indexes: Dict[Path, Dict[str, KeywordIndex]],
+                                committed_episodes: Optional[Mapping[str, Dict[str, Any]]]) -> None:
+        """Apply this transaction's records to the carried-over keyword indexes"""
+        episodes_file = _file(EPISODES_FILE)
+        episode_index = keyword_indexes.get(episodes_file, {}).get(EPISODE_INDEX)
+        if _wal_enabled():
+            cached = _wal_keyword_indexes.get(episodes_file)
+            wal = _episode_wals.get(episodes_file)
+            # A commit that also picked up another process's records bumped
+            # the generation; the index is rebuilt on the next read instead
+            current = cached is not None and cached[0] is wal and cached[1] == wal.generation
+            episode_index = cached[2] if current else None
+        if episode_index is not None and committed_episodes is not None:
+            for episode_id in self._episode_overlay:
+                if episode_id in committed_episodes:
+                    index_episode(episode_index, episode_id, committed_episodes[episode_id])
+        
+        observation_index = keyword_indexes.get(_file(OBSERVATIONS_FILE), {}).get(OBSERVATION_INDEX)
+        if observation_index is not None:
+            for observation in self._observations:
+                index_observation(observation_index, observation)
+
+    def _history_timezone(self) -> str:
+        """Timezone whose local days the daily history uses, read once per commit"""
+        if self._history_tz is None:
+            self._history_tz = current_timezone()
+        return self._history_tz
+
+    def _day_contributions(self, episodes: Mapping[str, Dict[str, Any]]) -> Dict[str, Any]:
+        tz = self._history_timezone()
+        return {
+            episode_id: daily_history.episode_contribution(episodes.get(episode_id), tz)
+            for episode_id in self._episode_overlay
+        }
+
+    def _update_daily_history(self, history_before: Dict[str, Any],
+                              committed_episodes: Optional[Mapping[str, Dict[str, Any]]]) -> None:
+        """Fold this transaction's changes into the daily history aggregates"""
+        history_after = self._day_contributions(committed_episodes) if committed_episodes is not None else {}
+        tz = self._history_timezone()
+        try:
+            daily_history.apply_changes(
+                _file(DAILY_HISTORY_FILE),
+                [(history_before.get(episode_id), after) for episode_id, after in history_after.items()],
+                [daily_history.observation_day(observation, tz) for observation in self._observations],
+            )
+        except Exception as e:
+            # The data itself is committed; compile_day can rebuild the history
+            print(f"Warning: could not update daily history: {e}")
+
+def _active_transaction() -> Optional[StorageTransaction]:
+    return getattr(_tx_state, "current", None)
+
+@contextmanager
+def transaction() -> Iterator[StorageTransaction]:
+    """
+    Group storage calls into a single atomic commit.
+    
+    Every write function in this module joins the active transaction when
+    there is one, so a whole logger turn can be wrapped::
+    
+        with transaction():
+            update_episode(episode_id, fields)
+            add_intervention(episode_id, intervention)
+            append_event(...)
+    
+    Nested calls join the outermost transaction. If the block raises,
+    all staged changes are discarded. Outside a transaction each write
+    function commits on its own, as before.
+    
+    A transaction belongs to the user in scope when it starts and commits
+    to that user's partition.
+    """
+    active = _active_transaction()
+    if active is not None:
+        if active.user_id != current_user():
+            raise ValueError(
+                f"Storage call for user {current_user()!r} inside a transaction for {active.user_id!r}"
+            )
+        yield active
+        return
+    
+    tx = StorageTransaction(current_user())
+    _tx_state.current = tx
+    try:
+        yield tx
+    finally:
+        _tx_state.current = None
+    tx.commit()
+
+@_with_user
+def compact_episode_log():
+    """Fold the episode write-ahead log into episodes.json (WAL mode only)"""
+    if _wal_enabled():
+        _get_episode_wal().compact()
 
+@_with_user
 def fetch_open_episode_candidates(window_hours: int = 24) -> List[EpisodeCandidate]:
     """
     Fetch recent open episodes as candidates for linking.
     This tool provides context to the Extractor Agent.
     
+    Reads from the open-episode index, so the cost depends on the number
+    of candidates returned rather than on the total episode history.
+    
     Args:
         window_hours: How far back to look for candidates
         
     Returns:
         List of episode candidates with salient information
     """
-    episodes = _load_episodes()
-    now = datetime.utcnow()
-    candidates = []
-    
-    for episode_id, ep_data in episodes.items():
-        if ep_data.get("status") != "open":
-            continue
-            
-        # Parse last_updated_at
-        last_updated_str = ep_data.get("last_updated_at", ep_data.get("started_at"))
-        if isinstance(last_updated_str, str):
-            try:
-                last_updated = datetime.fromisoformat(last_updated_str.replace('Z', '+00:00'))
-            except ValueError:
-                continue
-        else:
-            last_updated = last_updated_str
-            
-        # Check if within time window
-        if (now - last_updated).total_seconds() <= window_hours * 3600:
-            # Create salient summary
-            salient_parts = []
-            if ep_data.get("current_severity"):
-                salient_parts.append(f"severity {ep_data['current_severity']}")
-            if ep_data.get("notes_log"):
-                # Get most recent note
-                latest_note = ep_data["notes_log"][-1].get("text", "")[:50]
-                if latest_note:
-                    salient_parts.append(latest_note)
-            
-            candidate = EpisodeCandidate(
-                episode_id=episode_id,
-                condition=ep_data["condition"],
-                started_at=ep_data["started_at"],
-                last_updated_at=last_updated_str,
-                current_severity=ep_data.get("current_severity"),
-                salient="; ".join(salient_parts) or "recent episode"
-            )
-            candidates.append(candidate)
-    
-    # Sort by most recent first
-    candidates.sort(key=lambda x: x.last_updated_at, reverse=True)
-    return candidates[:5]  # Limit to top 5 candidates
+    # Lazily close stale episodes first; this only touches expired ones
+    sweep_expired_episodes()
+    
+    index = _get_open_index()
+    now_epoch = iso_to_epoch(datetime.utcnow())
+    
+    return [
+        EpisodeCandidate(
+            episode_id=entry["episode_id"],
+            condition=entry["condition"],
+            started_at=entry["started_at"],
+            last_updated_at=entry["last_updated_at"],
+            current_severity=entry.get("current_severity"),
+            salient=entry["salient"]
+        )
+        for entry in index.recent(window_hours, limit=5, now_epoch=now_epoch)  # Limit to top 5 candidates
+    ]
 
 # normalize_condition is now imported from core.ontology
 
+@_with_user
 def create_episode(condition: str, fields: Dict[str, Any], now: Optional[str] = None) -> str:
     """
     Create a new health episode.
@@ -131,8 +619,6 @@ def create_episode(condition: str, fields: Dict[str, Any], now: Optional[str] =
     else:
         timestamp = datetime.fromisoformat(now) if isinstance(now, str) else now
     
-    episodes = _load_episodes()
-    
     # Generate episode ID
     date_str = timestamp.date().isoformat()
     episode_id = f"ep_{date_str}_{condition}_{uuid.uuid4().hex[:8]}"
@@ -149,14 +635,16 @@ def create_episode(condition: str, fields: Dict[str, Any], now: Optional[str] =
         "severity_points": [{"ts": timestamp.isoformat(), "level": fields["severity"]}] if fields.get("severity") else [],
         "notes_log": [{"ts": timestamp.isoformat(), "text": fields.get("notes")}] if fields.get("notes") else [],
         "interventions": [],
+        "triggers": list(fields.get("triggers") or []),
         "last_updated_at": timestamp.isoformat()
     }
     
-    episodes[episode_id] = episode
-    _save_episodes(episodes)
+    with transaction() as tx:
+        tx.apply_episode_delta({"op": "put", "id": episode_id, "record": episode})
     
     return episode_id
 
+@_with_user
 def update_episode(episode_id: str, fields: Dict[str, Any], now: Optional[str] = None) -> bool:
     """
     Update an existing episode with new data.
@@ -174,43 +662,51 @@ def update_episode(episode_id: str, fields: Dict[str, Any], now: Optional[str] =
     else:
         timestamp = datetime.fromisoformat(now) if isinstance(now, str) else now
     
-    episodes = _load_episodes()
+    with transaction() as tx:
+        episode = tx.episodes().get(episode_id)
+        if episode is None:
+            return False
+        _patch_episode(tx, episode_id, episode, fields, timestamp)
     
-    if episode_id not in episodes:
-        return False
-    
-    episode = episodes[episode_id]
+    return True
+
+def _patch_episode(tx: StorageTransaction, episode_id: str, episode: Dict[str, Any],
+                   fields: Dict[str, Any], timestamp: datetime) -> None:
+    """Stage the severity/notes patch for update_episode"""
+    changes: Dict[str, Any] = {}
+    pushes: Dict[str, Any] = {}
     
     # Update severity if provided
     if fields.get("severity") is not None:
         new_severity = fields["severity"]
-        episode["current_severity"] = new_severity
-        episode["max_severity"] = max(new_severity, episode.get("max_severity", 0))
+        changes["current_severity"] = new_severity
+        changes["max_severity"] = max(new_severity, episode.get("max_severity") or 0)
         
         # Add severity point
-        if "severity_points" not in episode:
-            episode["severity_points"] = []
-        episode["severity_points"].append({
+        pushes["severity_points"] = [len(episode.get("severity_points", [])), {
             "ts": timestamp.isoformat(),
             "level": new_severity
-        })
+        }]
     
     # Add notes if provided
     if fields.get("notes"):
-        if "notes_log" not in episode:
-            episode["notes_log"] = []
-        episode["notes_log"].append({
+        pushes["notes_log"] = [len(episode.get("notes_log", [])), {
             "ts": timestamp.isoformat(),
             "text": fields["notes"]
-        })
+        }]
     
-    episode["last_updated_at"] = timestamp.isoformat()
+    # Merge newly mentioned triggers
+    if fields.get("triggers"):
+        triggers = list(episode.get("triggers") or [])
+        added = [trigger for trigger in fields["triggers"] if trigger not in triggers]
+        if added:
+            changes["triggers"] = triggers + added
     
-    episodes[episode_id] = episode
-    _save_episodes(episodes)
+    changes["last_updated_at"] = timestamp.isoformat()
     
-    return True
+    tx.apply_episode_delta({"op": "patch", "id": episode_id, "set": changes, "push": pushes})
 
+@_with_user
 def add_intervention(episode_id: str, intervention: Dict[str, Any], now: Optional[str] = None) -> str:
     """
     Add an intervention to an episode.
@@ -230,13 +726,6 @@ def add_intervention(episode_id: str, intervention: Dict[str, Any], now: Optiona
     
     intervention_id = f"int_{uuid.uuid4().hex[:8]}"
     
-    # Load interventions file
-    try:
-        with open(INTERVENTIONS_FILE, 'r') as f:
-            interventions = json.load(f)
-    except (json.JSONDecodeError, FileNotFoundError):
-        interventions = []
-    
     # Create intervention record
     intervention_record = {
         "intervention_id": intervention_id,
@@ -248,30 +737,85 @@ def add_intervention(episode_id: str, intervention: Dict[str, Any], now: Optiona
         "notes": intervention.get("notes")
     }
     
-    interventions.append(intervention_record)
+    with transaction() as tx:
+        tx.add_intervention(intervention_record)
+        
+        # Also add to episode
+        episode = tx.episodes().get(episode_id)
+        if episode is not None:
+            tx.apply_episode_delta({
+                "op": "patch",
+                "id": episode_id,
+                "set": {"last_updated_at": timestamp.isoformat()},
+                "push": {"interventions": [len(episode.get("interventions", [])), {
+                    "ts": timestamp.isoformat(),
+                    "type": intervention.get("type"),
+                    "dose": intervention.get("dose"),
+                    "timing": intervention.get("timing"),
+                    "notes": intervention.get("notes")
+                }]}
+            })
     
-    # Save interventions
-    with open(INTERVENTIONS_FILE, 'w') as f:
-        json.dump(interventions, f, indent=2, default=str)
+    return intervention_id
+
+@_with_user
+def close_episode(episode_id: str, ended_at: Optional[str] = None, reason: Optional[str] = None) -> bool:
+    """
+    Close an episode and mark it as resolved.
     
-    # Also add to episode
-    episodes = _load_episodes()
-    if episode_id in episodes:
-        episode = episodes[episode_id]
-        if "interventions" not in episode:
-            episode["interventions"] = []
-        episode["interventions"].append({
-            "ts": timestamp.isoformat(),
-            "type": intervention.get("type"),
-            "dose": intervention.get("dose"),
-            "timing": intervention.get("timing"),
-            "notes": intervention.get("notes")
-        })
-        episode["last_updated_at"] = timestamp.isoformat()
-        _save_episodes(episodes)
+    Args:
+        episode_id: ID of episode to close
+        ended_at: End timestamp (optional, defaults to current time)
+        reason: Why the episode was closed (optional, e.g. "max_duration")
+        
+    Returns:
+        True if the episode was closed
+    """
+    if ended_at is None:
+        ended_at = datetime.utcnow().isoformat()
     
-    return intervention_id
+    changes = {"status": "closed", "ended_at": ended_at, "last_updated_at": ended_at}
+    if reason:
+        changes["close_reason"] = reason
+    
+    with transaction() as tx:
+        return tx.apply_episode_delta({"op": "patch", "id": episode_id, "set": changes}) is not None
 
+@_with_user
+def sweep_expired_episodes(now: Optional[datetime] = None,
+                           max_duration_hours: int = MAX_EPISODE_DURATION_HOURS) -> List[str]:
+    """
+    Auto-close open episodes that started more than max_duration_hours ago.
+    
+    The open-episode index keeps episodes ordered by start time, so a sweep
+    only visits episodes that have actually expired and is effectively free
+    when there are none. Expired episodes are closed with ended_at set to
+    their last recorded activity, all in one transaction, so a sweep
+    rewrites the episode file and index once however many it closes.
+    
+    Args:
+        now: Reference time (optional, defaults to current UTC time)
+        max_duration_hours: Policy window before an episode is auto-closed
+        
+    Returns:
+        IDs of the episodes that were closed
+    """
+    now = now or datetime.utcnow()
+    index = _get_open_index()
+    cutoff = iso_to_epoch(now) - max_duration_hours * 3600
+    
+    closed = []
+    with transaction():
+        for episode_id in index.started_before(cutoff):
+            entry = index.entries[episode_id]
+            if close_episode(episode_id, ended_at=entry["last_updated_at"], reason="max_duration"):
+                closed.append(episode_id)
+            else:
+                # Episode vanished from storage; drop the stale index entry
+                index.remove(episode_id)
+    return closed
+
+@_with_user
 def save_observation(category: str, fields: Dict[str, Any], now: Optional[str] = None) -> str:
     """
     Save a general health observation.
@@ -291,13 +835,6 @@ def save_observation(category: str, fields: Dict[str, Any], now: Optional[str] =
     
     observation_id = f"obs_{uuid.uuid4().hex[:8]}"
     
-    # Load observations
-    try:
-        with open(OBSERVATIONS_FILE, 'r') as f:
-            observations = json.load(f)
-    except (json.JSONDecodeError, FileNotFoundError):
-        observations = []
-    
     # Create observation record
     observation_record = {
         "observation_id": observation_id,
@@ -307,14 +844,12 @@ def save_observation(category: str, fields: Dict[str, Any], now: Optional[str] =
         "notes": fields.get("notes")
     }
     
-    observations.append(observation_record)
-    
-    # Save observations
-    with open(OBSERVATIONS_FILE, 'w') as f:
-        json.dump(observations, f, indent=2, default=str)
+    with transaction() as tx:
+        tx.add_observation(observation_record)
     
     return observation_id
 
+@_with_user
 def append_event(user_text: str, parsed_data: Dict[str, Any], action: str, 
                 model: Optional[str] = None, confidence: Optional[float] = None,
                 episode_id: Optional[str] = None) -> str:
@@ -334,11 +869,6 @@ def append_event(user_text: str, parsed_data: Dict[str, Any], action: str,
     """
     timestamp = datetime.utcnow()
     event_id = f"evt_{uuid.uuid4().hex[:8]}"
-    
-    # Create event hash for idempotency
-    bucket = timestamp.replace(second=0, microsecond=0).isoformat()
-    event_hash = hashlib.sha1((user_text.strip() + bucket).encode()).hexdigest()
-    
     event = {
         "event_id": event_id,
         "timestamp": timestamp.isoformat(),
@@ -348,16 +878,73 @@ def append_event(user_text: str, parsed_data: Dict[str, Any], action: str,
         "model": model,
         "confidence": confidence,
         "episode_id": episode_id,
-        "event_hash": event_hash
+        # Hash of the logged text and minute; not the submission claim key
+        "event_hash": event_hash(user_text, timestamp)
     }
     
     # Append to JSONL file
-    _ensure_data_dir()
-    with open(EVENTS_FILE, 'a') as f:
-        f.write(json.dumps(event, default=str) + '\n')
-    
+    with transaction() as tx:
+        tx.add_event(event)
+
     return event_id
 
+@_with_user
+def get_recent_events(limit: int = 100) -> List[Dict[str, Any]]:
+    """
+    Most recent audit events, newest first.
+
+    Reads the event log from its end, so the cost depends on limit rather
+    than on the size of the log.
+    """
+    return EventLog(_file(EVENTS_FILE)).tail(limit)
+
+@_with_user
+def get_events_since(since: str) -> List[Dict[str, Any]]:
+    """
+    Audit events at or after an ISO timestamp, oldest first.
+
+    Args:
+        since: ISO timestamp of the earliest event to return
+    """
+    since_ts = iso_to_epoch(since)
+    if since_ts is None:
+        raise ValueError(f"Invalid timestamp: {since}")
+    return EventLog(_file(EVENTS_FILE)).since(since_ts)
+
+def _idempotency_index() -> IdempotencyIndex:
+    path = _file(IDEMPOTENCY_FILE)
+    index = _idempotency_indexes.get(path)
+    if index is None:
+        index = _idempotency_indexes[path] = IdempotencyIndex(path)
+    return index
+
+@_with_user
+def claim_submission(text: str, now: Optional[datetime] = None) -> Optional[str]:
+    """
+    Claim a logger submission before any work is done for it.
+
+    The key is event_hash applied to the submission as received (the
+    workflow passes the prompt plus attachment names), so it differs from
+    the event_hash append_event records for the extracted text. A
+    submission whose key was claimed in the same or previous minute is a
+    duplicate.
+
+    Args:
+        text: Submitted message
+        now: Submission time (UTC), defaults to now
+
+    Returns:
+        The claimed key, or None if the submission is a duplicate
+    """
+    hashes = submission_hashes(text, now or datetime.utcnow())
+    return hashes[0] if _idempotency_index().claim(hashes) else None
+
+@_with_user
+def release_submission(key: str) -> None:
+    """Forget a claimed submission so that a retry is not treated as a duplicate"""
+    _idempotency_index().release(key)
+
+@_with_user
 def get_episode_by_id(episode_id: str) -> Optional[Dict[str, Any]]:
     """
     Retrieve episode by ID.
@@ -368,5 +955,56 @@ def get_episode_by_id(episode_id: str) -> Optional[Dict[str, Any]]:
     Returns:
         Episode data or None if not found
     """
+    tx = _active_transaction()
+    episodes = tx.episodes() if tx is not None else _load_episodes()
+    episode = episodes.get(episode_id)
+    if episode is not None:
+        # Hand out a copy so callers cannot mutate shared state
+        return thaw(episode)
+    return episode
+
+@_with_user
+def search_episodes_by_keyword(keyword: str, start: Optional[str] = None,
+                               end: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Find episodes whose notes, triggers or interventions mention a keyword.
+    
+    Each word of the keyword must start a word in the episode's text, so
+    "chees" matches "cheese" but "burger" does not match "cheeseburger".
+    
+    Args:
+        keyword: One or more words to look for
+        start: Only episodes started at or after this ISO timestamp (optional)
+        end: Only episodes started at or before this ISO timestamp (optional)
+        
+    Returns:
+        Matching episodes, most recent first
+    """
+    matches = _episode_keyword_index().lookup(
+        keyword,
+        iso_to_epoch(start) if start else None,
+        iso_to_epoch(end) if end else None,
+    )
     episodes = _load_episodes()
-    return episodes.get(episode_id)
\ No newline at end of file
+    ordered = sorted(matches.items(), key=lambda item: item[1], reverse=True)
+    return [thaw(episodes[episode_id]) for episode_id, _ in ordered if episode_id in episodes]
+
+@_with_user
+def search_observations_by_keyword(keyword: str, start: Optional[str] = None,
+                                   end: Optional[str] = None) -> Dict[str, float]:
+    """
+    Find observations whose notes, category or value mention a keyword.
+    
+    Args:
+        keyword: One or more words to look for (matched as word prefixes)
+        start: Only observations at or after this ISO timestamp (optional)
+        end: Only observations at or before this ISO timestamp (optional)
+        
+    Returns:
+        {observation_id: epoch seconds} for the matching observations
+    """
+    return observation_keyword_index().lookup(
+        keyword,
+        iso_to_epoch(start) if start else None,
+        iso_to_epoch(end) if end else None,
+    )
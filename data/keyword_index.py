@@ -0,0 +1,182 @@
+# data/keyword_index.py
+# Inverted keyword index over observation and episode text
+
+"""
+Inverted index for keyword recall and trigger correlation.
+
+Maps each token to the records containing it, with the record's timestamp,
+so "which observations mention cheese in August" is a postings lookup plus
+a time filter instead of a lowercase-and-substring scan of every record.
+
+Indexed text:
+- observations: ``notes``, ``category`` and a string ``value``
+- episodes: ``notes_log`` texts, ``triggers``, intervention types and notes
+
+Tokens are lowercase alphanumeric runs.  A query token matches every
+indexed token it is a prefix of ("chees" finds "cheese" and
+"cheeseburger"), and multi-word queries require all of their tokens.
+Matches in the middle of a word ("burger" in "cheeseburger") are not found.
+
+One index is kept per data file as a ``dataset_cache`` derived value.  The
+JSON store updates it in place when it commits new records and carries it
+over to the new file version, so it is only built from scratch when a file
+was changed by another process.
+"""
+
+from __future__ import annotations
+
+import bisect
+import re
+from pathlib import Path
+from typing import Any, Dict, FrozenSet, Iterable, List, Mapping, Optional, Sequence, Set, Union
+
+from core.timeutils import iso_to_epoch
+from data.dataset_cache import derived
+
+PathLike = Union[str, Path]
+
+OBSERVATION_INDEX = "observation_keywords"
+EPISODE_INDEX = "episode_keywords"
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Lowercase alphanumeric tokens of text, in order."""
+    if not text or not isinstance(text, str):
+        return []
+    return _TOKEN_RE.findall(text.lower())
+
+
+def observation_terms(observation: Mapping[str, Any]) -> Set[str]:
+    """Tokens indexed for an observation record."""
+    terms = set(tokenize(observation.get("notes")))
+    terms.update(tokenize(observation.get("category")))
+    terms.update(tokenize(observation.get("value")))
+    return terms
+
+
+def episode_terms(episode: Mapping[str, Any]) -> Set[str]:
+    """Tokens indexed for an episode record."""
+    terms: Set[str] = set()
+    for note in episode.get("notes_log") or ():
+        terms.update(tokenize(note.get("text")))
+    triggers = episode.get("triggers") or ()
+    for trigger in ([triggers] if isinstance(triggers, str) else triggers):
+        terms.update(tokenize(trigger))
+    for intervention in episode.get("interventions") or ():
+        terms.update(tokenize(intervention.get("type")))
+        terms.update(tokenize(intervention.get("notes")))
+    return terms
+
+
+class KeywordIndex:
+    """
+    Token -> {record_id: epoch} postings with a forward map for updates.
+    """
+
+    def __init__(self):
+        self.postings: Dict[str, Dict[str, float]] = {}
+        self._terms: Dict[str, FrozenSet[str]] = {}
+        self._vocabulary: Optional[List[str]] = None
+
+    def __len__(self) -> int:
+        return len(self._terms)
+
+    def add(self, record_id: str, terms: Iterable[str], ts: float) -> None:
+        """Index a record, replacing whatever was indexed for it before."""
+        self.remove(record_id)
+        terms = frozenset(terms)
+        self._terms[record_id] = terms
+        for term in terms:
+            postings = self.postings.get(term)
+            if postings is None:
+                postings = self.postings[term] = {}
+                self._vocabulary = None
+            postings[record_id] = ts
+
+    def remove(self, record_id: str) -> None:
+        """Drop a record from the index."""
+        for term in self._terms.pop(record_id, ()):
+            postings = self.postings.get(term)
+            if postings is None:
+                continue
+            postings.pop(record_id, None)
+            if not postings:
+                del self.postings[term]
+                self._vocabulary = None
+
+    def _expand(self, token: str) -> List[str]:
+        """Indexed tokens that start with token."""
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self.postings)
+        vocabulary = self._vocabulary
+        start = bisect.bisect_left(vocabulary, token)
+        end = bisect.bisect_left(vocabulary, token + "\uffff")
+        return vocabulary[start:end]
+
+    def lookup(self, keyword: str, start_ts: Optional[float] = None,
+               end_ts: Optional[float] = None) -> Dict[str, float]:
+        """
+        Records matching every token of keyword, optionally within a time range.
+
+        Returns:
+            {record_id: epoch} for the matching records
+        """
+        tokens = tokenize(keyword)
+        if not tokens:
+            return {}
+        result: Optional[Dict[str, float]] = None
+        for token in sorted(set(tokens), key=len, reverse=True):
+            matches: Dict[str, float] = {}
+            for term in self._expand(token):
+                matches.update(self.postings[term])
+            result = matches if result is None else {rid: ts for rid, ts in result.items() if rid in matches}
+            if not result:
+                return {}
+        if start_ts is not None or end_ts is not None:
+            low = float("-inf") if start_ts is None else start_ts
+            high = float("inf") if end_ts is None else end_ts
+            result = {rid: ts for rid, ts in result.items() if low <= ts <= high}
+        return result
+
+
+def _record_epoch(value: Any) -> float:
+    ts = iso_to_epoch(value) if value else None
+    return ts if ts is not None else float("nan")
+
+
+def index_observation(index: KeywordIndex, observation: Mapping[str, Any],
+                      record_id: Optional[str] = None) -> None:
+    record_id = record_id or observation.get("observation_id")
+    if record_id:
+        index.add(record_id, observation_terms(observation), _record_epoch(observation.get("timestamp")))
+
+
+def index_episode(index: KeywordIndex, episode_id: str, episode: Mapping[str, Any]) -> None:
+    index.add(episode_id, episode_terms(episode), _record_epoch(episode.get("started_at")))
+
+
+def build_observation_index(observations: Sequence[Mapping[str, Any]]) -> KeywordIndex:
+    """Index every observation; records without an ID are keyed by position."""
+    index = KeywordIndex()
+    for position, observation in enumerate(observations):
+        index_observation(index, observation, observation.get("observation_id") or f"#{position}")
+    return index
+
+
+def build_episode_index(episodes: Mapping[str, Mapping[str, Any]]) -> KeywordIndex:
+    index = KeywordIndex()
+    for episode_id, episode in episodes.items():
+        index_episode(index, episode_id, episode)
+    return index
+
+
+def load_observation_index(path: PathLike) -> KeywordIndex:
+    """Keyword index for the current version of an observations file."""
+    return derived(path, OBSERVATION_INDEX, build_observation_index, [])
+
+
+def load_episode_index(path: PathLike) -> KeywordIndex:
+    """Keyword index for the current version of an episodes file."""
+    return derived(path, EPISODE_INDEX, build_episode_index, {})
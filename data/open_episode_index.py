@@ -0,0 +1,217 @@
+# data/open_episode_index.py
+# Persistent index of open episodes ordered by last-update time
+
+"""
+Open-episode index for candidate lookup.
+
+Episode linking runs on every logger turn and only ever needs the handful
+of most recently updated open episodes.  This index keeps exactly those:
+one compact entry per open episode plus a list sorted by last-update epoch,
+so the newest ``k`` candidates are read from the tail in O(k).  A second
+list ordered by start time lets the auto-close sweeper visit only the
+episodes that have actually exceeded the maximum duration.
+
+The index is maintained incrementally by the JSON store on every episode
+write and persisted next to the data files.  It records the signature
+(mtime, size) of the source files it was built from; if another process
+changed them behind our back, the index is rebuilt from the episodes.
+"""
+
+from __future__ import annotations
+
+import bisect
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from core.timeutils import iso_to_epoch
+from data.file_io import atomic_write_text
+
+INDEX_VERSION = 2
+
+
+def file_signature(paths: Sequence[Path]) -> List[Optional[List[int]]]:
+    """Return (mtime_ns, size) for each path, or None if it is missing."""
+    signature = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            signature.append([stat.st_mtime_ns, stat.st_size])
+        except FileNotFoundError:
+            signature.append(None)
+    return signature
+
+
+def _salient_summary(episode: Dict[str, Any]) -> str:
+    """Brief summary of an episode for LLM context"""
+    salient_parts = []
+    if episode.get("current_severity"):
+        salient_parts.append(f"severity {episode['current_severity']}")
+    if episode.get("notes_log"):
+        # Get most recent note
+        latest_note = (episode["notes_log"][-1].get("text") or "")[:50]
+        if latest_note:
+            salient_parts.append(latest_note)
+    return "; ".join(salient_parts) or "recent episode"
+
+
+def _remove_sorted(items: List[Tuple[float, str]], key: Tuple[float, str]) -> None:
+    pos = bisect.bisect_left(items, key)
+    if pos < len(items) and items[pos] == key:
+        del items[pos]
+
+
+class OpenEpisodeIndex:
+    """
+    Incrementally maintained index of open episodes.
+
+    ``entries`` maps episode ID to a candidate summary; ``_order`` holds
+    ``(last_updated_epoch, episode_id)`` tuples and ``_by_start`` holds
+    ``(started_epoch, episode_id)`` tuples, both in ascending order.
+    """
+
+    def __init__(self, index_path: Path, source_paths: Sequence[Path]):
+        self.index_path = Path(index_path)
+        self.source_paths = [Path(p) for p in source_paths]
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self._order: List[Tuple[float, str]] = []
+        self._by_start: List[Tuple[float, str]] = []
+        self._signature: Optional[List[Optional[List[int]]]] = None
+
+    # === MAINTENANCE ===
+
+    def upsert(self, episode: Dict[str, Any]) -> None:
+        """Add, reposition or drop an episode depending on its status."""
+        episode_id = episode.get("episode_id")
+        if not episode_id:
+            return
+        self._discard(episode_id)
+        if episode.get("status") != "open":
+            return
+
+        last_updated_at = episode.get("last_updated_at", episode.get("started_at"))
+        ts = iso_to_epoch(last_updated_at) if last_updated_at else None
+        if ts is None:
+            return
+        start_ts = iso_to_epoch(episode.get("started_at")) if episode.get("started_at") else None
+        if start_ts is None:
+            start_ts = ts
+
+        self.entries[episode_id] = {
+            "episode_id": episode_id,
+            "condition": episode.get("condition"),
+            "started_at": episode.get("started_at"),
+            "last_updated_at": last_updated_at,
+            "current_severity": episode.get("current_severity"),
+            "salient": _salient_summary(episode),
+            "ts": ts,
+            "start_ts": start_ts,
+        }
+        bisect.insort(self._order, (ts, episode_id))
+        bisect.insort(self._by_start, (start_ts, episode_id))
+
+    def remove(self, episode_id: str) -> None:
+        """Drop an episode from the index."""
+        self._discard(episode_id)
+
+    def _discard(self, episode_id: str) -> None:
+        entry = self.entries.pop(episode_id, None)
+        if entry is None:
+            return
+        _remove_sorted(self._order, (entry["ts"], episode_id))
+        _remove_sorted(self._by_start, (entry["start_ts"], episode_id))
+
+    def rebuild(self, episodes: Dict[str, Dict[str, Any]]) -> None:
+        """Rebuild the index from a full episode map."""
+        self.entries = {}
+        self._order = []
+        self._by_start = []
+        for episode_id, episode in episodes.items():
+            if episode.get("status") == "open":
+                self.upsert({"episode_id": episode_id, **episode})
+
+    # === QUERIES ===
+
+    def recent(self, window_hours: float, limit: int, now_epoch: float) -> List[Dict[str, Any]]:
+        """
+        Most recently updated open episodes within the window, newest first.
+
+        Walks the sorted order from the tail, so the cost is O(limit)
+        regardless of how many episodes have ever been recorded.
+        """
+        cutoff = now_epoch - window_hours * 3600
+        results = []
+        for ts, episode_id in reversed(self._order):
+            if ts < cutoff or len(results) >= limit:
+                break
+            results.append(self.entries[episode_id])
+        return results
+
+    def started_before(self, cutoff_epoch: float) -> List[str]:
+        """
+        IDs of open episodes that started at or before the cutoff.
+
+        Walks the start-ordered list from the head and stops at the first
+        episode that is still within the window, so the cost is O(expired).
+        """
+        expired = []
+        for start_ts, episode_id in self._by_start:
+            if start_ts > cutoff_epoch:
+                break
+            expired.append(episode_id)
+        return expired
+
+    def open_episode_ids(self) -> List[str]:
+        """IDs of all indexed open episodes, oldest update first."""
+        return [episode_id for _, episode_id in self._order]
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    # === PERSISTENCE ===
+
+    def is_current(self) -> bool:
+        """True if the source files are unchanged since the index was synced."""
+        return self._signature is not None and self._signature == file_signature(self.source_paths)
+
+    def load(self) -> bool:
+        """
+        Load the persisted index if it matches the current source files.
+
+        Returns:
+            True if the index was loaded, False if it needs a rebuild
+        """
+        if not self.index_path.exists():
+            return False
+        try:
+            with open(self.index_path, 'r') as f:
+                payload = json.load(f)
+        except (json.JSONDecodeError, IOError):
+            return False
+        if payload.get("version") != INDEX_VERSION:
+            return False
+        if payload.get("source_signature") != file_signature(self.source_paths):
+            return False
+
+        self.entries = {}
+        self._order = []
+        self._by_start = []
+        for entry in payload.get("entries", []):
+            self.entries[entry["episode_id"]] = entry
+            self._order.append((entry["ts"], entry["episode_id"]))
+            self._by_start.append((entry["start_ts"], entry["episode_id"]))
+        self._order.sort()
+        self._by_start.sort()
+        self._signature = payload["source_signature"]
+        return True
+
+    def save(self) -> None:
+        """Persist the index, stamped with the current source signature."""
+        self._signature = file_signature(self.source_paths)
+        payload = {
+            "version": INDEX_VERSION,
+            "source_signature": self._signature,
+            "entries": [self.entries[episode_id] for _, episode_id in self._order],
+        }
+        atomic_write_text(self.index_path, json.dumps(payload, default=str))
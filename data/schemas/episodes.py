@@ -106,6 +106,13 @@ class CorrelationDetail(BaseModel):
     observation_timestamp: str
     matched_episode_id: str
     hours_difference: float
+    lag_hours: Optional[float] = Field(default=None, description="Episode start minus observation time; positive when the observation came first")
+
+class LagBin(BaseModel):
+    """Count of observation/episode pairs whose lag falls in a range"""
+    from_hours: float
+    to_hours: float
+    count: int
 
 class CorrelationResult(BaseModel):
     """Result of correlation analysis between observations and episodes"""
@@ -113,4 +120,21 @@ class CorrelationResult(BaseModel):
     episodes_with_correlation: int
     correlation_found: bool
     details: List[CorrelationDetail] = Field(default_factory=list)
-    conclusion: str
\ No newline at end of file
+    conclusion: str
+    observed_rate: Optional[float] = Field(default=None, description="Share of observations with an episode within the window")
+    baseline_rate: Optional[float] = Field(default=None, description="Same share with observation times shuffled")
+    lift: Optional[float] = Field(default=None, description="observed_rate / baseline_rate")
+    p_value: Optional[float] = Field(default=None, description="Share of shuffles at least as strong as the real data")
+    lag_histogram: List[LagBin] = Field(default_factory=list)
+
+class TrendBucket(BaseModel):
+    """Weekly or monthly totals for one condition"""
+    period: str  # e.g. "2025-W32" or "2025-08"
+    period_start: str
+    period_end: str
+    condition: str
+    episodes: int
+    days_with_episodes: int
+    avg_pain: Optional[float] = None
+    max_pain: Optional[int] = None
+    interventions: Dict[str, int] = Field(default_factory=dict, description="Intervention type -> times used")
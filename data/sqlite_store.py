@@ -0,0 +1,597 @@
+# data/sqlite_store.py
+# SQLite implementation of the health data storage interface
+
+"""
+SQLite backend for health data.
+
+Implements :class:`data.storage_interface.HealthDataStorage` on a single
+SQLite database in WAL mode.  Scalar columns that queries filter on are
+stored as real columns with indexes; the full episode record (severity
+points, notes log, interventions) is kept as a JSON document alongside so
+that records round-trip in the same shape as ``episodes.json``.
+
+Usage:
+    python -m data.sqlite_store import [--db data/health.db] [--data-dir data] [--user ID]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sqlite3
+import threading
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from data.event_log import EventLog
+from data.json_store import user_subdir
+from data.storage_interface import HealthDataStorage
+from core.policies import DATA_FILES
+
+DEFAULT_DB_PATH = Path(DATA_FILES["sqlite_db"])
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS episodes (
+    episode_id TEXT PRIMARY KEY,
+    condition TEXT NOT NULL,
+    started_at TEXT NOT NULL,
+    ended_at TEXT,
+    status TEXT NOT NULL DEFAULT 'open',
+    current_severity INTEGER,
+    max_severity INTEGER,
+    location TEXT,
+    last_updated_at TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_episodes_condition_started
+    ON episodes (condition, started_at);
+CREATE INDEX IF NOT EXISTS idx_episodes_status_updated
+    ON episodes (status, last_updated_at);
+
+CREATE TABLE IF NOT EXISTS observations (
+    observation_id TEXT PRIMARY KEY,
+    timestamp TEXT NOT NULL,
+    category TEXT,
+    value TEXT,
+    location TEXT,
+    notes TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_observations_timestamp
+    ON observations (timestamp);
+
+CREATE TABLE IF NOT EXISTS interventions (
+    intervention_id TEXT PRIMARY KEY,
+    episode_id TEXT,
+    timestamp TEXT NOT NULL,
+    type TEXT,
+    dose TEXT,
+    timing TEXT,
+    notes TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_interventions_episode
+    ON interventions (episode_id, timestamp);
+
+CREATE TABLE IF NOT EXISTS events (
+    event_id TEXT PRIMARY KEY,
+    timestamp TEXT NOT NULL,
+    event_type TEXT,
+    episode_id TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_events_timestamp
+    ON events (timestamp);
+"""
+
+
+def _normalize_ts(value: Any) -> Optional[str]:
+    """
+    Normalize a timestamp to a naive UTC ISO string.
+
+    All timestamps are stored in one format so that range queries can
+    compare the indexed TEXT columns lexicographically.
+    """
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        dt = value
+    else:
+        try:
+            dt = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+        except ValueError:
+            return str(value)
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt.isoformat()
+
+
+def _now_iso() -> str:
+    return datetime.utcnow().isoformat()
+
+
+class SqliteHealthStorage(HealthDataStorage):
+    """
+    SQLite storage backend with indexed range queries.
+
+    A single connection is shared across threads and serialized with a lock,
+    which is sufficient for the write volume of a chat application.
+    """
+
+    def __init__(self, db_path: Path = DEFAULT_DB_PATH):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+
+    def close(self):
+        """Close the underlying connection."""
+        with self._lock:
+            self._conn.close()
+
+    # === INTERNAL HELPERS ===
+
+    def _episode_from_row(self, row: sqlite3.Row) -> Dict[str, Any]:
+        return json.loads(row["data"])
+
+    def _write_episode(self, episode: Dict[str, Any]):
+        """Insert or replace an episode row from its full record."""
+        self._conn.execute(
+            """
+            INSERT OR REPLACE INTO episodes (
+                episode_id, condition, started_at, ended_at, status,
+                current_severity, max_severity, location, last_updated_at, data
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                episode["episode_id"],
+                episode.get("condition") or "general",
+                _normalize_ts(episode.get("started_at")),
+                _normalize_ts(episode.get("ended_at")),
+                episode.get("status") or "open",
+                episode.get("current_severity"),
+                episode.get("max_severity"),
+                episode.get("location"),
+                _normalize_ts(episode.get("last_updated_at") or episode.get("started_at")),
+                json.dumps(episode, default=str),
+            ),
+        )
+
+    def _write_observation(self, observation: Dict[str, Any]):
+        self._conn.execute(
+            """
+            INSERT OR REPLACE INTO observations (
+                observation_id, timestamp, category, value, location, notes, data
+            ) VALUES (?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                observation["observation_id"],
+                _normalize_ts(observation.get("timestamp")),
+                observation.get("category") or observation.get("type"),
+                None if observation.get("value") is None else str(observation.get("value")),
+                observation.get("location"),
+                observation.get("notes"),
+                json.dumps(observation, default=str),
+            ),
+        )
+
+    def _write_intervention(self, intervention: Dict[str, Any]):
+        self._conn.execute(
+            """
+            INSERT OR REPLACE INTO interventions (
+                intervention_id, episode_id, timestamp, type, dose, timing, notes
+            ) VALUES (?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                intervention["intervention_id"],
+                intervention.get("episode_id"),
+                _normalize_ts(intervention.get("timestamp")),
+                intervention.get("type"),
+                intervention.get("dose"),
+                intervention.get("timing"),
+                intervention.get("notes"),
+            ),
+        )
+
+    def _write_event(self, event: Dict[str, Any]):
+        self._conn.execute(
+            """
+            INSERT OR REPLACE INTO events (event_id, timestamp, event_type, episode_id, data)
+            VALUES (?, ?, ?, ?, ?)
+            """,
+            (
+                event["event_id"],
+                _normalize_ts(event.get("timestamp")),
+                event.get("event_type") or event.get("action"),
+                event.get("episode_id"),
+                json.dumps(event, default=str),
+            ),
+        )
+
+    # === EPISODE OPERATIONS ===
+
+    def create_episode(self, condition: str, started_at: str, current_severity: int,
+                      location: Optional[str] = None, notes: Optional[str] = None) -> str:
+        started = _normalize_ts(started_at) or _now_iso()
+        episode_id = f"ep_{started[:10]}_{condition}_{uuid.uuid4().hex[:8]}"
+        episode = {
+            "episode_id": episode_id,
+            "condition": condition,
+            "started_at": started,
+            "ended_at": None,
+            "status": "open",
+            "current_severity": current_severity,
+            "max_severity": current_severity,
+            "location": location,
+            "severity_points": [{"ts": started, "level": current_severity}] if current_severity else [],
+            "notes_log": [{"ts": started, "text": notes}] if notes else [],
+            "interventions": [],
+            "last_updated_at": started,
+        }
+        with self._lock, self._conn:
+            self._write_episode(episode)
+        return episode_id
+
+    def get_episode_by_id(self, episode_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM episodes WHERE episode_id = ?", (episode_id,)
+            ).fetchone()
+        return self._episode_from_row(row) if row else None
+
+    def update_episode(self, episode_id: str, **updates) -> bool:
+        """
+        Update an episode.
+
+        ``severity``/``current_severity`` append a severity point and
+        ``notes`` appends to the notes log; any other key is set directly.
+        """
+        with self._lock, self._conn:
+            episode = self.get_episode_by_id(episode_id)
+            if episode is None:
+                return False
+
+            now = _normalize_ts(updates.pop("now", None)) or _now_iso()
+            severity = updates.pop("severity", None)
+            if severity is None:
+                severity = updates.pop("current_severity", None)
+            if severity is not None:
+                episode["current_severity"] = severity
+                episode["max_severity"] = max(severity, episode.get("max_severity") or 0)
+                episode.setdefault("severity_points", []).append({"ts": now, "level": severity})
+
+            notes = updates.pop("notes", None)
+            if notes:
+                episode.setdefault("notes_log", []).append({"ts": now, "text": notes})
+
+            episode.update(updates)
+            episode["last_updated_at"] = now
+            self._write_episode(episode)
+        return True
+
+    def find_latest_open_episode(self, condition: str, window_hours: int = 12) -> Optional[Dict[str, Any]]:
+        cutoff = (datetime.utcnow() - timedelta(hours=window_hours)).isoformat()
+        with self._lock:
+            row = self._conn.execute(
+                """
+                SELECT data FROM episodes
+                WHERE status = 'open' AND last_updated_at >= ? AND condition = ?
+                ORDER BY last_updated_at DESC LIMIT 1
+                """,
+                (cutoff, condition),
+            ).fetchone()
+        return self._episode_from_row(row) if row else None
+
+    def fetch_open_episode_candidates(self, window_hours: int = 24) -> List[Dict[str, Any]]:
+        cutoff = (datetime.utcnow() - timedelta(hours=window_hours)).isoformat()
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT data FROM episodes
+                WHERE status = 'open' AND last_updated_at >= ?
+                ORDER BY last_updated_at DESC LIMIT 5
+                """,
+                (cutoff,),
+            ).fetchall()
+        return [self._episode_from_row(row) for row in rows]
+
+    def close_episode(self, episode_id: str, ended_at: Optional[str] = None) -> bool:
+        ended = _normalize_ts(ended_at) or _now_iso()
+        return self.update_episode(episode_id, status="closed", ended_at=ended, now=ended)
+
+    # === OBSERVATION OPERATIONS ===
+
+    def save_observation(self, timestamp: str, observation_type: str, value: str,
+                        location: Optional[str] = None, notes: Optional[str] = None) -> str:
+        observation = {
+            "observation_id": f"obs_{uuid.uuid4().hex[:8]}",
+            "timestamp": _normalize_ts(timestamp) or _now_iso(),
+            "category": observation_type,
+            "value": value,
+            "location": location,
+            "notes": notes,
+        }
+        with self._lock, self._conn:
+            self._write_observation(observation)
+        return observation["observation_id"]
+
+    def get_observations_in_range(self, start_time: str, end_time: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT data FROM observations
+                WHERE timestamp >= ? AND timestamp <= ?
+                ORDER BY timestamp
+                """,
+                (_normalize_ts(start_time), _normalize_ts(end_time)),
+            ).fetchall()
+        return [json.loads(row["data"]) for row in rows]
+
+    # === INTERVENTION OPERATIONS ===
+
+    def add_intervention(self, episode_id: str, intervention_type: str,
+                        dosage: Optional[str] = None, timing: Optional[str] = None,
+                        notes: Optional[str] = None) -> bool:
+        now = _now_iso()
+        with self._lock, self._conn:
+            episode = self.get_episode_by_id(episode_id)
+            if episode is None:
+                return False
+            self._write_intervention({
+                "intervention_id": f"int_{uuid.uuid4().hex[:8]}",
+                "episode_id": episode_id,
+                "timestamp": now,
+                "type": intervention_type,
+                "dose": dosage,
+                "timing": timing,
+                "notes": notes,
+            })
+            episode.setdefault("interventions", []).append({
+                "ts": now,
+                "type": intervention_type,
+                "dose": dosage,
+                "timing": timing,
+                "notes": notes,
+            })
+            episode["last_updated_at"] = now
+            self._write_episode(episode)
+        return True
+
+    def get_episode_interventions(self, episode_id: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM interventions WHERE episode_id = ? ORDER BY timestamp",
+                (episode_id,),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    # === EVENT LOG OPERATIONS ===
+
+    def append_event(self, event_type: str, data: Dict[str, Any],
+                    episode_id: Optional[str] = None) -> bool:
+        event = {
+            "event_id": f"evt_{uuid.uuid4().hex[:8]}",
+            "timestamp": _now_iso(),
+            "event_type": event_type,
+            "episode_id": episode_id,
+            "data": data,
+        }
+        with self._lock, self._conn:
+            self._write_event(event)
+        return True
+
+    def get_recent_events(self, limit: int = 100) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT data FROM events ORDER BY timestamp DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [json.loads(row["data"]) for row in rows]
+
+    # === QUERY OPERATIONS ===
+
+    def get_episodes_in_range(self, start_time: str, end_time: str,
+                             condition: Optional[str] = None) -> List[Dict[str, Any]]:
+        params: List[Any] = [_normalize_ts(start_time), _normalize_ts(end_time)]
+        if condition:
+            query = """
+                SELECT data FROM episodes
+                WHERE condition = ? AND started_at >= ? AND started_at <= ?
+                ORDER BY started_at
+            """
+            params.insert(0, condition)
+        else:
+            query = """
+                SELECT data FROM episodes
+                WHERE started_at >= ? AND started_at <= ?
+                ORDER BY started_at
+            """
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [self._episode_from_row(row) for row in rows]
+
+    def search_episodes_by_keyword(self, keyword: str) -> List[Dict[str, Any]]:
+        """
+        Episodes whose condition, notes, triggers or interventions contain keyword.
+
+        Only the text values are searched, not the whole JSON document, so
+        a keyword such as "notes" or "severity" does not match key names.
+        """
+        escaped = keyword.lower().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        with self._lock:
+            rows = self._conn.execute(
+                r"""
+                SELECT e.data FROM episodes e
+                WHERE lower(e.condition) LIKE :pattern ESCAPE '\'
+                   OR EXISTS (
+                        SELECT 1 FROM json_each(e.data, '$.notes_log') note
+                        WHERE lower(json_extract(note.value, '$.text')) LIKE :pattern ESCAPE '\')
+                   OR EXISTS (
+                        SELECT 1 FROM json_each(e.data, '$.triggers') trigger
+                        WHERE lower(trigger.value) LIKE :pattern ESCAPE '\')
+                   OR EXISTS (
+                        SELECT 1 FROM interventions i
+                        WHERE i.episode_id = e.episode_id
+                          AND (lower(i.type) LIKE :pattern ESCAPE '\'
+                               OR lower(i.notes) LIKE :pattern ESCAPE '\'))
+                ORDER BY e.started_at DESC
+                """,
+                {"pattern": f"%{escaped}%"},
+            ).fetchall()
+        return [self._episode_from_row(row) for row in rows]
+
+    # === MAINTENANCE OPERATIONS ===
+
+    def backup_data(self, backup_path: str) -> bool:
+        try:
+            target = sqlite3.connect(backup_path)
+            with self._lock:
+                self._conn.backup(target)
+            target.close()
+            return True
+        except sqlite3.Error as e:
+            print(f"Error backing up database: {e}")
+            return False
+
+    def get_storage_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = {
+                table: self._conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                for table in ("episodes", "observations", "interventions", "events")
+            }
+            open_episodes = self._conn.execute(
+                "SELECT COUNT(*) FROM episodes WHERE status = 'open'"
+            ).fetchone()[0]
+        return {
+            "backend": "sqlite",
+            "db_path": str(self.db_path),
+            "db_size_bytes": self.db_path.stat().st_size if self.db_path.exists() else 0,
+            "open_episodes": open_episodes,
+            **counts,
+        }
+
+
+# === ONE-SHOT IMPORTER ===
+
+def _read_json_file(path: Path, default):
+    if not path.exists():
+        return default
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except json.JSONDecodeError:
+        return default
+
+
+def import_json_data(storage: SqliteHealthStorage, data_dir: Path = Path("data"),
+                     user_id: Optional[str] = None, shared_only: bool = False) -> Dict[str, int]:
+    """
+    Import the JSON data files into a SQLite store in a single transaction.
+
+    Re-running the import is safe: rows are keyed by their existing IDs and
+    replaced rather than duplicated.
+
+    A SQLite store holds one user's data, while a JSON data directory may
+    hold a partition per user under users/<user_id>/ (see
+    data.json_store.user_scope).  Import each partition into its own store
+    with user_id; a tree with partitions is rejected unless one is chosen,
+    so users are never skipped or mixed silently.
+
+    Args:
+        storage: Target SQLite store
+        data_dir: Data directory containing episodes.json, observations.json,
+            interventions.json and events.jsonl
+        user_id: Import this user's partition instead of the shared files
+        shared_only: Import the shared top-level files even though the
+            tree has user partitions
+
+    Returns:
+        Number of records imported per table
+
+    Raises:
+        ValueError: If data_dir has user partitions and neither user_id
+            nor shared_only selects what to import
+    """
+    data_dir = Path(data_dir)
+    if user_id is not None:
+        data_dir = data_dir / user_subdir(user_id)
+        if not data_dir.is_dir():
+            raise ValueError(f"No data partition for user {user_id!r} in {data_dir.parent}")
+    elif not shared_only:
+        users_dir = data_dir / "users"
+        partitions = sorted(p.name for p in users_dir.iterdir() if p.is_dir()) if users_dir.is_dir() else []
+        if partitions:
+            raise ValueError(
+                f"{data_dir} has user partitions ({', '.join(partitions)}); import each with "
+                "user_id into its own database, or pass shared_only for the top-level files"
+            )
+    episodes = _read_json_file(data_dir / "episodes.json", {})
+    observations = _read_json_file(data_dir / "observations.json", [])
+    interventions = _read_json_file(data_dir / "interventions.json", [])
+
+    # Includes rotated (and compressed) event segments
+    events = list(EventLog(data_dir / "events.jsonl").iter_all())
+
+    counts = {"episodes": 0, "observations": 0, "interventions": 0, "events": 0}
+    with storage._lock, storage._conn:
+        for episode_id, episode in episodes.items():
+            if not episode.get("started_at"):
+                continue
+            episode.setdefault("episode_id", episode_id)
+            storage._write_episode(episode)
+            counts["episodes"] += 1
+        for observation in observations:
+            if not observation.get("observation_id") or not observation.get("timestamp"):
+                continue
+            storage._write_observation(observation)
+            counts["observations"] += 1
+        for intervention in interventions:
+            if not intervention.get("intervention_id") or not intervention.get("timestamp"):
+                continue
+            storage._write_intervention(intervention)
+            counts["interventions"] += 1
+        for event in events:
+            if not event.get("event_id") or not event.get("timestamp"):
+                continue
+            storage._write_event(event)
+            counts["events"] += 1
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SQLite health data store utilities")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = subparsers.add_parser("import", help="Import JSON data files into SQLite")
+    import_parser.add_argument("--db", default=str(DEFAULT_DB_PATH), help="SQLite database path")
+    import_parser.add_argument("--data-dir", default="data", help="Directory with the JSON data files")
+    import_parser.add_argument("--user", default=None, help="Import this user's partition (data/users/<id>)")
+    import_parser.add_argument("--shared-only", action="store_true",
+                               help="Import only the shared top-level files of a partitioned tree")
+
+    stats_parser = subparsers.add_parser("stats", help="Print storage statistics")
+    stats_parser.add_argument("--db", default=str(DEFAULT_DB_PATH), help="SQLite database path")
+
+    args = parser.parse_args()
+    storage = SqliteHealthStorage(Path(args.db))
+    try:
+        if args.command == "import":
+            try:
+                counts = import_json_data(storage, Path(args.data_dir), user_id=args.user,
+                                          shared_only=args.shared_only)
+            except ValueError as e:
+                parser.error(str(e))
+            print(f"Imported into {args.db}: " + ", ".join(f"{k}={v}" for k, v in counts.items()))
+        else:
+            print(json.dumps(storage.get_storage_stats(), indent=2))
+    finally:
+        storage.close()
+
+
+if __name__ == "__main__":
+    main()
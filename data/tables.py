@@ -0,0 +1,131 @@
+# data/tables.py
+# Time-sorted table views over episodes and observations
+
+"""
+Pre-parsed, time-sorted tables for range queries.
+
+Range filters in the recall tools and daily history used to loop over every
+record and call ``datetime.fromisoformat`` on each timestamp.  A table
+parses each timestamp once into an ``array('d')`` of epoch seconds, sorted
+ascending, with the records and their IDs in parallel lists.  A time range
+is then two ``bisect`` calls and a slice.
+
+Tables are built from the read-only views in ``data.dataset_cache`` and
+cached alongside them with ``derived``, so they are rebuilt only when the
+underlying file changes.  Timestamps are interpreted like
+``core.timeutils.iso_to_epoch``: naive values are UTC.
+"""
+
+from __future__ import annotations
+
+import bisect
+from array import array
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple, Union
+
+from core.timeutils import iso_to_epoch
+from data.dataset_cache import derived
+
+PathLike = Union[str, Path]
+
+
+class TimeTable:
+    """
+    Records sorted by a timestamp column.
+
+    ``ts`` holds epoch seconds in ascending order; ``keys`` and ``records``
+    are the matching record IDs and records.
+    """
+
+    __slots__ = ("ts", "keys", "records")
+
+    def __init__(self, rows: Iterable[Tuple[float, str, Any]] = ()):
+        ordered = sorted(rows, key=lambda row: row[0])
+        self.ts = array('d', (row[0] for row in ordered))
+        self.keys: List[str] = [row[1] for row in ordered]
+        self.records: List[Any] = [row[2] for row in ordered]
+
+    def __len__(self) -> int:
+        return len(self.ts)
+
+    def span(self, start: float, end: float, inclusive_end: bool = True) -> Tuple[int, int]:
+        """Index range [lo, hi) of rows with start <= ts <= end (or < end)."""
+        lo = bisect.bisect_left(self.ts, start)
+        hi = (bisect.bisect_right if inclusive_end else bisect.bisect_left)(self.ts, end)
+        return lo, max(lo, hi)
+
+    def between(self, start: float, end: float,
+                inclusive_end: bool = True) -> List[Tuple[str, Any, float]]:
+        """(key, record, ts) for rows in the range, oldest first."""
+        lo, hi = self.span(start, end, inclusive_end)
+        return list(zip(self.keys[lo:hi], self.records[lo:hi], self.ts[lo:hi]))
+
+    def count_between(self, start: float, end: float, inclusive_end: bool = True) -> int:
+        lo, hi = self.span(start, end, inclusive_end)
+        return hi - lo
+
+    def get(self, key: str, ts: float) -> Optional[Any]:
+        """Record with this key at this timestamp, or None."""
+        lo, hi = self.span(ts, ts)
+        for i in range(lo, hi):
+            if self.keys[i] == key:
+                return self.records[i]
+        return None
+
+
+class EpisodeTable(TimeTable):
+    """Episodes sorted by ``started_at``, with per-condition sub-tables."""
+
+    __slots__ = ("_by_condition",)
+
+    def __init__(self, rows: Iterable[Tuple[float, str, Any]] = ()):
+        super().__init__(rows)
+        self._by_condition: Optional[Dict[str, TimeTable]] = None
+
+    def for_condition(self, condition: str) -> TimeTable:
+        """Sub-table of the episodes recorded under one condition."""
+        if self._by_condition is None:
+            grouped: Dict[str, List[Tuple[float, str, Any]]] = {}
+            for ts, key, record in zip(self.ts, self.keys, self.records):
+                grouped.setdefault(record.get("condition"), []).append((ts, key, record))
+            self._by_condition = {cond: TimeTable(rows) for cond, rows in grouped.items()}
+        return self._by_condition.get(condition) or TimeTable()
+
+    def between_conditions(self, conditions: Sequence[str], start: float,
+                           end: float) -> List[Tuple[str, Any, float]]:
+        """Episodes of any of the conditions in the range, oldest first."""
+        rows = []
+        for condition in dict.fromkeys(conditions):
+            rows.extend(self.for_condition(condition).between(start, end))
+        rows.sort(key=lambda row: row[2])
+        return rows
+
+
+def build_episode_table(episodes: Mapping[str, Dict[str, Any]]) -> EpisodeTable:
+    """Build an episode table, skipping records without a parseable start."""
+    rows = []
+    for episode_id, episode in episodes.items():
+        ts = iso_to_epoch(episode.get("started_at")) if episode.get("started_at") else None
+        if ts is not None:
+            rows.append((ts, episode_id, episode))
+    return EpisodeTable(rows)
+
+
+def build_observation_table(observations: Sequence[Dict[str, Any]]) -> TimeTable:
+    """Build an observation table, skipping records without a parseable timestamp."""
+    rows = []
+    for observation in observations:
+        ts = iso_to_epoch(observation.get("timestamp")) if observation.get("timestamp") else None
+        if ts is not None:
+            rows.append((ts, observation.get("observation_id"), observation))
+    return TimeTable(rows)
+
+
+def load_episode_table(path: PathLike) -> EpisodeTable:
+    """Episode table for the current version of an episodes file."""
+    return derived(path, "episode_table", build_episode_table, {})
+
+
+def load_observation_table(path: PathLike) -> TimeTable:
+    """Observation table for the current version of an observations file."""
+    return derived(path, "observation_table", build_observation_table, [])
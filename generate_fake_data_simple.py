@@ -9,6 +9,8 @@ import random
 from datetime import datetime, timedelta
 import os
 
+from data.file_io import atomic_write_json, file_locks, locked_append
+
 def generate_fake_episodes():
     """Generate fake episodes with realistic patterns"""
     
@@ -204,37 +206,36 @@ def main():
     observations_file = os.path.join(data_dir, "observations.json")
     events_file = os.path.join(data_dir, "events.jsonl")
     
-    # Load existing
-    existing_episodes = {}
-    if os.path.exists(episodes_file):
-        with open(episodes_file, 'r') as f:
-            existing_episodes = json.load(f)
-    
-    existing_observations = []
-    if os.path.exists(observations_file):
-        with open(observations_file, 'r') as f:
-            existing_observations = json.load(f)
-    
-    # Generate new data
-    episodes, events = generate_fake_episodes()
-    observations = generate_fake_observations()
-    
-    # Merge with existing
-    all_episodes = {**existing_episodes, **episodes}
-    all_observations = existing_observations + list(observations.values())
-    
-    # Save episodes
-    with open(episodes_file, 'w') as f:
-        json.dump(all_episodes, f, indent=2)
-    
-    # Save observations
-    with open(observations_file, 'w') as f:
-        json.dump(all_observations, f, indent=2)
+    # Hold the data locks for the whole read-merge-write so a running
+    # app worker cannot commit in between and lose its changes
+    with file_locks([episodes_file, observations_file]):
+        # Load existing
+        existing_episodes = {}
+        if os.path.exists(episodes_file):
+            with open(episodes_file, 'r') as f:
+                existing_episodes = json.load(f)
+        
+        existing_observations = []
+        if os.path.exists(observations_file):
+            with open(observations_file, 'r') as f:
+                existing_observations = json.load(f)
+        
+        # Generate new data
+        episodes, events = generate_fake_episodes()
+        observations = generate_fake_observations()
+        
+        # Merge with existing
+        all_episodes = {**existing_episodes, **episodes}
+        all_observations = existing_observations + list(observations.values())
+        
+        # Save episodes
+        atomic_write_json(episodes_file, all_episodes)
+        
+        # Save observations
+        atomic_write_json(observations_file, all_observations)
     
     # Append events
-    with open(events_file, 'a') as f:
-        for event in events:
-            f.write(json.dumps(event) + '\n')
+    locked_append(events_file, "".join(json.dumps(event) + '\n' for event in events))
     
     print(f"✅ Generated data saved!")
     print(f"📊 Total episodes: {len(all_episodes)}")
@@ -11,6 +11,7 @@ from .tools import (
     find_all_episodes_in_range,
     correlate_observation_to_episodes,
     get_daily_history,
+    get_condition_trends,
 )
 
 def create_recall_agent() -> Agent:
@@ -28,6 +29,7 @@ def create_recall_agent() -> Agent:
             find_all_episodes_in_range,
             correlate_observation_to_episodes,
             get_daily_history,
+            get_condition_trends,
         ],
         show_tool_calls=True,
         markdown=True,
@@ -38,7 +40,8 @@ def create_recall_agent() -> Agent:
             "CRITICAL: You MUST follow a logical plan for every query:",
             "",
             "1. **ALWAYS START** with `parse_time_range` to understand the time period the user is asking about:",
-            "   - 'last week', 'yesterday', 'last month', 'today', etc.",
+            "   - 'last week', 'yesterday', 'last 14 days', 'since August 1st', 'in July', 'on Monday', 'between Aug 1 and Aug 5', etc.",
+            "   - Pass the user's own wording; call it once and reuse the result",
             "   - This gives you structured start/end dates for all subsequent tool calls",
             "",
             "2. **CHOOSE THE RIGHT TOOL** based on the question type:",
@@ -46,6 +49,7 @@ def create_recall_agent() -> Agent:
             "   - For SPECIFIC condition searches ('my migraine episodes', 'pain episodes'): use `find_episodes_in_range`",
             "   - For correlation questions (\"Does X trigger Y?\"): use `correlate_observation_to_episodes`",
             "   - For daily summaries or calendar views: use `get_daily_history`",
+            "   - For trends over weeks or months ('how were my migraines over the last 6 months?'): use `get_condition_trends` with resolution 'week' or 'month' instead of listing episodes",
             "",
             "3. **SYNTHESIZE** the structured data from tools into a clear, empathetic response:",
             "   - Use natural language, not technical jargon",
@@ -57,6 +61,8 @@ def create_recall_agent() -> Agent:
             "- DO NOT HALLUCINATE or make up health information",
             "- Always present the conclusion from `CorrelationResult` directly to the user",
             "- For correlation questions, explain the time window used (default 24 hours)",
+            "- Report `lift` against the shuffled-time baseline; a lift near 1 or a p_value above 0.05 means the overlap could be chance",
+            "- Use `lag_histogram` to say whether episodes tend to follow the observation (positive lags) or precede it",
             "- Be clear about limitations: correlation ≠ causation",
             "",
             "EXAMPLE WORKFLOW:",
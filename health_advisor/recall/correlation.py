@@ -0,0 +1,219 @@
+# health_advisor/recall/correlation.py
+# Windowed temporal join between observations and episodes, with a shuffled-time baseline
+
+"""
+Temporal correlation engine for the Recall Agent.
+
+Given observation times and episode start times (epoch seconds), find every
+observation/episode pair within a window using a sorted-array join: episode
+times are sorted once, and each observation locates its window with two
+binary searches, so the cost is O(N log M + pairs) instead of O(N x M).
+With NumPy installed the same join runs as vectorized ``searchsorted``.
+
+Raw hit counts say little on their own: a user who logs migraines every day
+will have every observation "near" one.  The engine therefore also computes
+a baseline by circularly shifting all observation times by a random offset
+within the query span (which keeps their spacing) and re-measuring how many
+land near an episode.  ``lift`` is the observed hit rate over the mean
+shuffled rate, and ``p_value`` is the share of shuffles that did at least as
+well as the real data.  Lags are signed: positive means the episode started
+after the observation.
+"""
+
+from __future__ import annotations
+
+import bisect
+import random
+from dataclasses import dataclass, field
+from typing import List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
+DEFAULT_SHUFFLES = 200
+DEFAULT_LAG_BINS = 8
+
+# Below this many observations the pure-Python join is as fast as NumPy
+NUMPY_MIN_OBSERVATIONS = 256
+
+# Without NumPy, large inputs get fewer shuffles (never below MIN_SHUFFLES)
+# so the baseline stays within this many binary searches
+MAX_PYTHON_BASELINE_LOOKUPS = 1_000_000
+MIN_SHUFFLES = 20
+
+
+@dataclass
+class CorrelationStats:
+    """Outcome of a windowed join plus its shuffled baseline."""
+
+    pairs: List[Tuple[int, int, float]]  # (observation index, episode index, lag seconds)
+    observations_with_hit: int
+    observed_rate: float
+    baseline_rate: Optional[float] = None
+    lift: Optional[float] = None
+    p_value: Optional[float] = None
+    lag_histogram: List[Tuple[float, float, int]] = field(default_factory=list)  # (from h, to h, count)
+
+
+def _use_numpy(n_observations: int) -> bool:
+    return NUMPY_AVAILABLE and n_observations >= NUMPY_MIN_OBSERVATIONS
+
+
+def windowed_pairs(obs_ts: Sequence[float], episode_ts: Sequence[float],
+                   window_seconds: float) -> List[Tuple[int, int, float]]:
+    """
+    All (observation, episode) pairs at most window_seconds apart.
+
+    Args:
+        obs_ts: Observation times in epoch seconds (any order)
+        episode_ts: Episode start times in epoch seconds, sorted ascending
+        window_seconds: Maximum absolute distance
+
+    Returns:
+        (observation index, episode index, episode_ts - obs_ts) tuples
+    """
+    if not len(obs_ts) or not len(episode_ts):
+        return []
+
+    if _use_numpy(len(obs_ts)):
+        obs = np.asarray(obs_ts, dtype=float)
+        eps = np.asarray(episode_ts, dtype=float)
+        lo = np.searchsorted(eps, obs - window_seconds, side="left")
+        hi = np.searchsorted(eps, obs + window_seconds, side="right")
+        counts = hi - lo
+        obs_idx = np.repeat(np.arange(len(obs)), counts)
+        # Episode index for each pair: lo of its observation plus its rank within the run
+        starts = np.repeat(lo - np.cumsum(counts) + counts, counts)
+        ep_idx = starts + np.arange(counts.sum())
+        lags = eps[ep_idx] - obs[obs_idx]
+        return list(zip(obs_idx.tolist(), ep_idx.tolist(), lags.tolist()))
+
+    pairs = []
+    for i, ts in enumerate(obs_ts):
+        lo = bisect.bisect_left(episode_ts, ts - window_seconds)
+        hi = bisect.bisect_right(episode_ts, ts + window_seconds)
+        for j in range(lo, hi):
+            pairs.append((i, j, episode_ts[j] - ts))
+    return pairs
+
+
+def count_hits(obs_ts: Sequence[float], episode_ts: Sequence[float], window_seconds: float) -> int:
+    """Number of observations with at least one episode within the window."""
+    if not len(obs_ts) or not len(episode_ts):
+        return 0
+
+    if _use_numpy(len(obs_ts)):
+        obs = np.asarray(obs_ts, dtype=float)
+        eps = np.asarray(episode_ts, dtype=float)
+        idx = np.searchsorted(eps, obs)
+        after = eps[np.minimum(idx, len(eps) - 1)]
+        before = eps[np.maximum(idx - 1, 0)]
+        nearest = np.minimum(np.abs(after - obs), np.abs(obs - before))
+        return int(np.count_nonzero(nearest <= window_seconds))
+
+    hits = 0
+    last = len(episode_ts) - 1
+    for ts in obs_ts:
+        idx = bisect.bisect_left(episode_ts, ts)
+        if (idx <= last and episode_ts[idx] - ts <= window_seconds) or \
+                (idx > 0 and ts - episode_ts[idx - 1] <= window_seconds):
+            hits += 1
+    return hits
+
+
+def shuffled_hit_rates(obs_ts: Sequence[float], episode_ts: Sequence[float], window_seconds: float,
+                       span_start: float, span_end: float, n_shuffles: int = DEFAULT_SHUFFLES,
+                       seed: int = 0) -> List[float]:
+    """
+    Hit rates after circularly shifting all observations within the span.
+
+    Each shuffle moves every observation by the same random offset and wraps
+    it back into [span_start, span_end), preserving how they are spaced.
+    Without NumPy the number of shuffles is capped for large inputs.
+    """
+    span = span_end - span_start
+    if span <= 0 or not len(obs_ts):
+        return []
+    rng = random.Random(seed)
+    n = len(obs_ts)
+    rates = []
+
+    if _use_numpy(n):
+        obs = np.asarray(obs_ts, dtype=float) - span_start
+        for _ in range(n_shuffles):
+            shifted = (obs + rng.uniform(0, span)) % span + span_start
+            rates.append(count_hits(shifted, episode_ts, window_seconds) / n)
+        return rates
+
+    n_shuffles = min(n_shuffles, max(MIN_SHUFFLES, MAX_PYTHON_BASELINE_LOOKUPS // n))
+    for _ in range(n_shuffles):
+        offset = rng.uniform(0, span)
+        shifted = [(ts - span_start + offset) % span + span_start for ts in obs_ts]
+        rates.append(count_hits(shifted, episode_ts, window_seconds) / n)
+    return rates
+
+
+def lag_histogram(lags_seconds: Sequence[float], window_seconds: float,
+                  bins: int = DEFAULT_LAG_BINS) -> List[Tuple[float, float, int]]:
+    """
+    Histogram of signed lags over [-window, +window] in equal-width bins.
+
+    Returns:
+        (from_hours, to_hours, count) per bin, earliest lag first
+    """
+    if window_seconds <= 0 or bins <= 0:
+        return []
+    width = 2 * window_seconds / bins
+    counts = [0] * bins
+    for lag in lags_seconds:
+        slot = min(int((lag + window_seconds) // width), bins - 1)
+        if slot >= 0:
+            counts[slot] += 1
+    return [
+        ((-window_seconds + k * width) / 3600, (-window_seconds + (k + 1) * width) / 3600, counts[k])
+        for k in range(bins)
+    ]
+
+
+def analyze(obs_ts: Sequence[float], episode_ts: Sequence[float], window_hours: float,
+            span_start: float, span_end: float, n_shuffles: int = DEFAULT_SHUFFLES,
+            seed: int = 0, bins: int = DEFAULT_LAG_BINS) -> CorrelationStats:
+    """
+    Join observations to episodes and compare against the shuffled baseline.
+
+    Args:
+        obs_ts: Observation times (epoch seconds)
+        episode_ts: Episode start times (epoch seconds), sorted ascending
+        window_hours: Maximum distance between an observation and an episode
+        span_start: Start of the queried period (epoch seconds)
+        span_end: End of the queried period (epoch seconds)
+        n_shuffles: Number of shuffled-time baseline runs
+        seed: Seed for the baseline, so answers are reproducible
+        bins: Number of lag histogram bins
+
+    Returns:
+        CorrelationStats with pairs, rates, lift, p-value and lag histogram
+    """
+    window_seconds = window_hours * 3600
+    pairs = windowed_pairs(obs_ts, episode_ts, window_seconds)
+    hit_observations = len({obs_index for obs_index, _, _ in pairs})
+    observed_rate = hit_observations / len(obs_ts) if len(obs_ts) else 0.0
+
+    stats = CorrelationStats(
+        pairs=pairs,
+        observations_with_hit=hit_observations,
+        observed_rate=observed_rate,
+        lag_histogram=lag_histogram([lag for _, _, lag in pairs], window_seconds, bins) if pairs else [],
+    )
+
+    rates = shuffled_hit_rates(obs_ts, episode_ts, window_seconds, span_start, span_end, n_shuffles, seed)
+    if rates:
+        stats.baseline_rate = sum(rates) / len(rates)
+        stats.lift = observed_rate / stats.baseline_rate if stats.baseline_rate > 0 else None
+        # Add-one smoothing keeps the estimate away from an impossible 0
+        stats.p_value = (1 + sum(1 for rate in rates if rate >= observed_rate)) / (1 + len(rates))
+    return stats
@@ -3,78 +3,42 @@
 # Author: Claude (Anthropic AI Assistant)
 # Date: January 15, 2025
 
-import json
-import os
 from agno.tools import tool
 from agno.agent import Agent
-from data.schemas.episodes import TimeRange, EpisodeSummary, CorrelationResult, CorrelationDetail
-from data.daily_history import get_history
+from data.schemas.episodes import TimeRange, EpisodeSummary, CorrelationResult, CorrelationDetail, LagBin, TrendBucket
+from data.daily_history import ROLLUP_RESOLUTIONS, get_history_columns, get_rollups
+from data.tables import EpisodeTable, TimeTable
+from data.keyword_index import KeywordIndex
+from data.json_store import (
+    current_timezone, daily_history_file, episode_table, observation_keyword_index, observation_table
+)
+from core.day_buckets import local_day_bounds
+from core.timeutils import iso_to_epoch, parse_natural_time_range
+from health_advisor.recall.correlation import analyze
 from core.ontology import CONDITION_FAMILIES, normalize_condition, get_related_conditions
-from datetime import datetime, timedelta
+from datetime import datetime
 from typing import List, Optional, Dict
 
-# Get the data directory path
-DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "data")
-
 # Using normalize_condition and get_related_conditions from core.ontology
 
-def _load_episodes() -> dict:
-    """Load episodes from JSON file"""
-    episodes_file = os.path.join(DATA_DIR, "episodes.json")
-    if os.path.exists(episodes_file):
-        try:
-            with open(episodes_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except (json.JSONDecodeError, FileNotFoundError):
-            return {}
-    return {}
+def _user_timezone() -> str:
+    """Timezone from the profile of the user in scope, else DEFAULT_USER_TIMEZONE"""
+    return current_timezone()
 
-def _load_observations() -> dict:
-    """Load observations from JSON file"""
-    observations_file = os.path.join(DATA_DIR, "observations.json")
-    if os.path.exists(observations_file):
-        try:
-            with open(observations_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except (json.JSONDecodeError, FileNotFoundError):
-            return {}
-    return {}
+def _history_days(start_date_iso: str, end_date_iso: str):
+    """
+    Local days in the daily history covered by a range from parse_time_range.
+    
+    The history is bucketed by the user's local day, so UTC bounds such as
+    04:00Z to 03:59Z for a New York "yesterday" map back to that one day.
+    """
+    return local_day_bounds(start_date_iso, end_date_iso, _user_timezone())
 
-def _parse_time_range_core(query: str, user_timezone: str = "UTC") -> TimeRange:
+def _parse_time_range_core(query: str, user_timezone: Optional[str] = None) -> TimeRange:
     """
     Core logic for parsing time ranges (non-decorated for testing)
     """
-    now = datetime.utcnow()
-    query_lower = query.lower()
-    
-    # Enhanced date parsing with more patterns
-    if "last week" in query_lower or "past week" in query_lower:
-        end_date = now
-        start_date = now - timedelta(days=7)
-        label = "the last 7 days"
-    elif "yesterday" in query_lower:
-        start_date = now - timedelta(days=1)
-        start_date = start_date.replace(hour=0, minute=0, second=0, microsecond=0)
-        end_date = start_date + timedelta(days=1) - timedelta(microseconds=1)
-        label = "yesterday"
-    elif "last month" in query_lower or "past month" in query_lower:
-        end_date = now
-        start_date = now - timedelta(days=30)
-        label = "the last 30 days"
-    elif "last 3 days" in query_lower or "past 3 days" in query_lower:
-        end_date = now
-        start_date = now - timedelta(days=3)
-        label = "the last 3 days"
-    elif "today" in query_lower:
-        start_date = now.replace(hour=0, minute=0, second=0, microsecond=0)
-        end_date = start_date + timedelta(days=1) - timedelta(microseconds=1)
-        label = "today"
-    else:
-        # Default to last 7 days if no specific range is found
-        end_date = now
-        start_date = now - timedelta(days=7)
-        label = "the last 7 days (default range)"
-
+    start_date, end_date, label = parse_natural_time_range(query, user_timezone or _user_timezone())
     return TimeRange(
         start_utc_iso=start_date.isoformat(),
         end_utc_iso=end_date.isoformat(),
@@ -84,25 +48,93 @@ def _parse_time_range_core(query: str, user_timezone: str = "UTC") -> TimeRange:
 @tool
 def get_daily_history(agent: Agent, start_date_iso: str, end_date_iso: str) -> List[Dict[str, Optional[float]]]:
     """Fetch compiled daily history records between two dates (inclusive)."""
-    records = get_history(start_date_iso, end_date_iso)
-    return [r.__dict__ for r in records]
+    first_day, last_day = _history_days(start_date_iso, end_date_iso)
+    return get_history_columns(first_day, last_day, path=daily_history_file()).to_rows()
+
+def _get_condition_trends_core(condition: str, start_date_iso: str, end_date_iso: str,
+                               resolution: str = "month") -> List[TrendBucket]:
+    """
+    Core logic for condition trends (non-decorated for testing)
+    """
+    if resolution not in ROLLUP_RESOLUTIONS:
+        resolution = "month"
+    if condition.strip().lower() in ("all", "any", "everything"):
+        conditions = None
+    else:
+        conditions = get_related_conditions(condition)
+        if not conditions:
+            return []
+    first_day, last_day = _history_days(start_date_iso, end_date_iso)
+    return [
+        TrendBucket(**bucket)
+        for bucket in get_rollups(resolution, conditions, first_day, last_day,
+                                  path=daily_history_file())
+    ]
+
+@tool
+def get_condition_trends(agent: Agent, condition: str, start_date_iso: str, end_date_iso: str,
+                         resolution: str = "month") -> List[TrendBucket]:
+    """
+    Summarizes a condition week by week or month by month: episode count, average and
+    maximum pain, and which interventions were used. Use this for trend questions over
+    longer periods ('how were my migraines over the last 6 months') instead of listing episodes.
+    
+    Args:
+        agent: The calling agent (automatically provided by Agno)
+        condition: Health condition to summarize, or 'all' for every condition
+        start_date_iso: Start date in ISO format
+        end_date_iso: End date in ISO format
+        resolution: 'week' or 'month' (default 'month')
+    
+    Returns:
+        List[TrendBucket]: One row per period and condition, oldest first
+    """
+    return _get_condition_trends_core(condition, start_date_iso, end_date_iso, resolution)
 
 @tool
-def parse_time_range(agent: Agent, query: str, user_timezone: str = "UTC") -> TimeRange:
+def parse_time_range(agent: Agent, query: str, user_timezone: Optional[str] = None) -> TimeRange:
     """
-    Parses a natural language query to identify a time range (e.g., 'last week', 'yesterday', 'since August 1st').
+    Parses a natural language query to identify a time range (e.g., 'last week', 'yesterday', 'since August 1st',
+    'last 14 days', 'in July', 'on Monday', 'between Aug 1 and Aug 5').
     Returns a structured start and end time in UTC ISO format. This should be the first step in any historical query.
     
     Args:
         agent: The calling agent (automatically provided by Agno)
         query: Natural language query containing time references
-        user_timezone: User's timezone (defaults to UTC)
+        user_timezone: User's IANA timezone (defaults to the user's profile timezone)
     
     Returns:
         TimeRange: Structured time range with start, end, and label
     """
     return _parse_time_range_core(query, user_timezone)
 
+def _episode_table() -> EpisodeTable:
+    """Episodes sorted by start time (rebuilt only when the episodes change, WAL included)"""
+    return episode_table()
+
+def _observation_table() -> TimeTable:
+    """Observations sorted by timestamp (rebuilt only when observations.json changes)"""
+    return observation_table()
+
+def _observation_keywords() -> KeywordIndex:
+    """Keyword index over observations (rebuilt only when observations.json changes)"""
+    return observation_keyword_index()
+
+def _episode_summary(episode_id: str, episode_data: dict) -> EpisodeSummary:
+    """Build the summary returned by the range tools"""
+    # Extract interventions
+    interventions = [
+        intervention.get("type", "unknown")
+        for intervention in episode_data.get("interventions", [])
+    ]
+    return EpisodeSummary(
+        episode_id=episode_id,
+        condition=episode_data.get("condition", "unknown"),
+        started_at=episode_data.get("started_at"),
+        max_severity=episode_data.get("peak_severity") or episode_data.get("current_severity"),
+        interventions=interventions
+    )
+
 def _find_episodes_in_range_core(condition: str, start_date_iso: str, end_date_iso: str) -> List[EpisodeSummary]:
     """
     Core logic for finding episodes in range (non-decorated for testing)
@@ -112,49 +144,15 @@ def _find_episodes_in_range_core(condition: str, start_date_iso: str, end_date_i
     if not related_conditions:
         return []
     
-    # Load episodes
-    episodes = _load_episodes()
-    
     # Parse date range
-    try:
-        start_dt = datetime.fromisoformat(start_date_iso.replace('Z', '+00:00'))
-        end_dt = datetime.fromisoformat(end_date_iso.replace('Z', '+00:00'))
-    except ValueError:
+    start_ts = iso_to_epoch(start_date_iso)
+    end_ts = iso_to_epoch(end_date_iso)
+    if start_ts is None or end_ts is None:
         return []
     
-    matching_episodes = []
-    
-    for episode_id, episode_data in episodes.items():
-        # Check condition match (now supports multiple related conditions)
-        episode_condition = episode_data.get("condition")
-        if episode_condition not in related_conditions:
-            continue
-            
-        # Check date range
-        episode_start = episode_data.get("started_at")
-        if not episode_start:
-            continue
-            
-        try:
-            episode_dt = datetime.fromisoformat(episode_start.replace('Z', '+00:00'))
-            if start_dt <= episode_dt <= end_dt:
-                # Extract interventions
-                interventions = []
-                for intervention in episode_data.get("interventions", []):
-                    intervention_type = intervention.get("type", "unknown")
-                    interventions.append(intervention_type)
-                
-                matching_episodes.append(EpisodeSummary(
-                    episode_id=episode_id,
-                    condition=episode_data.get("condition", "unknown"),
-                    started_at=episode_start,
-                    max_severity=episode_data.get("peak_severity") or episode_data.get("current_severity"),
-                    interventions=interventions
-                ))
-        except ValueError:
-            continue
-    
-    return matching_episodes
+    # Bisect each related condition's start-time column instead of scanning
+    rows = _episode_table().between_conditions(related_conditions, start_ts, end_ts)
+    return [_episode_summary(episode_id, episode_data) for episode_id, episode_data, _ in rows]
 
 @tool
 def find_episodes_in_range(agent: Agent, condition: str, start_date_iso: str, end_date_iso: str) -> List[EpisodeSummary]:
@@ -180,47 +178,16 @@ def find_all_episodes_in_range(agent: Agent, start_date_iso: str, end_date_iso:
     Use this for general queries like 'what happened last week' or 'show me my recent episodes'.
     Perfect for overview questions where the user wants to see everything.
     """
-    # Load all episodes
-    episodes = _load_episodes()
-    
     # Parse date range
-    try:
-        start_dt = datetime.fromisoformat(start_date_iso.replace('Z', '+00:00'))
-        end_dt = datetime.fromisoformat(end_date_iso.replace('Z', '+00:00'))
-    except ValueError:
+    start_ts = iso_to_epoch(start_date_iso)
+    end_ts = iso_to_epoch(end_date_iso)
+    if start_ts is None or end_ts is None:
         return []
     
-    matching_episodes = []
-    
-    for episode_id, episode_data in episodes.items():
-        # Check date range only (no condition filtering)
-        episode_start = episode_data.get("started_at")
-        if not episode_start:
-            continue
-            
-        try:
-            episode_dt = datetime.fromisoformat(episode_start.replace('Z', '+00:00'))
-            if start_dt <= episode_dt <= end_dt:
-                # Extract interventions
-                interventions = []
-                for intervention in episode_data.get("interventions", []):
-                    intervention_type = intervention.get("type", "unknown")
-                    interventions.append(intervention_type)
-                
-                matching_episodes.append(EpisodeSummary(
-                    episode_id=episode_id,
-                    condition=episode_data.get("condition", "unknown"),
-                    started_at=episode_start,
-                    max_severity=episode_data.get("peak_severity") or episode_data.get("current_severity"),
-                    interventions=interventions
-                ))
-        except ValueError:
-            continue
+    rows = _episode_table().between(start_ts, end_ts)
     
-    # Sort by date (most recent first)
-    matching_episodes.sort(key=lambda x: x.started_at, reverse=True)
-    
-    return matching_episodes
+    # Most recent first
+    return [_episode_summary(episode_id, episode_data) for episode_id, episode_data, _ in reversed(rows)]
 
 @tool
 def correlate_observation_to_episodes(agent: Agent, observation_keyword: str, condition: str, 
@@ -242,7 +209,7 @@ def correlate_observation_to_episodes(agent: Agent, observation_keyword: str, co
         CorrelationResult: Analysis of correlations found
     """
     # Normalize the condition
-    normalized_condition = _normalize_condition(condition)
+    normalized_condition = normalize_condition(condition)
     if not normalized_condition:
         return CorrelationResult(
             observation_total=0,
@@ -252,15 +219,10 @@ def correlate_observation_to_episodes(agent: Agent, observation_keyword: str, co
             conclusion=f"Could not normalize condition '{condition}' to a known condition family."
         )
     
-    # Load data
-    observations = _load_observations()
-    episodes = _load_episodes()
-    
     # Parse date range
-    try:
-        start_dt = datetime.fromisoformat(start_date_iso.replace('Z', '+00:00'))
-        end_dt = datetime.fromisoformat(end_date_iso.replace('Z', '+00:00'))
-    except ValueError:
+    start_ts = iso_to_epoch(start_date_iso)
+    end_ts = iso_to_epoch(end_date_iso)
+    if start_ts is None or end_ts is None:
         return CorrelationResult(
             observation_total=0,
             episodes_with_correlation=0,
@@ -269,62 +231,40 @@ def correlate_observation_to_episodes(agent: Agent, observation_keyword: str, co
             conclusion="Invalid date format provided."
         )
     
-    # Find matching observations in the date range
+    # Find matching observations in the date range with the keyword index
+    observation_table = _observation_table()
+    hits = _observation_keywords().lookup(observation_keyword, start_ts, end_ts)
     matching_observations = []
-    keyword_lower = observation_keyword.lower()
+    for obs_id, obs_ts in sorted(hits.items(), key=lambda item: item[1]):
+        obs_data = observation_table.get(obs_id, obs_ts) or {
+            "timestamp": datetime.utcfromtimestamp(obs_ts).isoformat()
+        }
+        matching_observations.append((obs_id, obs_data, obs_ts))
     
-    for obs_id, obs_data in observations.items():
-        obs_timestamp = obs_data.get("timestamp")
-        if not obs_timestamp:
-            continue
-            
-        try:
-            obs_dt = datetime.fromisoformat(obs_timestamp.replace('Z', '+00:00'))
-            if start_dt <= obs_dt <= end_dt:
-                # Check if observation contains the keyword
-                obs_text = obs_data.get("notes", "").lower()
-                obs_category = obs_data.get("category", "").lower()
-                
-                if keyword_lower in obs_text or keyword_lower in obs_category:
-                    matching_observations.append((obs_id, obs_data, obs_dt))
-        except ValueError:
-            continue
-    
-    # Find episodes of the specified condition in the date range
-    condition_episodes = []
-    for episode_id, episode_data in episodes.items():
-        if episode_data.get("condition") != normalized_condition:
-            continue
-            
-        episode_start = episode_data.get("started_at")
-        if not episode_start:
-            continue
-            
-        try:
-            episode_dt = datetime.fromisoformat(episode_start.replace('Z', '+00:00'))
-            # Extend search range by window_hours to catch episodes that might have started outside range
-            extended_start = start_dt - timedelta(hours=window_hours)
-            extended_end = end_dt + timedelta(hours=window_hours)
-            
-            if extended_start <= episode_dt <= extended_end:
-                condition_episodes.append((episode_id, episode_data, episode_dt))
-        except ValueError:
-            continue
+    # Find episodes of the specified condition in the date range, extended
+    # by window_hours to catch episodes that started just outside it
+    window_seconds = window_hours * 3600
+    condition_episodes = _episode_table().for_condition(normalized_condition).between(
+        start_ts - window_seconds, end_ts + window_seconds
+    )
     
-    # Find correlations: observations within window_hours of episodes
-    correlations = []
-    window_delta = timedelta(hours=window_hours)
+    # Windowed join against the condition's episodes, with a shuffled-time
+    # baseline so the answer says whether the overlap beats chance
+    stats = analyze(
+        [obs_ts for _, _, obs_ts in matching_observations],
+        [episode_ts for _, _, episode_ts in condition_episodes],
+        window_hours, start_ts, end_ts
+    )
     
-    for obs_id, obs_data, obs_dt in matching_observations:
-        for episode_id, episode_data, episode_dt in condition_episodes:
-            time_diff = abs((obs_dt - episode_dt).total_seconds() / 3600)  # Convert to hours
-            
-            if time_diff <= window_hours:
-                correlations.append(CorrelationDetail(
-                    observation_timestamp=obs_dt.isoformat(),
-                    matched_episode_id=episode_id,
-                    hours_difference=time_diff
-                ))
+    correlations = [
+        CorrelationDetail(
+            observation_timestamp=matching_observations[obs_index][1]["timestamp"],
+            matched_episode_id=condition_episodes[episode_index][0],
+            hours_difference=abs(lag) / 3600,
+            lag_hours=lag / 3600
+        )
+        for obs_index, episode_index, lag in stats.pairs
+    ]
     
     # Generate conclusion
     total_observations = len(matching_observations)
@@ -337,12 +277,29 @@ def correlate_observation_to_episodes(agent: Agent, observation_keyword: str, co
         conclusion = f"Found {total_observations} observation(s) containing '{observation_keyword}', but none were within {window_hours} hours of a {normalized_condition} episode."
     else:
         correlation_rate = episodes_with_correlation / len(condition_episodes) if condition_episodes else 0
-        conclusion = f"Found {len(correlations)} correlation(s): {total_observations} observation(s) containing '{observation_keyword}' were within {window_hours} hours of {episodes_with_correlation} different {normalized_condition} episode(s). This suggests a potential correlation (rate: {correlation_rate:.1%})."
+        conclusion = f"Found {len(correlations)} correlation(s): {total_observations} observation(s) containing '{observation_keyword}' were within {window_hours} hours of {episodes_with_correlation} different {normalized_condition} episode(s) (rate: {correlation_rate:.1%})."
+        if stats.lift is not None:
+            conclusion += (
+                f" {stats.observed_rate:.0%} of these observations were near an episode versus "
+                f"{stats.baseline_rate:.0%} with shuffled timing (lift {stats.lift:.2f}, p={stats.p_value:.2f})."
+            )
+            if stats.lift > 1 and stats.p_value < 0.05:
+                conclusion += " This is more than chance would explain and suggests a potential correlation."
+            else:
+                conclusion += " This is not clearly more than chance."
     
     return CorrelationResult(
         observation_total=total_observations,
         episodes_with_correlation=episodes_with_correlation,
         correlation_found=correlation_found,
         details=correlations,
-        conclusion=conclusion
+        conclusion=conclusion,
+        observed_rate=stats.observed_rate if total_observations else None,
+        baseline_rate=stats.baseline_rate,
+        lift=stats.lift,
+        p_value=stats.p_value,
+        lag_histogram=[
+            LagBin(from_hours=from_hours, to_hours=to_hours, count=count)
+            for from_hours, to_hours, count in stats.lag_histogram
+        ]
     )
\ No newline at end of file
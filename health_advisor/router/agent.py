@@ -3,6 +3,7 @@
 
 from agno.agent import Agent
 from agno.models.openai import OpenAIChat
+from .fast_path import ROUTER_KEYWORDS
 from .schema import RouterDecision
 
 # Following openai-model-list.mdc for correct model name
@@ -40,11 +41,11 @@ router_agent = Agent(
         "",
         "🧠 **CLASSIFICATION RULES:**",
         "1. **Default to 'log'** - Health chatbots primarily capture new information",
-        "2. **Keywords for 'recall'**: 'when did', 'show me', 'my history', 'last time', 'how many'",
-        "3. **Keywords for 'coach'**: 'what should I do', 'help', 'advice', 'recommend', 'suggest'",
-        "4. **Keywords for 'profile_update'**: 'update my', 'change my', 'new medication', 'stop taking', 'add condition'",
-        "5. **Keywords for 'onboarding'**: 'new user', 'setup profile', 'first time', 'getting started'",
-        "6. **Keywords for 'profile_view'**: 'show my profile', 'my info', 'what medications', 'what conditions'",
+        # Shared with the fast-path rules so both classify by the same keywords
+        *[
+            f"{number}. **Keywords for '{intent}'**: " + ", ".join(f"'{keyword}'" for keyword in keywords)
+            for number, (intent, keywords) in enumerate(ROUTER_KEYWORDS.items(), start=2)
+        ],
         "7. **Context matters** - Use conversation history to understand follow-ups",
         "8. **Be conservative** - If unsure between intents, lower confidence and explain why",
         "",
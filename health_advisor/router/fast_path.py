@@ -0,0 +1,476 @@
+# health_advisor/router/fast_path.py
+# Local intent classifier tried before the LLM router
+
+"""
+Fast-path routing for unambiguous messages.
+
+``MasterAgent`` used to send every message to ``router_agent``, an LLM
+round trip, before any specialist ran.  Many messages need no LLM to
+classify: commands such as ``/resolve``, "show my profile", or "I have a
+migraine 6/10".  ``FastPathRouter`` decides those locally and returns None
+whenever it is unsure, so the router agent still handles follow-ups,
+mixed requests and anything safety-sensitive.
+
+Two tiers are tried in order:
+
+1. Rules: commands, profile views, log cues (a severity score, or a
+   first-person statement naming a condition from the ontology) and
+   ``RULE_PHRASES``, the unambiguous multi-word phrases among the router
+   agent's keywords.  A phrase rule only fires when exactly one intent
+   matches and the message mentions no condition and no log verb, and
+   its confidence grows with the strength of the match, so
+   ``FAST_PATH_MIN_CONFIDENCE`` decides which rules are acted on.
+2. An optional TF-IDF + logistic regression model.  ``MasterAgent``
+   records confident router agent decisions in the event log, and
+   ``train_model`` fits the model on them and on the logger's own events
+   (scikit-learn needed).  The weights are saved as JSON, so using the
+   model needs nothing beyond the standard library.
+
+``FastPathStats`` counts hits per tier for the hit rate.  Train or
+evaluate from the command line::
+
+    python -m health_advisor.router.fast_path --train
+    python -m health_advisor.router.fast_path --evaluate
+"""
+
+from __future__ import annotations
+
+import argparse
+import math
+import re
+import threading
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping, NamedTuple, Optional, Sequence, Tuple
+
+try:
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.linear_model import LogisticRegression
+    SKLEARN_AVAILABLE = True
+except ImportError:
+    SKLEARN_AVAILABLE = False
+
+from core.ontology import find_condition_mentions
+from core.policies import (
+    FAST_PATH_MIN_CONFIDENCE, FAST_PATH_MODEL_MIN_PROBABILITY, ROUTER_TRAINING_MIN_CONFIDENCE,
+    is_safety_sensitive_content
+)
+from data.dataset_cache import derived, thaw
+from data.event_log import EventLog
+from data.file_io import atomic_write_json
+from .schema import RouterDecision
+
+DATA_DIR = Path("data")
+MODEL_FILE = DATA_DIR / "router_model.json"
+
+# Event log action of a recorded router agent decision
+ROUTE_ACTION = "route"
+
+# Keyword lists from the router agent's instructions, in rule order
+ROUTER_KEYWORDS: Dict[str, List[str]] = {
+    "recall": ["when did", "show me", "my history", "last time", "how many"],
+    "coach": ["what should I do", "help", "advice", "recommend", "suggest"],
+    "profile_update": ["update my", "change my", "new medication", "stop taking", "add condition"],
+    "onboarding": ["new user", "setup profile", "first time", "getting started"],
+    "profile_view": ["show my profile", "my info", "what medications", "what conditions"],
+}
+
+# Phrases the rules trust on their own.  Single words from ROUTER_KEYWORDS
+# such as "help" or "show me" say too little ("show me how to log my
+# headache"), so they are left to the router agent.
+RULE_PHRASES: Dict[str, List[str]] = {
+    "recall": ["when did i", "when was my last", "my history"],
+    "coach": ["what should i do", "any advice for", "what do you recommend"],
+    "profile_update": ["update my profile", "update my medication", "change my medication", "add condition"],
+    "onboarding": ["new user", "set up my profile", "setup profile", "getting started"],
+    "profile_view": ["what medications am i on", "what conditions do i have"],
+}
+
+# Intents the model may predict; clarify_response, control_action and
+# unknown depend on conversation state, not on the message text
+MODEL_INTENTS = ("log", "recall", "coach", "profile_update", "onboarding", "profile_view")
+
+PROFILE_ACTIONS = {
+    "profile_view": "view_profile",
+    "profile_update": "update_profile",
+    "onboarding": "start_onboarding",
+}
+
+# Rule confidence: commands and profile views are certain; a log cue or a
+# phrase starts at a base and gains for each extra piece of evidence
+COMMAND_CONFIDENCE = 1.0
+LOG_CONFIDENCE = 0.9
+PHRASE_BASE_CONFIDENCE = 0.7
+PHRASE_WORD_CONFIDENCE = 0.05   # per word of the matched phrase, up to 4
+OPENING_PHRASE_CONFIDENCE = 0.05
+MIN_TRAINING_EXAMPLES = 30
+
+_SEVERITY_RE = re.compile(r"\b(?:10|\d)(?:\.\d)?\s*(?:/|out of)\s*10\b")
+_LOG_OPENER_RE = re.compile(
+    r"^(?:i\s+(?:have|had|got|feel|felt|took|am having|woke up with)|i've\s+(?:got|had)|i'm\s+having|"
+    r"my\s+\w+(?:\s+\w+)?\s+(?:hurts|is hurting|aches))\b"
+)
+_QUESTION_RE = re.compile(r"\?\s*$|^(?:when|what|how|why|which|did|do|does|should|can|could|is|are|was)\b")
+_LOG_VERB_RE = re.compile(
+    r"\b(?:log|logged|logging|record|track|have|had|having|got|took|taken|feel|felt|feeling|"
+    r"hurt|hurts|hurting|ache|aches|ached|ate|drank|slept|woke)\b"
+)
+_PROFILE_VIEW_RE = re.compile(r"^(?:please\s+)?(?:(?:show|view|display|see)\s+(?:me\s+)?)?my\s+profile(?:\s+please)?[.!]*$")
+# Words of a message the rules need to see before trusting a keyword alone
+_MIN_RULE_WORDS = 3
+
+
+def _keyword_pattern(keywords: Sequence[str]):
+    return re.compile(r"\b(?:" + "|".join(re.escape(k.lower()) for k in keywords) + r")\b")
+
+
+_PHRASE_PATTERNS = {intent: _keyword_pattern(phrases) for intent, phrases in RULE_PHRASES.items()}
+
+
+def _phrase_confidence(match: re.Match) -> float:
+    """Longer phrases, and phrases opening the message, are stronger evidence."""
+    words = min(len(match.group().split()), 4)
+    opening = OPENING_PHRASE_CONFIDENCE if match.start() == 0 else 0.0
+    return round(PHRASE_BASE_CONFIDENCE + PHRASE_WORD_CONFIDENCE * words + opening, 2)
+
+
+class FastPathMatch(NamedTuple):
+    """A fast-path decision and the tier that made it ("rules" or "model")."""
+    decision: RouterDecision
+    source: str
+
+
+def _decision(intent: str, confidence: float, rationale: str,
+              secondary: Optional[str] = None) -> RouterDecision:
+    return RouterDecision(
+        primary_intent=intent,
+        secondary_intent=secondary,
+        profile_action=PROFILE_ACTIONS.get(intent),
+        confidence=confidence,
+        rationale=f"Fast path: {rationale}",
+    )
+
+
+def classify_rules(prompt: str) -> Optional[RouterDecision]:
+    """
+    Classify a message with the rules.
+
+    The decision's confidence reflects how strong the match is; callers
+    compare it with FAST_PATH_MIN_CONFIDENCE.
+
+    Args:
+        prompt: User's message
+
+    Returns:
+        RouterDecision, or None when no single intent is clear
+    """
+    text = " ".join(prompt.strip().lower().split())
+    if not text:
+        return None
+    if text.startswith("/"):
+        return _decision("control_action", COMMAND_CONFIDENCE, f"command {text.split()[0]}")
+    if _PROFILE_VIEW_RE.match(text):
+        return _decision("profile_view", COMMAND_CONFIDENCE, "asks to see the profile")
+    if is_safety_sensitive_content(text):
+        return None
+
+    matched = {intent: match for intent, pattern in _PHRASE_PATTERNS.items()
+               for match in [pattern.search(text)] if match}
+    severity = _SEVERITY_RE.search(text)
+    mentions = find_condition_mentions(text)
+    if severity or (mentions and _LOG_OPENER_RE.match(text)):
+        # "I have a migraine 6/10, what should I do?" logs, then coaches
+        others = [intent for intent in matched if intent != "coach"]
+        if others or (_QUESTION_RE.search(text) and "coach" not in matched):
+            return None
+        cue = f"severity '{severity.group()}'" if severity else f"reports {mentions[0].condition}"
+        secondary = "coach" if "coach" in matched else None
+        return _decision("log", LOG_CONFIDENCE, cue, secondary)
+
+    # A condition or a log verb next to a phrase may be a log in disguise
+    # ("can you help me log that I had a migraine")
+    if len(matched) != 1 or mentions or len(text.split()) < _MIN_RULE_WORDS:
+        return None
+    (intent, match), = matched.items()
+    if _LOG_VERB_RE.search(text[:match.start()] + " " + text[match.end():]):
+        return None
+    return _decision(intent, _phrase_confidence(match), f"phrase '{match.group()}'")
+
+
+_TOKEN_RE = re.compile(r"(?u)\b\w\w+\b")
+
+
+def _terms(text: str, ngram_max: int) -> List[str]:
+    """Word n-grams as TfidfVectorizer's default analyzer produces them."""
+    tokens = _TOKEN_RE.findall(text.lower())
+    terms = list(tokens)
+    for n in range(2, ngram_max + 1):
+        terms.extend(" ".join(tokens[i:i + n]) for i in range(len(tokens) - n + 1))
+    return terms
+
+
+class IntentModel:
+    """
+    A trained TF-IDF + logistic regression model, evaluated without scikit-learn.
+
+    The JSON form holds the vectorizer's vocabulary and IDF weights and the
+    classifier's coefficients, one row per class (or one row for two
+    classes, as scikit-learn stores a binary model).
+    """
+
+    def __init__(self, data: Mapping[str, Any]):
+        data = thaw(data)
+        self.classes: List[str] = data["classes"]
+        self.vocabulary: Dict[str, int] = data["vocabulary"]
+        self.idf: List[float] = data["idf"]
+        self.coef: List[List[float]] = data["coef"]
+        self.intercept: List[float] = data["intercept"]
+        self.ngram_max: int = data.get("ngram_max", 1)
+        self.trained_at: Optional[str] = data.get("trained_at")
+        self.examples: int = data.get("examples", 0)
+
+    def predict_proba(self, text: str) -> Dict[str, float]:
+        """Probability of each intent for text."""
+        counts = Counter(
+            self.vocabulary[term] for term in _terms(text, self.ngram_max) if term in self.vocabulary
+        )
+        weights = {index: count * self.idf[index] for index, count in counts.items()}
+        norm = math.sqrt(sum(w * w for w in weights.values())) or 1.0
+        scores = [
+            intercept + sum(row[index] * w for index, w in weights.items()) / norm
+            for row, intercept in zip(self.coef, self.intercept)
+        ]
+        if len(self.classes) == 2:
+            positive = 1.0 / (1.0 + math.exp(-scores[0]))
+            return {self.classes[0]: 1.0 - positive, self.classes[1]: positive}
+        top = max(scores)
+        exps = [math.exp(score - top) for score in scores]
+        total = sum(exps)
+        return {label: value / total for label, value in zip(self.classes, exps)}
+
+
+def _build_model(data: Any) -> Optional[IntentModel]:
+    if not data or "classes" not in data:
+        return None
+    return IntentModel(data)
+
+
+class FastPathStats:
+    """Messages seen by the fast path and how many each tier decided."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.messages = 0
+        self.hits: Counter = Counter()     # tier -> decisions
+        self.intents: Counter = Counter()  # intent -> fast-path decisions
+
+    def record(self, match: Optional[FastPathMatch]) -> None:
+        with self._lock:
+            self.messages += 1
+            if match is not None:
+                self.hits[match.source] += 1
+                self.intents[match.decision.primary_intent] += 1
+
+    @property
+    def hit_rate(self) -> float:
+        """Share of messages decided without the router agent."""
+        return sum(self.hits.values()) / self.messages if self.messages else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "messages": self.messages,
+                "rule_hits": self.hits["rules"],
+                "model_hits": self.hits["model"],
+                "fallthrough": self.messages - sum(self.hits.values()),
+                "hit_rate": self.hit_rate,
+                "intents": dict(self.intents),
+            }
+
+
+class FastPathRouter:
+    """Rules, then the optional model; None means ask the router agent."""
+
+    def __init__(self, model_path: Path = MODEL_FILE, min_confidence: float = FAST_PATH_MIN_CONFIDENCE,
+                 model_min_probability: float = FAST_PATH_MODEL_MIN_PROBABILITY):
+        """
+        Args:
+            model_path: JSON model written by train_model (optional)
+            min_confidence: Lowest rule confidence acted on
+            model_min_probability: Lowest model probability acted on
+        """
+        self.model_path = Path(model_path)
+        self.min_confidence = min_confidence
+        self.model_min_probability = model_min_probability
+        self.stats = FastPathStats()
+
+    def model(self) -> Optional[IntentModel]:
+        """The current model, reloaded when the file changes; None without one."""
+        return derived(self.model_path, "fast_path_model", _build_model, None)
+
+    def classify_model(self, prompt: str) -> Optional[RouterDecision]:
+        model = self.model()
+        if model is None or not prompt.strip() or is_safety_sensitive_content(prompt):
+            return None
+        probabilities = model.predict_proba(prompt)
+        intent = max(probabilities, key=probabilities.__getitem__)
+        probability = probabilities[intent]
+        if probability < self.model_min_probability or intent not in MODEL_INTENTS:
+            return None
+        return _decision(intent, probability, f"model p={probability:.2f}")
+
+    def route(self, prompt: str) -> Optional[FastPathMatch]:
+        """
+        Decide a message locally if possible.
+
+        Args:
+            prompt: User's message
+
+        Returns:
+            FastPathMatch, or None to fall through to the router agent
+        """
+        match = None
+        decision = classify_rules(prompt)
+        if decision is not None and decision.confidence >= self.min_confidence:
+            match = FastPathMatch(decision, "rules")
+        else:
+            decision = self.classify_model(prompt)
+            if decision is not None:
+                match = FastPathMatch(decision, "model")
+        self.stats.record(match)
+        return match
+
+
+def record_router_decision(prompt: str, decision: RouterDecision,
+                           model: Optional[str] = None) -> Optional[str]:
+    """
+    Keep a confident router agent decision as a training example.
+
+    Written to the event log of the user in scope (see data.json_store).
+
+    Returns:
+        Event ID, or None if the decision is not used for training
+    """
+    if decision.confidence < ROUTER_TRAINING_MIN_CONFIDENCE or decision.primary_intent not in MODEL_INTENTS:
+        return None
+    from data.json_store import append_event
+    return append_event(
+        prompt,
+        {"primary_intent": decision.primary_intent, "secondary_intent": decision.secondary_intent},
+        ROUTE_ACTION,
+        model=model,
+        confidence=decision.confidence,
+    )
+
+
+def default_event_logs(data_dir: Path = DATA_DIR) -> List[Path]:
+    """The shared event log plus every user partition's."""
+    return [data_dir / "events.jsonl"] + sorted(data_dir.glob("users/*/events.jsonl"))
+
+
+def training_examples(event_logs: Iterable[Path]) -> List[Tuple[str, str]]:
+    """
+    (message, intent) pairs from event logs.
+
+    Recorded router decisions give their intent; any other event was written
+    by the logger, so its message was a "log".  A message with a recorded
+    decision keeps that label.
+    """
+    labels: Dict[str, str] = {}
+    routed = set()
+    for path in event_logs:
+        for event in EventLog(path).iter_all():
+            text = (event.get("user_text") or "").strip()
+            if not text:
+                continue
+            if event.get("action") == ROUTE_ACTION:
+                intent = (event.get("parsed_data") or {}).get("primary_intent")
+                if intent in MODEL_INTENTS:
+                    labels[text] = intent
+                    routed.add(text)
+            elif text not in routed:
+                labels[text] = "log"
+    return list(labels.items())
+
+
+def train_model(examples: Sequence[Tuple[str, str]], output: Path = MODEL_FILE,
+                ngram_max: int = 2) -> IntentModel:
+    """
+    Fit the fast-path model and save it as JSON.
+
+    Args:
+        examples: (message, intent) pairs, e.g. from training_examples
+        output: Model file to write
+        ngram_max: Longest word n-gram used as a feature
+
+    Returns:
+        The trained model
+    """
+    if not SKLEARN_AVAILABLE:
+        raise RuntimeError("scikit-learn is required to train the fast-path model")
+    if len(examples) < MIN_TRAINING_EXAMPLES:
+        raise ValueError(f"need at least {MIN_TRAINING_EXAMPLES} examples, got {len(examples)}")
+    texts = [text for text, _ in examples]
+    labels = [label for _, label in examples]
+    if len(set(labels)) < 2:
+        raise ValueError("need examples of at least two intents")
+
+    vectorizer = TfidfVectorizer(ngram_range=(1, ngram_max))
+    features = vectorizer.fit_transform(texts)
+    classifier = LogisticRegression(max_iter=1000).fit(features, labels)
+    data = {
+        "trained_at": datetime.utcnow().isoformat(),
+        "examples": len(examples),
+        "ngram_max": ngram_max,
+        "classes": [str(label) for label in classifier.classes_],
+        "vocabulary": {term: int(index) for term, index in vectorizer.vocabulary_.items()},
+        "idf": [float(value) for value in vectorizer.idf_],
+        "coef": [[float(value) for value in row] for row in classifier.coef_],
+        "intercept": [float(value) for value in classifier.intercept_],
+    }
+    atomic_write_json(output, data)
+    return IntentModel(data)
+
+
+def evaluate(router: FastPathRouter, examples: Sequence[Tuple[str, str]]) -> Dict[str, Any]:
+    """
+    Replay labelled messages through the fast path.
+
+    Returns:
+        The router's stats plus how many of its decisions matched the label
+    """
+    agreed = 0
+    for text, label in examples:
+        match = router.route(text)
+        if match is not None and match.decision.primary_intent == label:
+            agreed += 1
+    report = router.stats.as_dict()
+    hits = report["rule_hits"] + report["model_hits"]
+    report["agreement"] = agreed / hits if hits else 0.0
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Train or evaluate the fast-path model from the event logs."""
+    parser = argparse.ArgumentParser(description="Train or evaluate the fast-path intent router.")
+    parser.add_argument("--train", action="store_true", help="Fit the model and write it to --model")
+    parser.add_argument("--evaluate", action="store_true", help="Report hit rate and agreement on the events")
+    parser.add_argument("--events", type=Path, nargs="+", default=None,
+                        help="Event logs to read (default: every partition under data/)")
+    parser.add_argument("--model", type=Path, default=MODEL_FILE, help=f"Model file (default: {MODEL_FILE})")
+    args = parser.parse_args(argv)
+
+    examples = training_examples(args.events or default_event_logs())
+    print(f"{len(examples)} labelled messages: {dict(Counter(label for _, label in examples))}")
+    if args.train:
+        model = train_model(examples, args.model)
+        print(f"Trained on {model.examples} messages, classes {model.classes}; wrote {args.model}")
+    if args.evaluate or not args.train:
+        report = evaluate(FastPathRouter(args.model), examples)
+        print(f"Hit rate {report['hit_rate']:.1%} (rules {report['rule_hits']}, model {report['model_hits']}, "
+              f"fell through {report['fallthrough']}); agreement with labels {report['agreement']:.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -28,6 +28,7 @@ except ImportError:
 
 from .agents import create_extractor_agent, create_reply_agent
 from .workflow_steps import process_and_log_step
+from data.json_store import claim_submission, release_submission, track_commits, user_scope
 
 def create_health_logger_workflow() -> Workflow:
     """
@@ -88,24 +89,44 @@ class HealthLoggerWorkflowWrapper:
         self.workflow = create_health_logger_workflow()
         print("Health Logger v3 (Pure Agno) initialized successfully")
     
-    def run(self, prompt: str, files: Optional[List[str]] = None):
+    def run(self, prompt: str, files: Optional[List[str]] = None, user_id: Optional[str] = None):
         """
         Run the multi-modal health logger workflow.
         
         Args:
             prompt: User's health message
             files: Optional file attachments (now fully supported for images)
+            user_id: User whose data partition is logged to (None: shared data directory)
             
         Returns:
             ChatResult with workflow response
         """
+        claim = None
+        commits = []
         try:
             # Import here to avoid circular imports
             from core.file_handler import process_uploaded_files, get_image_description
             
-            # Each user should have a unique session_id
-            # In a real multi-user app, this would be dynamic per user
-            session_id = "user_main_session"
+            # Each user has their own workflow session and data partition
+            session_id = user_id or "user_main_session"
+            
+            # Drop retried or double-clicked submissions before any extraction or storage work
+            submission = "\n".join([prompt or ""] + sorted(os.path.basename(f) for f in files or []))
+            claim = claim_submission(submission, user_id=user_id)
+            if claim is None:
+                from dataclasses import dataclass
+                from typing import Dict, Any
+                
+                @dataclass
+                class ChatResult:
+                    text: str
+                    meta: Optional[Dict[str, Any]] = None
+                
+                print("Skipping duplicate health log submission")
+                return ChatResult(
+                    text="I've already logged that update.",
+                    meta={"workflow": "Health Logger v3.1", "session_id": session_id, "duplicate": True}
+                )
             
             # --- NEW LOGIC: Process files using the file handler ---
             attachments = process_uploaded_files(files or [])
@@ -174,19 +195,21 @@ class HealthLoggerWorkflowWrapper:
             
             # Run the workflow with enhanced prompt and images
             try:
-                if images_for_workflow:
-                    print(f"Running workflow with {len(images_for_workflow)} image(s) and enhanced prompt")
-                    response = self.workflow.run(
-                        message=enhanced_prompt,
-                        images=images_for_workflow,
-                        session_id=session_id
-                    )
-                else:
-                    print("Running workflow with text-only prompt")
-                    response = self.workflow.run(
-                        message=enhanced_prompt,
-                        session_id=session_id
-                    )
+                # Storage calls made by the workflow steps go to this user's data
+                with user_scope(user_id), track_commits() as commits:
+                    if images_for_workflow:
+                        print(f"Running workflow with {len(images_for_workflow)} image(s) and enhanced prompt")
+                        response = self.workflow.run(
+                            message=enhanced_prompt,
+                            images=images_for_workflow,
+                            session_id=session_id
+                        )
+                    else:
+                        print("Running workflow with text-only prompt")
+                        response = self.workflow.run(
+                            message=enhanced_prompt,
+                            session_id=session_id
+                        )
                     
                 # Validate response content to prevent HTTP issues
                 if not hasattr(response, 'content') or not response.content:
@@ -233,4 +256,11 @@ class HealthLoggerWorkflowWrapper:
             return ChatResult(
                 text=f"Error in health logger workflow: {str(e)}",
                 meta={"error": str(e)}
-            )
\ No newline at end of file
+            )
+        
+        finally:
+            # Steps report storage failures as an "error" action instead of
+            # raising, so only a committed write keeps the submission claimed;
+            # anything else lets the user retry the same message
+            if claim is not None and not commits:
+                release_submission(claim, user_id=user_id)
\ No newline at end of file
@@ -21,10 +21,11 @@ except ImportError:
 
 from healthlogger.schema_router import RouterOutput, SimpleRouterOutput
 from data.schemas.episodes import ProcessingResult, EpisodeCandidate
-from core.ontology import CONDITION_FAMILIES, normalize_condition
+from core.ontology import conditions_match, normalize_condition
 from data.json_store import (
     fetch_open_episode_candidates, create_episode,
-    update_episode, add_intervention, save_observation, append_event, get_episode_by_id
+    update_episode, add_intervention, save_observation, append_event, get_episode_by_id,
+    transaction
 )
 
 # Policy configuration - importing from core.policies
@@ -156,15 +157,8 @@ def _find_best_candidate(
 
 def _conditions_match(condition1: str, condition2: str) -> bool:
     """Check if two conditions are in the same family"""
-    if condition1 == condition2:
-        return True
-    
-    # Check condition families
-    for family, conditions in CONDITION_FAMILIES.items():
-        if condition1 in conditions and condition2 in conditions:
-            return True
-    
-    return False
+    # Precomputed family lookup, cached per ontology version
+    return conditions_match(condition1, condition2)
 
 def _is_episode_recent(candidate: EpisodeCandidate, now: datetime, window_hours: int) -> bool:
     """Check if episode was updated recently enough"""
@@ -278,68 +272,74 @@ def process_and_log_step(step_input: StepInput) -> StepOutput:
     final_episode_id = None
     
     try:
-        if action == "create":
-            final_episode_id = create_episode(
-                condition=router_output.condition or "general",
-                fields=router_output.fields.dict(),
-                now=now.isoformat()
-            )
-            details.append(f"Created new {router_output.condition} episode")
-            session_state["open_episode_id"] = final_episode_id
-            
-        elif action == "update":
-            final_episode_id = episode_id
-            success = update_episode(
-                episode_id=episode_id,
-                fields=router_output.fields.dict(),
-                now=now.isoformat()
-            )
-            if success:
-                details.append(f"Updated {router_output.condition} episode")
-                if router_output.fields.severity:
-                    details.append(f"Severity: {router_output.fields.severity}/10")
+        # Commit the whole turn at once: one write per file, nothing on error
+        with transaction():
+            if action == "create":
+                final_episode_id = create_episode(
+                    condition=router_output.condition or "general",
+                    fields=router_output.fields.dict(),
+                    now=now.isoformat()
+                )
+                details.append(f"Created new {router_output.condition} episode")
                 session_state["open_episode_id"] = final_episode_id
-            else:
-                details.append("Failed to update episode")
-                
-        elif action == "observation":
-            obs_id = save_observation(
-                category=router_output.condition or "general",
-                fields=router_output.fields.dict(),
-                now=now.isoformat()
-            )
-            details.append(f"Saved {router_output.condition or 'general'} observation")
             
-        # Handle interventions
-        for intervention in router_output.interventions:
-            if final_episode_id:
-                int_id = add_intervention(
-                    episode_id=final_episode_id,
-                    intervention=intervention.dict(),
+            elif action == "update":
+                final_episode_id = episode_id
+                success = update_episode(
+                    episode_id=episode_id,
+                    fields=router_output.fields.dict(),
                     now=now.isoformat()
                 )
-                details.append(f"Added intervention: {intervention.type}")
+                if success:
+                    details.append(f"Updated {router_output.condition} episode")
+                    if router_output.fields.severity:
+                        details.append(f"Severity: {router_output.fields.severity}/10")
+                    session_state["open_episode_id"] = final_episode_id
+                else:
+                    details.append("Failed to update episode")
+                
             elif action == "observation":
-                # Intervention without episode - save as observation
                 obs_id = save_observation(
-                    category="intervention",
-                    fields={"type": intervention.type, "notes": intervention.notes},
+                    category=router_output.condition or "general",
+                    fields=router_output.fields.dict(),
                     now=now.isoformat()
                 )
-                details.append(f"Recorded intervention: {intervention.type}")
+                details.append(f"Saved {router_output.condition or 'general'} observation")
+            
+            # Handle interventions
+            for intervention in router_output.interventions:
+                if final_episode_id:
+                    int_id = add_intervention(
+                        episode_id=final_episode_id,
+                        intervention=intervention.dict(),
+                        now=now.isoformat()
+                    )
+                    details.append(f"Added intervention: {intervention.type}")
+                elif action == "observation":
+                    # Intervention without episode - save as observation
+                    obs_id = save_observation(
+                        category="intervention",
+                        fields={"type": intervention.type, "notes": intervention.notes},
+                        now=now.isoformat()
+                    )
+                    details.append(f"Recorded intervention: {intervention.type}")
         
-        # Log event for audit trail
-        append_event(
-            user_text=router_output.fields.notes or "",
-            parsed_data=router_output.dict(),
-            action=action,
-            model="gpt-4o-mini-2024-07-18",
-            confidence=router_output.confidence,
-            episode_id=final_episode_id
-        )
+            # Log event for audit trail
+            append_event(
+                user_text=router_output.fields.notes or "",
+                parsed_data=router_output.dict(),
+                action=action,
+                model="gpt-4o-mini-2024-07-18",
+                confidence=router_output.confidence,
+                episode_id=final_episode_id
+            )
         
     except Exception as e:
         details.append(f"Error: {str(e)}")
+        if action == "create":
+            # The new episode was rolled back with the rest of the turn
+            session_state.pop("open_episode_id", None)
+            final_episode_id = None
         action = "error"
     
     # Create result
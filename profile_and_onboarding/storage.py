@@ -2,10 +2,15 @@
 import json
 import uuid
 import hashlib
+import threading
 from abc import ABC, abstractmethod
+from contextlib import contextmanager
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Optional, List
+from typing import Optional, Dict, Iterator, List
+from data.dataset_cache import load_json, thaw
+from data.file_io import atomic_write_json, file_lock, iter_lines_reverse, locked_append
+from data.json_store import user_subdir
 from .schema import UserProfile, ProfileEvent, Medication, Condition, Routine
 
 class ProfileStorageInterface(ABC):
@@ -50,28 +55,78 @@ class ProfileStorageInterface(ABC):
     def append_event(self, event: ProfileEvent) -> None:
         """Append event to audit log"""
         pass
+    
+    @contextmanager
+    def batch(self, user_id: str, source: str) -> Iterator[None]:
+        """
+        Group several updates to one user's profile into a single write.
+        Stores that cannot coalesce writes apply each update immediately.
+        """
+        yield
+
+# Profile saves repeating one from this recently are dropped as duplicates
+DEDUP_WINDOW_SECONDS = 5 * 60
+DEDUP_BUCKET_SECONDS = 60
+
+class _ProfileBatch:
+    """Pending changes to one user's profile inside JsonProfileStore.batch()"""
+    
+    def __init__(self, user_id: str, source: str):
+        self.user_id = user_id
+        self.source = source
+        self.profile: Optional[UserProfile] = None
+        self.events: List[ProfileEvent] = []
 
 class JsonProfileStore(ProfileStorageInterface):
-    """JSON implementation following data/json_store.py atomic patterns"""
+    """
+    JSON implementation following data/json_store.py atomic patterns.
+    
+    Each user's profile is its own file in the user's data partition
+    (``users/<user_id>/profile.json``), so reads and saves only touch that
+    user's record.  Profiles still in the old all-users
+    ``user_profiles.json`` are moved to their own file on first read.
+    """
     
     def __init__(self, storage_path: Path = Path("data")):
-        self.profile_file = storage_path / "user_profiles.json"
+        self.storage_path = storage_path
+        self.legacy_profile_file = storage_path / "user_profiles.json"
         self.events_file = storage_path / "profile_events.jsonl"
         storage_path.mkdir(exist_ok=True)
         
-        # Load existing profiles
-        self.profiles = self._load_profiles()
+        # Idempotency keys of recent events: user_id -> minute bucket -> {key: epoch}.
+        # Rebuilt from the end of the audit log, then kept current by reading
+        # only the lines appended since _events_offset.
+        self._recent_keys: Dict[str, Dict[int, Dict[str, float]]] = {}
+        self._events_offset: Optional[int] = None
+        
+        # Open batch() of the current thread, if any
+        self._local = threading.local()
     
-    def _load_profiles(self) -> dict:
-        """Load profiles with error handling"""
-        if not self.profile_file.exists():
-            return {}
-        try:
-            with open(self.profile_file, 'r') as f:
-                return json.load(f)
-        except (json.JSONDecodeError, IOError) as e:
-            print(f"Error loading profiles: {e}")
-            return {}
+    def profile_path(self, user_id: str) -> Path:
+        """File holding a user's profile"""
+        return self.storage_path / user_subdir(user_id) / "profile.json"
+    
+    def _read_profile(self, user_id: str) -> Optional[dict]:
+        """A user's stored profile data, migrating it from user_profiles.json if needed"""
+        data = load_json(self.profile_path(user_id), None)
+        if data is not None:
+            return thaw(data)
+        legacy = load_json(self.legacy_profile_file, {}).get(user_id)
+        if not legacy:
+            return None
+        path = self.profile_path(user_id)
+        with file_lock(path):
+            if not path.exists():
+                path.parent.mkdir(parents=True, exist_ok=True)
+                atomic_write_json(path, legacy)
+        return thaw(load_json(path, legacy))
+    
+    def _write_profile(self, user_id: str, profile_data: dict) -> None:
+        """Atomic save through data/file_io.py (lock + temp file + os.replace)"""
+        path = self.profile_path(user_id)
+        with file_lock(path):
+            path.parent.mkdir(parents=True, exist_ok=True)
+            atomic_write_json(path, profile_data)
     
     def _generate_idempotency_key(self, user_id: str, entity: str, payload: dict) -> str:
         """Generate idempotency key following existing patterns"""
@@ -79,28 +134,50 @@ class JsonProfileStore(ProfileStorageInterface):
         raw_string = f"{user_id}:{entity}:{payload_str}"
         return hashlib.sha256(raw_string.encode()).hexdigest()
     
-    def _atomic_save_profiles(self) -> None:
-        """Atomic save following data/json_store.py patterns"""
-        temp_file = self.profile_file.with_suffix(".tmp")
+    def _active_batch(self, user_id: str) -> Optional[_ProfileBatch]:
+        batch = getattr(self._local, "batch", None)
+        return batch if batch is not None and batch.user_id == user_id else None
+    
+    @contextmanager
+    def batch(self, user_id: str, source: str) -> Iterator[None]:
+        """
+        Apply several changes to one user's profile with a single write::
+        
+            with store.batch(user_id, source="chat"):
+                store.add_or_update_medication(user_id, medication, source="chat")
+                store.deactivate_condition(user_id, "insomnia", source="chat")
+        
+        Inside the block, changes are made to an in-memory copy of the
+        profile and audit events are buffered.  On exit the profile is saved
+        with one atomic rewrite of the profile file and the events are
+        written with one append.  If the block raises, nothing is saved.
+        """
+        current = getattr(self._local, "batch", None)
+        if current is not None:
+            if current.user_id != user_id:
+                raise ValueError("A profile batch can only change one user's profile")
+            yield
+            return
+        
+        batch = self._local.batch = _ProfileBatch(user_id, source)
         try:
-            with open(temp_file, 'w') as f:
-                json.dump(self.profiles, f, indent=2, default=str)
-            
-            # Handle Windows file replacement
-            if self.profile_file.exists():
-                self.profile_file.unlink()
-            temp_file.rename(self.profile_file)
-        except Exception as e:
-            if temp_file.exists():
-                try:
-                    temp_file.unlink()
-                except:
-                    pass
-            raise e
+            yield
+        finally:
+            self._local.batch = None
+        
+        events = []
+        if batch.profile is not None:
+            profile_event = self._save_profile(batch.profile, batch.source)
+            if profile_event is not None:
+                events.append(profile_event)
+        self._append_events(events + batch.events)
     
     def get_profile(self, user_id: str) -> Optional[UserProfile]:
         """Get user profile with error handling"""
-        profile_data = self.profiles.get(user_id)
+        batch = self._active_batch(user_id)
+        if batch is not None and batch.profile is not None:
+            return batch.profile
+        profile_data = self._read_profile(user_id)
         if not profile_data:
             return None
         try:
@@ -111,8 +188,21 @@ class JsonProfileStore(ProfileStorageInterface):
     
     def save_profile(self, profile: UserProfile, source: str) -> None:
         """Save profile with audit trail and idempotency"""
+        batch = self._active_batch(profile.user_id)
+        if batch is not None:
+            # Saved once when the batch ends
+            batch.profile = profile
+            batch.source = source
+            return
+        
+        event = self._save_profile(profile, source)
+        if event is not None:
+            self.append_event(event)
+    
+    def _save_profile(self, profile: UserProfile, source: str) -> Optional[ProfileEvent]:
+        """Write the profile; returns its audit event, or None for a duplicate save"""
         # Get before state for audit
-        before_state = self.profiles.get(profile.user_id)
+        before_state = self._read_profile(profile.user_id)
         
         # Update timestamps
         profile.last_updated_at = datetime.now(timezone.utc)
@@ -125,17 +215,15 @@ class JsonProfileStore(ProfileStorageInterface):
         )
         
         # Check for duplicate operations (basic deduplication)
-        recent_events = self._get_recent_events(profile.user_id, minutes=5)
-        if any(event.get("idempotency_key") == idempotency_key for event in recent_events):
+        if self._is_recent_duplicate(profile.user_id, idempotency_key):
             print(f"Duplicate profile save operation detected for {profile.user_id}")
-            return
+            return None
         
         # Atomic save
-        self.profiles[profile.user_id] = profile_dict
-        self._atomic_save_profiles()
+        self._write_profile(profile.user_id, profile_dict)
         
         # Create audit event
-        event = ProfileEvent(
+        return ProfileEvent(
             user_id=profile.user_id,
             kind="update" if before_state else "create",
             entity="profile",
@@ -144,7 +232,6 @@ class JsonProfileStore(ProfileStorageInterface):
             source=source,
             idempotency_key=idempotency_key
         )
-        self.append_event(event)
     
     def add_or_update_medication(self, user_id: str, medication: Medication, source: str) -> None:
         """Add or update medication with audit trail"""
@@ -336,37 +423,90 @@ class JsonProfileStore(ProfileStorageInterface):
     
     def append_event(self, event: ProfileEvent) -> None:
         """Append event to audit log following events.jsonl pattern"""
+        batch = self._active_batch(event.user_id)
+        if batch is not None:
+            batch.events.append(event)
+            return
+        self._append_events([event])
+    
+    def _append_events(self, events: List[ProfileEvent]) -> None:
+        """Append events to the audit log with a single write"""
+        if not events:
+            return
         try:
-            with open(self.events_file, "a") as f:
-                f.write(event.model_dump_json() + "\n")
+            locked_append(self.events_file, "".join(event.model_dump_json() + "\n" for event in events))
         except IOError as e:
             print(f"Error writing event: {e}")
     
-    def _get_recent_events(self, user_id: str, minutes: int = 5) -> List[dict]:
-        """Get recent events for deduplication"""
-        # Simplified implementation - in production, would use more efficient approach
-        if not self.events_file.exists():
-            return []
-        
-        cutoff_time = datetime.now(timezone.utc).timestamp() - (minutes * 60)
-        recent_events = []
-        
+    def _remember_key(self, user_id: str, key: str, ts: float, now: float) -> None:
+        if ts <= now - DEDUP_WINDOW_SECONDS:
+            return
+        buckets = self._recent_keys.setdefault(user_id, {})
+        buckets.setdefault(int(ts // DEDUP_BUCKET_SECONDS), {})[key] = ts
+        # Drop buckets that have left the window
+        oldest = int((now - DEDUP_WINDOW_SECONDS) // DEDUP_BUCKET_SECONDS)
+        for bucket in [b for b in buckets if b < oldest]:
+            del buckets[bucket]
+    
+    def _remember_line(self, line: str, now: float) -> Optional[float]:
+        """Add an audit log line to the ring; returns its epoch, if it has one"""
         try:
-            with open(self.events_file, "r") as f:
-                for line in f:
-                    try:
-                        event = json.loads(line.strip())
-                        if (event.get("user_id") == user_id and 
-                            datetime.fromisoformat(event.get("ts", "")).timestamp() > cutoff_time):
-                            recent_events.append(event)
-                    except (json.JSONDecodeError, ValueError):
-                        continue
-        except IOError:
-            pass
-        
-        return recent_events
+            event = json.loads(line)
+            ts = datetime.fromisoformat(event.get("ts", "")).timestamp()
+        except (json.JSONDecodeError, ValueError, TypeError, AttributeError):
+            return None
+        if event.get("user_id") and event.get("idempotency_key"):
+            self._remember_key(event["user_id"], event["idempotency_key"], ts, now)
+        return ts
+    
+    def _sync_recent_keys(self) -> None:
+        """Bring the ring up to date with the audit log"""
+        now = datetime.now(timezone.utc).timestamp()
+        with file_lock(self.events_file):
+            try:
+                size = self.events_file.stat().st_size
+            except FileNotFoundError:
+                size = 0
+            if self._events_offset is None or size < self._events_offset:
+                # First use, or the log was replaced: read back through the window only
+                self._recent_keys = {}
+                for line in iter_lines_reverse(self.events_file):
+                    ts = self._remember_line(line, now)
+                    if ts is not None and ts <= now - DEDUP_WINDOW_SECONDS:
+                        break
+            elif size > self._events_offset:
+                with open(self.events_file, "rb") as f:
+                    f.seek(self._events_offset)
+                    for raw in f:
+                        if raw.strip():
+                            self._remember_line(raw.decode("utf-8"), now)
+            self._events_offset = size
+    
+    def _is_recent_duplicate(self, user_id: str, idempotency_key: str) -> bool:
+        """Whether an event with this key was logged for the user within the dedup window"""
+        self._sync_recent_keys()
+        cutoff = datetime.now(timezone.utc).timestamp() - DEDUP_WINDOW_SECONDS
+        for keys in self._recent_keys.get(user_id, {}).values():
+            ts = keys.get(idempotency_key)
+            if ts is not None and ts > cutoff:
+                return True
+        return False
+
+# One store per data directory for the whole process
+_profile_stores: Dict[Path, JsonProfileStore] = {}
+_profile_stores_lock = threading.Lock()
 
 # Factory function for dependency injection
-def get_profile_store() -> ProfileStorageInterface:
-    """Factory function following existing patterns"""
-    return JsonProfileStore()
\ No newline at end of file
+def get_profile_store(storage_path: Path = Path("data")) -> ProfileStorageInterface:
+    """
+    Shared profile store for a data directory.
+    
+    Created on first use and reused afterwards, so callers do not pay
+    for a new store (and its dedup state) on every call.
+    """
+    key = Path(storage_path).resolve()
+    with _profile_stores_lock:
+        store = _profile_stores.get(key)
+        if store is None:
+            store = _profile_stores[key] = JsonProfileStore(Path(storage_path))
+        return store
\ No newline at end of file
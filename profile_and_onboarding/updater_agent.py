@@ -120,60 +120,62 @@ class ProfileUpdater:
         try:
             changes_applied = []
             
-            for change_detail in proposed_changes.changes:
-                try:
-                    if change_detail.entity == "medication":
-                        if change_detail.action == "deactivate":
-                            self.profile_store.deactivate_medication(
-                                user_id, 
-                                change_detail.data.name, 
-                                source="chat"
-                            )
-                            changes_applied.append(f"Removed medication: {change_detail.data.name}")
-                        else:
-                            from .schema import Medication
-                            medication = Medication(
-                                name=change_detail.data.name,
-                                type=change_detail.data.type,
-                                dose=change_detail.data.dose,
-                                schedule=change_detail.data.schedule,
-                                prescriber=getattr(change_detail.data, 'prescriber', None),
-                                source="chat"
-                            )
-                            self.profile_store.add_or_update_medication(user_id, medication, source="chat")
-                            changes_applied.append(f"Updated medication: {medication.name}")
+            # Apply every change in memory, then save the profile and audit events once
+            with self.profile_store.batch(user_id, source="chat"):
+                for change_detail in proposed_changes.changes:
+                    try:
+                        if change_detail.entity == "medication":
+                            if change_detail.action == "deactivate":
+                                self.profile_store.deactivate_medication(
+                                    user_id, 
+                                    change_detail.data.name, 
+                                    source="chat"
+                                )
+                                changes_applied.append(f"Removed medication: {change_detail.data.name}")
+                            else:
+                                from .schema import Medication
+                                medication = Medication(
+                                    name=change_detail.data.name,
+                                    type=change_detail.data.type,
+                                    dose=change_detail.data.dose,
+                                    schedule=change_detail.data.schedule,
+                                    prescriber=getattr(change_detail.data, 'prescriber', None),
+                                    source="chat"
+                                )
+                                self.profile_store.add_or_update_medication(user_id, medication, source="chat")
+                                changes_applied.append(f"Updated medication: {medication.name}")
                     
-                    elif change_detail.entity == "condition":
-                        if change_detail.action == "deactivate":
-                            self.profile_store.deactivate_condition(
-                                user_id,
-                                change_detail.data.name,
-                                source="chat"
-                            )
-                            changes_applied.append(f"Removed condition: {change_detail.data.name}")
-                        else:
-                            from .schema import Condition
-                            condition = Condition(
-                                name=change_detail.data.name,
-                                severity=getattr(change_detail.data, 'severity', None),
-                                source="chat"
-                            )
-                            self.profile_store.add_or_update_condition(user_id, condition, source="chat")
-                            changes_applied.append(f"Updated condition: {condition.name}")
+                        elif change_detail.entity == "condition":
+                            if change_detail.action == "deactivate":
+                                self.profile_store.deactivate_condition(
+                                    user_id,
+                                    change_detail.data.name,
+                                    source="chat"
+                                )
+                                changes_applied.append(f"Removed condition: {change_detail.data.name}")
+                            else:
+                                from .schema import Condition
+                                condition = Condition(
+                                    name=change_detail.data.name,
+                                    severity=getattr(change_detail.data, 'severity', None),
+                                    source="chat"
+                                )
+                                self.profile_store.add_or_update_condition(user_id, condition, source="chat")
+                                changes_applied.append(f"Updated condition: {condition.name}")
                     
-                    elif change_detail.entity == "routine":
-                        from .schema import Routine
-                        routine = Routine(
-                            category=change_detail.data.category,
-                            pattern=change_detail.data.pattern,
-                            frequency=getattr(change_detail.data, 'frequency', None)
-                        )
-                        self.profile_store.add_or_update_routine(user_id, routine, source="chat")
-                        changes_applied.append(f"Updated routine: {routine.category} - {routine.pattern}")
+                        elif change_detail.entity == "routine":
+                            from .schema import Routine
+                            routine = Routine(
+                                category=change_detail.data.category,
+                                pattern=change_detail.data.pattern,
+                                frequency=getattr(change_detail.data, 'frequency', None)
+                            )
+                            self.profile_store.add_or_update_routine(user_id, routine, source="chat")
+                            changes_applied.append(f"Updated routine: {routine.category} - {routine.pattern}")
                         
-                except Exception as e:
-                    print(f"Error applying individual change: {e}")
-                    continue
+                    except Exception as e:
+                        print(f"Error applying individual change: {e}")
+                        continue
             
             if changes_applied:
                 changes_text = "\n".join([f"* {change}" for change in changes_applied])
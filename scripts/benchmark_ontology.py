@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Ontology Matcher Benchmark
+Times condition normalization with the compiled matcher against the old
+per-synonym substring scan, for the real ontology and for larger synthetic
+ones.
+
+Usage:
+    python scripts/benchmark_ontology.py [--texts 2000] [--scale 1 10 100]
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from core.ontology import CONDITION_FAMILIES, ConditionMatcher
+
+SAMPLE_TEXTS = [
+    "Woke up with a throbbing headache behind my eye",
+    "Heartburn again after a late dinner, took an antacid",
+    "Slept 5 hours, feeling tired and a bit down",
+    "Lower back pain after gardening, stiff neck too",
+    "Wheezing on the walk home, used my inhaler",
+    "Anxious before the meeting, mild panic",
+    "Had oatmeal and coffee for breakfast",
+    "Took 400mg ibuprofen at 3pm",
+]
+
+
+def substring_scan(families, text):
+    """The previous normalize_condition: nested substring checks in dict order."""
+    text_lower = text.lower()
+    for condition, synonyms in families.items():
+        if any(synonym in text_lower for synonym in synonyms):
+            return condition
+    return None
+
+
+def scaled_families(scale):
+    """The real ontology plus synthetic families, scale times its size in total."""
+    families = dict(CONDITION_FAMILIES)
+    rng = random.Random(0)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    for i in range(len(CONDITION_FAMILIES) * (scale - 1)):
+        families[f"synthetic_{i}"] = [
+            "".join(rng.choice(letters) for _ in range(rng.randint(5, 12))) for _ in range(6)
+        ]
+    return families
+
+
+def time_calls(func, texts):
+    start = time.perf_counter()
+    for text in texts:
+        func(text)
+    return (time.perf_counter() - start) / len(texts) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark condition normalization")
+    parser.add_argument("--texts", type=int, default=2000, help="Texts normalized per run")
+    parser.add_argument("--scale", type=int, nargs="+", default=[1, 10, 100],
+                        help="Ontology sizes, as multiples of the real one")
+    args = parser.parse_args()
+
+    texts = [SAMPLE_TEXTS[i % len(SAMPLE_TEXTS)] for i in range(args.texts)]
+    print(f"{'families':>9} {'synonyms':>9} {'scan us/call':>13} {'matcher us/call':>16} {'build ms':>9}")
+    for scale in args.scale:
+        families = scaled_families(scale)
+        build_start = time.perf_counter()
+        matcher = ConditionMatcher(families)
+        build_ms = (time.perf_counter() - build_start) * 1000
+
+        mismatches = sum(substring_scan(families, t) != matcher.best(t) for t in SAMPLE_TEXTS)
+        scan_us = time_calls(lambda text: substring_scan(families, text), texts)
+        matcher_us = time_calls(matcher.best, texts)
+        synonyms = sum(len(s) for s in families.values())
+        print(f"{len(families):>9} {synonyms:>9} {scan_us:>13.2f} {matcher_us:>16.2f} {build_ms:>9.1f}")
+        if mismatches:
+            print(f"   {mismatches} sample text(s) normalize differently (word-boundary matching)")
+
+
+if __name__ == '__main__':
+    main()
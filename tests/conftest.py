@@ -0,0 +1,33 @@
+"""
+Shared fixtures for the data-layer tests.
+"""
+
+import shutil
+import tempfile
+from pathlib import Path
+
+import pytest
+
+from data import json_store
+
+
+@pytest.fixture
+def json_store_dir(monkeypatch):
+    """Point data.json_store at an empty temporary data directory."""
+    tmp_dir = Path(tempfile.mkdtemp())
+    monkeypatch.setattr(json_store, "DATA_DIR", tmp_dir)
+    monkeypatch.setattr(json_store, "EPISODES_FILE", tmp_dir / "episodes.json")
+    monkeypatch.setattr(json_store, "OBSERVATIONS_FILE", tmp_dir / "observations.json")
+    monkeypatch.setattr(json_store, "INTERVENTIONS_FILE", tmp_dir / "interventions.json")
+    monkeypatch.setattr(json_store, "EVENTS_FILE", tmp_dir / "events.jsonl")
+    monkeypatch.setattr(json_store, "OPEN_INDEX_FILE", tmp_dir / "open_episodes.index.json")
+    monkeypatch.setattr(json_store, "DAILY_HISTORY_FILE", tmp_dir / "daily_history.json")
+    monkeypatch.setattr(json_store, "IDEMPOTENCY_FILE", tmp_dir / "event_hashes.json")
+    monkeypatch.setattr(json_store, "STORAGE_MODE", "json")
+    monkeypatch.setattr(json_store, "_episode_wals", {})
+    monkeypatch.setattr(json_store, "_open_indexes", {})
+    monkeypatch.setattr(json_store, "_wal_keyword_indexes", {})
+    monkeypatch.setattr(json_store, "_wal_episode_tables", {})
+    monkeypatch.setattr(json_store, "_idempotency_indexes", {})
+    yield tmp_dir
+    shutil.rmtree(tmp_dir, ignore_errors=True)
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Test the temporal correlation engine.
+Windowed join against brute force, shuffled baseline and lift, lag histogram.
+"""
+
+import random
+
+import pytest
+
+from health_advisor.recall import correlation
+from health_advisor.recall.correlation import analyze, count_hits, lag_histogram, windowed_pairs
+
+HOUR = 3600
+DAY = 24 * HOUR
+
+
+def _brute_force_pairs(obs_ts, episode_ts, window):
+    return sorted(
+        (i, j, ep - obs)
+        for i, obs in enumerate(obs_ts)
+        for j, ep in enumerate(episode_ts)
+        if abs(ep - obs) <= window
+    )
+
+
+@pytest.fixture(params=["python", "numpy"])
+def backend(request, monkeypatch):
+    if request.param == "numpy":
+        if not correlation.NUMPY_AVAILABLE:
+            pytest.skip("numpy not installed")
+        monkeypatch.setattr(correlation, "NUMPY_MIN_OBSERVATIONS", 0)
+    else:
+        monkeypatch.setattr(correlation, "NUMPY_AVAILABLE", False)
+    return request.param
+
+
+class TestWindowedJoin:
+    """Test the join against the O(N x M) definition."""
+
+    def test_matches_brute_force(self, backend):
+        rng = random.Random(7)
+        obs_ts = [rng.uniform(0, 60 * DAY) for _ in range(300)]
+        episode_ts = sorted(rng.uniform(0, 60 * DAY) for _ in range(80))
+
+        pairs = sorted(windowed_pairs(obs_ts, episode_ts, 24 * HOUR))
+        expected = _brute_force_pairs(obs_ts, episode_ts, 24 * HOUR)
+        assert [(i, j) for i, j, _ in pairs] == [(i, j) for i, j, _ in expected]
+        assert all(abs(a[2] - b[2]) < 1e-6 for a, b in zip(pairs, expected))
+
+        hit_obs = {i for i, _, _ in expected}
+        assert count_hits(obs_ts, episode_ts, 24 * HOUR) == len(hit_obs)
+
+    def test_empty_inputs(self, backend):
+        assert windowed_pairs([], [1.0], HOUR) == []
+        assert count_hits([1.0], [], HOUR) == 0
+
+
+class TestBaseline:
+    """Test lift and p-value against shuffled timing."""
+
+    def test_trigger_beats_chance(self, backend):
+        # Episodes start 6 hours after every (irregularly timed) trigger
+        rng = random.Random(5)
+        obs_ts = sorted(rng.uniform(0, 60 * DAY) for _ in range(12))
+        episode_ts = [ts + 6 * HOUR for ts in obs_ts]
+
+        stats = analyze(obs_ts, episode_ts, 12, 0, 60 * DAY, n_shuffles=200)
+        assert stats.observed_rate == 1.0
+        assert stats.lift > 2
+        assert stats.p_value < 0.05
+        six_hour_pairs = {(i, j) for i, j, lag in stats.pairs if abs(lag - 6 * HOUR) < 1e-6}
+        assert {(i, i) for i in range(12)} <= six_hour_pairs
+
+    def test_unrelated_observations_near_baseline(self, backend):
+        rng = random.Random(3)
+        obs_ts = [rng.uniform(0, 90 * DAY) for _ in range(400)]
+        episode_ts = sorted(rng.uniform(0, 90 * DAY) for _ in range(30))
+
+        stats = analyze(obs_ts, episode_ts, 24, 0, 90 * DAY)
+        assert 0.7 < stats.lift < 1.3
+        assert stats.p_value > 0.05
+
+    def test_baseline_is_reproducible(self, backend):
+        obs_ts = [i * 7 * HOUR for i in range(50)]
+        episode_ts = [i * DAY for i in range(15)]
+        first = analyze(obs_ts, episode_ts, 6, 0, 15 * DAY, seed=11)
+        second = analyze(obs_ts, episode_ts, 6, 0, 15 * DAY, seed=11)
+        assert first.baseline_rate == second.baseline_rate
+
+
+class TestLagHistogram:
+    """Test signed lag binning."""
+
+    def test_bins_cover_window(self):
+        histogram = lag_histogram([-23 * HOUR, -1, 0, 5 * HOUR, 24 * HOUR], 24 * HOUR, bins=4)
+        assert [(low, high) for low, high, _ in histogram] == [(-24, -12), (-12, 0), (0, 12), (12, 24)]
+        assert [count for _, _, count in histogram] == [1, 1, 2, 1]
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Test the daily history aggregates.
+Incremental updates from json_store writes, and agreement with compile_day.
+"""
+
+import json
+
+import pytest
+
+from data import daily_history, json_store
+
+
+def _history(path):
+    return {record["date"]: record for record in json.loads(path.read_text())}
+
+
+class TestIncrementalHistory:
+    """Test that json_store commits keep daily_history.json current."""
+
+    @pytest.fixture(autouse=True)
+    def store(self, json_store_dir):
+        self.path = json_store.DAILY_HISTORY_FILE
+
+    def test_writes_update_their_day(self):
+        first = json_store.create_episode("migraine", {"severity": 4}, now="2025-08-10T09:00:00")
+        json_store.create_episode("reflux", {"severity": 2}, now="2025-08-10T12:00:00")
+        json_store.save_observation("diet", {"notes": "tofu"}, now="2025-08-10T08:00:00")
+        json_store.save_observation("sleep", {"notes": "5h"}, now="2025-08-11T07:00:00")
+
+        day = _history(self.path)["2025-08-10"]
+        assert (day["episodes"], day["observations"], day["avg_pain"], day["max_pain"]) == (2, 1, 3.0, 4)
+        assert _history(self.path)["2025-08-11"]["observations"] == 1
+
+        # Raising the severity replaces the episode's old contribution
+        json_store.update_episode(first, {"severity": 8}, now="2025-08-10T10:00:00")
+        json_store.add_intervention(first, {"type": "ibuprofen"}, now="2025-08-10T10:05:00")
+        day = _history(self.path)["2025-08-10"]
+        assert (day["episodes"], day["avg_pain"], day["max_pain"]) == (2, 5.0, 8)
+        assert day["pain_levels"] == {"8": 1, "2": 1}
+        migraine = day["conditions"]["migraine"]
+        assert (migraine["episodes"], migraine["max_pain"], migraine["interventions"]) == (1, 8, {"ibuprofen": 1})
+
+    def test_matches_compile_day(self):
+        for hour, severity in ((8, 3), (9, 6), (15, None)):
+            episode_id = json_store.create_episode(
+                "migraine", {"severity": severity}, now=f"2025-08-12T{hour:02d}:00:00"
+            )
+            json_store.add_intervention(episode_id, {"type": "rest"}, now=f"2025-08-12T{hour:02d}:30:00")
+        json_store.save_observation("diet", {"notes": "coffee"}, now="2025-08-12T07:00:00")
+
+        incremental = _history(self.path)["2025-08-12"]
+        compiled = daily_history.compile_day("2025-08-12")
+        assert daily_history.asdict(compiled) == incremental
+
+    def test_wal_mode(self, monkeypatch):
+        monkeypatch.setattr(json_store, "STORAGE_MODE", "wal")
+        episode_id = json_store.create_episode("migraine", {"severity": 5}, now="2025-08-13T09:00:00")
+        json_store.update_episode(episode_id, {"severity": 7}, now="2025-08-13T10:00:00")
+        assert _history(self.path)["2025-08-13"]["pain_levels"] == {"7": 1}
+
+    def test_local_days_follow_user_timezone(self, monkeypatch):
+        monkeypatch.setattr(json_store, "current_timezone", lambda: "America/New_York")
+        # 01:30 UTC on the 14th is still the evening of the 13th in New York
+        json_store.create_episode("migraine", {"severity": 5}, now="2025-08-14T01:30:00")
+        json_store.save_observation("diet", {"notes": "pizza"}, now="2025-08-14T02:00:00")
+
+        history = _history(self.path)
+        assert "2025-08-14" not in history
+        assert (history["2025-08-13"]["episodes"], history["2025-08-13"]["observations"]) == (1, 1)
+        compiled = daily_history.compile_day("2025-08-13", tz="America/New_York")
+        assert daily_history.asdict(compiled) == history["2025-08-13"]
+
+
+class TestCompileRange:
+    """Test single-pass backfill over a range of days."""
+
+    @pytest.fixture(autouse=True)
+    def store(self, json_store_dir):
+        json_store.create_episode("migraine", {"severity": 6}, now="2025-08-10T02:00:00")
+        json_store.create_episode("migraine", {"severity": 2}, now="2025-08-12T20:00:00")
+        json_store.save_observation("diet", {"notes": "tofu"}, now="2025-08-11T03:00:00")
+
+    def test_matches_incremental_history(self):
+        incremental = _history(json_store.DAILY_HISTORY_FILE)
+        json_store.DAILY_HISTORY_FILE.unlink()
+
+        report = daily_history.compile_range("2025-08-09", "2025-08-13")
+        assert [r.date for r in report.records] == [f"2025-08-{d:02d}" for d in range(9, 14)]
+        assert (report.episodes, report.observations) == (2, 1)
+        rebuilt = _history(json_store.DAILY_HISTORY_FILE)
+        for date, record in incremental.items():
+            assert rebuilt[date] == record
+        assert rebuilt["2025-08-09"]["episodes"] == 0
+
+    def test_local_day_buckets(self, tmp_path):
+        output = tmp_path / "local_history.json"
+        report = daily_history.compile_range("2025-08-09", "2025-08-12", tz="America/New_York", path=output)
+        by_date = {r.date: r for r in report.records}
+        # 02:00 UTC on the 10th is the evening of the 9th in New York
+        assert by_date["2025-08-09"].episodes == 1
+        assert by_date["2025-08-10"].observations == 1
+        assert by_date["2025-08-12"].max_pain == 2
+        assert not json_store.DAILY_HISTORY_FILE.read_text().count("2025-08-09")
+
+    def test_cli_reports_throughput(self, capsys):
+        daily_history.main(["--start", "2025-08-10", "--end", "2025-08-12"])
+        out = capsys.readouterr().out
+        assert "Compiled 3 days from 2 episodes and 1 observations" in out
+        assert "records/sec" in out
+
+    def test_wal_mode_sees_uncompacted_episodes(self, monkeypatch):
+        monkeypatch.setattr(json_store, "STORAGE_MODE", "wal")
+        json_store.create_episode("reflux", {"severity": 3}, now="2025-08-11T12:00:00")
+        assert "reflux" not in json_store.EPISODES_FILE.read_text()  # only in the log so far
+        assert len(json_store.episode_table()) == 3
+
+        report = daily_history.compile_range("2025-08-11", "2025-08-11")
+        assert report.records[0].conditions["reflux"]["episodes"] == 1
+
+    def test_rejects_reversed_range(self):
+        with pytest.raises(ValueError):
+            daily_history.compile_range("2025-08-12", "2025-08-10")
+
+
+class TestPartitionedCompile:
+    """Test rebuilding and reading one user's partition."""
+
+    def test_sources_and_output_follow_the_user(self, json_store_dir, monkeypatch):
+        json_store.create_episode("migraine", {"severity": 4}, now="2025-08-10T09:00:00", user_id="alice")
+        json_store.save_observation("diet", {"notes": "tofu"}, now="2025-08-10T08:00:00", user_id="alice")
+        json_store.create_episode("reflux", {"severity": 7}, now="2025-08-10T10:00:00")
+        alice_file = json_store.daily_history_file(user_id="alice")
+        incremental = _history(alice_file)["2025-08-10"]
+        alice_file.unlink()
+        shared_before = json_store.DAILY_HISTORY_FILE.read_text()
+
+        report = daily_history.compile_range("2025-08-10", "2025-08-10", user_id="alice")
+        assert (report.episodes, report.observations) == (1, 1)
+        assert alice_file == json_store_dir / "users" / "alice" / "daily_history.json"
+        assert _history(alice_file)["2025-08-10"] == incremental
+        assert set(incremental["conditions"]) == {"migraine"}
+        assert json_store.DAILY_HISTORY_FILE.read_text() == shared_before
+
+        shared = daily_history.compile_day("2025-08-10")
+        assert set(shared.conditions) == {"reflux"}
+
+    def test_readers_follow_the_user(self, json_store_dir):
+        json_store.create_episode("migraine", {"severity": 4}, now="2025-08-10T09:00:00", user_id="alice")
+        json_store.create_episode("reflux", {"severity": 7}, now="2025-08-11T10:00:00")
+
+        with json_store.user_scope("alice"):
+            assert [r.date for r in daily_history.get_history()] == ["2025-08-10"]
+            assert daily_history.get_history_columns().dates() == ["2025-08-10"]
+            assert [r["condition"] for r in daily_history.get_rollups("month")] == ["migraine"]
+        assert [r.max_pain for r in daily_history.load_history()] == [7]
+
+    def test_cli_user(self, json_store_dir, capsys):
+        json_store.create_episode("migraine", {"severity": 4}, now="2025-08-10T09:00:00", user_id="bob")
+        daily_history.main(["--start", "2025-08-10", "--end", "2025-08-10", "--user", "bob"])
+        assert "from 1 episodes" in capsys.readouterr().out
+
+
+class TestHistoryColumns:
+    """Test the columnar history view and its range slicing."""
+
+    RECORDS = [
+        {"date": "2025-08-12", "avg_pain": None, "max_pain": None, "episodes": 0, "observations": 2},
+        {"date": "2025-08-10", "avg_pain": 4.5, "max_pain": 6, "episodes": 2, "observations": 1},
+        {"date": "2025-08-11", "avg_pain": 3.0, "max_pain": 3, "episodes": 1, "observations": 0},
+    ]
+
+    def test_sorted_columns(self):
+        columns = daily_history.build_history_columns(self.RECORDS).to_columns()
+        assert columns["date"] == ["2025-08-10", "2025-08-11", "2025-08-12"]
+        assert columns["max_pain"] == [6, 3, None]
+        assert columns["observations"] == [1, 0, 2]
+
+    def test_slice_bounds(self):
+        columns = daily_history.build_history_columns(self.RECORDS)
+        assert columns.slice("2025-08-11", "2025-08-12").dates() == ["2025-08-11", "2025-08-12"]
+        assert columns.slice("2025-08-11T00:00:00", "2025-08-11T23:59:59").dates() == ["2025-08-11"]
+        assert columns.slice(end_date="2025-08-10").dates() == ["2025-08-10"]
+        assert len(columns.slice("2025-09-01", "2025-08-01")) == 0
+
+    def test_rows_match_history(self, json_store_dir):
+        daily_history._write_records(json_store.DAILY_HISTORY_FILE, {r["date"]: r for r in self.RECORDS})
+
+        rows = daily_history.get_history_columns("2025-08-10", "2025-08-11").to_rows()
+        expected = [
+            {key: getattr(r, key) for key in ("date", "avg_pain", "max_pain", "episodes", "observations")}
+            for r in daily_history.get_history("2025-08-10", "2025-08-11")
+        ]
+        assert rows == expected
+        assert daily_history.get_history_columns() is daily_history.get_history_columns()
+
+
+class TestRollups:
+    """Test weekly and monthly per-condition rollups."""
+
+    @pytest.fixture(autouse=True)
+    def store(self, json_store_dir):
+        for now, severity in (("2025-07-30T09:00:00", 3), ("2025-08-01T09:00:00", 7), ("2025-08-20T09:00:00", 5)):
+            episode_id = json_store.create_episode("migraine", {"severity": severity}, now=now)
+            json_store.add_intervention(episode_id, {"type": "ibuprofen"}, now=now)
+        json_store.create_episode("reflux", {"severity": 2}, now="2025-08-01T20:00:00")
+
+    def test_monthly(self):
+        rows = daily_history.get_rollups("month", ["migraine"])
+        assert [(r["period"], r["episodes"], r["max_pain"]) for r in rows] == [("2025-07", 1, 3), ("2025-08", 2, 7)]
+        assert rows[1]["avg_pain"] == 6.0
+        assert rows[1]["interventions"] == {"ibuprofen": 2}
+        assert rows[1]["period_end"] == "2025-08-31"
+
+    def test_weekly_spans_month_boundary(self):
+        rows = daily_history.get_rollups("week", start_date="2025-07-28", end_date="2025-08-03")
+        assert [(r["period"], r["condition"], r["episodes"]) for r in rows] == [
+            ("2025-W31", "migraine", 2), ("2025-W31", "reflux", 1)
+        ]
+        assert rows[0]["days_with_episodes"] == 2
+
+    def test_range_includes_overlapping_periods(self):
+        rows = daily_history.get_rollups("month", ["migraine"], "2025-08-15T00:00:00", "2025-09-30T00:00:00")
+        assert [r["period"] for r in rows] == ["2025-08"]
+        assert daily_history.get_rollups("month", ["unknown"]) == []
+
+    def test_rejects_unknown_resolution(self):
+        with pytest.raises(ValueError):
+            daily_history.get_rollups("year")
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Test the shared dataset cache.
+Parse once per file version, read-only views, invalidation and priming on write.
+"""
+
+import json
+import shutil
+import tempfile
+from pathlib import Path
+
+import pytest
+
+from data import daily_history, dataset_cache, json_store
+from data.file_io import atomic_write_json
+
+
+class TestDatasetCache:
+    """Test load_json versioning and views."""
+
+    def setup_method(self):
+        self.tmp_dir = Path(tempfile.mkdtemp())
+        self.path = self.tmp_dir / "episodes.json"
+        self.path.write_text(json.dumps({"ep1": {"condition": "migraine", "notes_log": [{"text": "a"}]}}))
+        dataset_cache.invalidate()
+
+    def teardown_method(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def _parses(self):
+        return dataset_cache.get_cache_stats()["parses"]
+
+    def test_file_parsed_once_per_version(self):
+        before = self._parses()
+        first = dataset_cache.load_json(self.path, {})
+        second = dataset_cache.load_json(self.path, {})
+        assert first is second
+        assert self._parses() == before + 1
+
+        atomic_write_json(self.path, {"ep2": {"condition": "reflux"}})
+        assert list(dataset_cache.load_json(self.path, {})) == ["ep2"]
+        assert self._parses() == before + 2
+
+    def test_views_are_read_only(self):
+        episodes = dataset_cache.load_json(self.path, {})
+        with pytest.raises(TypeError):
+            episodes["ep1"]["condition"] = "reflux"
+        assert isinstance(episodes["ep1"]["notes_log"], tuple)
+
+        copy = dataset_cache.thaw(episodes["ep1"])
+        copy["notes_log"].append({"text": "b"})
+        assert len(episodes["ep1"]["notes_log"]) == 1
+        # Frozen views still serialize as plain JSON
+        assert json.loads(json.dumps(episodes))["ep1"]["notes_log"] == [{"text": "a"}]
+
+    def test_missing_file_returns_default(self):
+        assert dataset_cache.load_json(self.tmp_dir / "missing.json", []) == ()
+
+    def test_derived_values_follow_the_file(self):
+        calls = []
+
+        def count_episodes(episodes):
+            calls.append(1)
+            return len(episodes)
+
+        assert dataset_cache.derived(self.path, "count", count_episodes) == 1
+        assert dataset_cache.derived(self.path, "count", count_episodes) == 1
+        atomic_write_json(self.path, {"a": {}, "b": {}})
+        assert dataset_cache.derived(self.path, "count", count_episodes) == 2
+        assert len(calls) == 2
+
+
+@pytest.mark.usefixtures("json_store_dir")
+class TestSharedReaders:
+    """Test that writers prime the cache and readers share it."""
+
+    def test_own_writes_are_not_reparsed(self):
+        json_store.create_episode("migraine", {"severity": 5}, now="2025-08-10T09:00:00")
+        json_store.save_observation("diet", {"notes": "tofu"}, now="2025-08-10T08:00:00")
+
+        before = dataset_cache.get_cache_stats()["parses"]
+        record = daily_history.compile_day("2025-08-10")
+        daily_history.compile_day("2025-08-10")
+        assert record.episodes == 1 and record.observations == 1
+        # Episodes and observations come from the primed cache; only the
+        # history file itself is parsed after each rewrite
+        assert dataset_cache.get_cache_stats()["parses"] - before <= 2
+
+    def test_external_writes_are_seen(self):
+        episode_id = json_store.create_episode("migraine", {"severity": 5})
+        on_disk = json.loads(json_store.EPISODES_FILE.read_text())
+        on_disk[episode_id]["current_severity"] = 9
+        atomic_write_json(json_store.EPISODES_FILE, on_disk)
+
+        assert json_store.get_episode_by_id(episode_id)["current_severity"] == 9
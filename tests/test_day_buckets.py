@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Test the timezone-aware day bucketing engine.
+Agreement with datetime across DST changes, batches and recall day bounds.
+"""
+
+import random
+from datetime import date, datetime, timezone
+
+import pytest
+
+from core import day_buckets
+from core.day_buckets import get_day_bucketer, local_day_bounds
+
+ZONES = ["UTC", "America/New_York", "Europe/London", "Asia/Kolkata", "Australia/Lord_Howe", "Pacific/Apia"]
+
+
+def _utc(year, month, day, hour=0, minute=0):
+    return datetime(year, month, day, hour, minute, tzinfo=timezone.utc).timestamp()
+
+
+def _expected(bucketer, ts):
+    return datetime.fromtimestamp(ts, tz=bucketer.zone).date().toordinal()
+
+
+class TestDayBucketer:
+    """Test single and batched conversion to local days."""
+
+    @pytest.mark.parametrize("zone", ZONES)
+    def test_matches_datetime(self, zone):
+        bucketer = get_day_bucketer(zone)
+        rng = random.Random(zone)
+        epochs = [float(rng.randrange(-10**9, 2 * 10**9)) for _ in range(2000)]
+        expected = [_expected(bucketer, ts) for ts in epochs]
+        assert [bucketer.day_ordinal(ts) for ts in epochs] == expected
+        assert list(bucketer.day_ordinals(epochs)) == expected
+
+    def test_dst_boundaries(self):
+        bucketer = get_day_bucketer("America/New_York")
+        # Spring forward on 2025-03-09: midnight is 05:00 UTC that day and 04:00 UTC the next
+        assert bucketer.day(_utc(2025, 3, 9, 4, 59)) == "2025-03-08"
+        assert bucketer.day(_utc(2025, 3, 9, 5)) == "2025-03-09"
+        assert bucketer.day(_utc(2025, 3, 10, 3, 59)) == "2025-03-09"
+        assert bucketer.day(_utc(2025, 3, 10, 4)) == "2025-03-10"
+        start, end = bucketer.day_span(date(2025, 3, 9).toordinal(), date(2025, 3, 9).toordinal())
+        assert end - start == 23 * 3600
+
+    def test_table_grows_on_demand(self):
+        bucketer = day_buckets.DayBucketer(get_day_bucketer("Europe/London").zone)
+        bucketer.day_ordinal(_utc(2025, 6, 1))
+        assert bucketer._table[:2] == (2025, 2025)
+        assert bucketer.day(_utc(1999, 12, 31, 23, 30)) == "1999-12-31"
+        assert bucketer._table[:2] == (1999, 2025)
+
+    def test_python_fallback_matches_numpy(self, monkeypatch):
+        bucketer = get_day_bucketer("America/New_York")
+        epochs = [_utc(2025, 11, 2) + 600.0 * i for i in range(500)]
+        expected = [_expected(bucketer, ts) for ts in epochs]
+        monkeypatch.setattr(day_buckets, "NUMPY_AVAILABLE", False)
+        assert bucketer.day_ordinals(epochs) == expected
+        counts = bucketer.day_counts(epochs)
+        assert sum(counts.values()) == 500
+        assert counts == {ordinal: expected.count(ordinal) for ordinal in set(expected)}
+
+    def test_unknown_zone_is_utc(self):
+        assert get_day_bucketer("Not/AZone").day(_utc(2025, 8, 1, 23, 59)) == "2025-08-01"
+        assert get_day_bucketer("America/New_York") is get_day_bucketer("America/New_York")
+
+
+class TestLocalDayBounds:
+    """Test mapping recall ranges in UTC back to history days."""
+
+    def test_utc_range_to_local_days(self):
+        # "yesterday" for a New York user on 2025-08-20
+        assert local_day_bounds("2025-08-19T04:00:00", "2025-08-20T03:59:59.999999",
+                                "America/New_York") == ("2025-08-19", "2025-08-19")
+
+    def test_dates_pass_through(self):
+        assert local_day_bounds("2025-08-01", "2025-08-05", "Asia/Tokyo") == ("2025-08-01", "2025-08-05")
+
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Test the episode write-ahead log.
+Appends replay onto the snapshot, compaction folds the log, replay is idempotent.
+"""
+
+import json
+import shutil
+import tempfile
+from pathlib import Path
+
+import pytest
+
+from data import json_store
+from data.episode_wal import EpisodeWAL, apply_delta
+
+
+class TestApplyDelta:
+    """Test delta application semantics."""
+
+    def test_put_and_patch(self):
+        episodes = {}
+        apply_delta(episodes, {"op": "put", "id": "ep1", "record": {"episode_id": "ep1", "notes_log": []}})
+        apply_delta(episodes, {"op": "patch", "id": "ep1", "set": {"current_severity": 6},
+                               "push": {"notes_log": [0, {"text": "worse"}]}})
+        assert episodes["ep1"]["current_severity"] == 6
+        assert episodes["ep1"]["notes_log"] == [{"text": "worse"}]
+
+    def test_push_replay_is_idempotent(self):
+        episodes = {"ep1": {"notes_log": []}}
+        delta = {"op": "patch", "id": "ep1", "push": {"notes_log": [0, {"text": "a"}]}}
+        apply_delta(episodes, delta)
+        apply_delta(episodes, delta)
+        assert episodes["ep1"]["notes_log"] == [{"text": "a"}]
+
+    def test_patch_unknown_episode_is_ignored(self):
+        episodes = {}
+        apply_delta(episodes, {"op": "patch", "id": "missing", "set": {"status": "closed"}})
+        assert episodes == {}
+
+
+class TestEpisodeWAL:
+    """Test log recovery and compaction."""
+
+    def setup_method(self):
+        self.tmp_dir = Path(tempfile.mkdtemp())
+        self.snapshot = self.tmp_dir / "episodes.json"
+        self.snapshot.write_text(json.dumps({"ep0": {"episode_id": "ep0", "notes_log": []}}))
+
+    def teardown_method(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_appends_survive_restart(self):
+        wal = EpisodeWAL(self.snapshot, compact_threshold=100)
+        wal.append({"op": "put", "id": "ep1", "record": {"episode_id": "ep1"}})
+        wal.append({"op": "patch", "id": "ep0", "push": {"notes_log": [0, {"text": "n"}]}})
+
+        # Snapshot is untouched until compaction
+        assert "ep1" not in json.loads(self.snapshot.read_text())
+
+        reopened = EpisodeWAL(self.snapshot, compact_threshold=100)
+        assert set(reopened.episodes) == {"ep0", "ep1"}
+        assert reopened.episodes["ep0"]["notes_log"] == [{"text": "n"}]
+        assert reopened.pending_records() == 2
+
+    def test_compaction_folds_log_into_snapshot(self):
+        wal = EpisodeWAL(self.snapshot, compact_threshold=2)
+        wal.append({"op": "put", "id": "ep1", "record": {"episode_id": "ep1"}})
+        wal.append({"op": "put", "id": "ep2", "record": {"episode_id": "ep2"}})
+        wal.wait_for_compaction(timeout=5)
+
+        assert set(json.loads(self.snapshot.read_text())) == {"ep0", "ep1", "ep2"}
+        assert not wal.rotated_log_path.exists()
+        assert wal.pending_records() == 0
+
+    def test_interrupted_compaction_is_recovered(self):
+        wal = EpisodeWAL(self.snapshot, compact_threshold=100)
+        wal.append({"op": "patch", "id": "ep0", "push": {"notes_log": [0, {"text": "n"}]}})
+        # Simulate a crash after rotation but before the snapshot was written
+        wal.log_path.replace(wal.rotated_log_path)
+
+        reopened = EpisodeWAL(self.snapshot, compact_threshold=100)
+        assert reopened.episodes["ep0"]["notes_log"] == [{"text": "n"}]
+
+    def test_writers_sharing_a_log_stay_in_sync(self):
+        # Two instances stand in for two processes sharing the files
+        a = EpisodeWAL(self.snapshot, compact_threshold=100)
+        b = EpisodeWAL(self.snapshot, compact_threshold=100)
+        a.append({"op": "put", "id": "A", "record": {"episode_id": "A"}})
+        b.append({"op": "put", "id": "B", "record": {"episode_id": "B"}})
+        assert {"A", "B"} <= set(b.episodes)
+
+        b.compact()
+        assert set(EpisodeWAL(self.snapshot).episodes) == {"ep0", "A", "B"}
+
+        # a catches up with b's compaction before its next append
+        a.append({"op": "put", "id": "C", "record": {"episode_id": "C"}})
+        assert set(a.episodes) == {"ep0", "A", "B", "C"}
+        a.compact()
+        assert set(json.loads(self.snapshot.read_text())) == {"ep0", "A", "B", "C"}
+
+    def test_refresh_picks_up_other_writers(self):
+        a = EpisodeWAL(self.snapshot, compact_threshold=100)
+        b = EpisodeWAL(self.snapshot, compact_threshold=100)
+        generation = a.generation
+        b.append({"op": "patch", "id": "ep0", "push": {"notes_log": [0, {"text": "from b"}]}})
+        a.refresh()
+        assert a.episodes["ep0"]["notes_log"] == [{"text": "from b"}]
+        assert a.generation > generation
+
+
+class TestJsonStoreWalMode:
+    """Test the json_store functions running on the WAL backend."""
+
+    @pytest.fixture(autouse=True)
+    def wal_store(self, json_store_dir, monkeypatch):
+        monkeypatch.setattr(json_store, "STORAGE_MODE", "wal")
+
+    def test_update_appends_instead_of_rewriting(self):
+        episode_id = json_store.create_episode("migraine", {"severity": 5, "notes": "started"})
+        snapshot_before = json_store.EPISODES_FILE.read_text()
+
+        json_store.update_episode(episode_id, {"severity": 7, "notes": "worse"})
+        json_store.add_intervention(episode_id, {"type": "ibuprofen", "dose": "400mg"})
+
+        assert json_store.EPISODES_FILE.read_text() == snapshot_before
+        episode = json_store.get_episode_by_id(episode_id)
+        assert episode["max_severity"] == 7
+        assert [n["text"] for n in episode["notes_log"]] == ["started", "worse"]
+        assert episode["interventions"][0]["type"] == "ibuprofen"
+
+    def test_compaction_writes_plain_episodes_json(self):
+        episode_id = json_store.create_episode("migraine", {"severity": 5})
+        json_store.compact_episode_log()
+
+        on_disk = json.loads(json_store.EPISODES_FILE.read_text())
+        assert on_disk[episode_id]["current_severity"] == 5
+
+    def test_episode_table_includes_log_records(self):
+        episode_id = json_store.create_episode("migraine", {"severity": 5})
+        table = json_store.episode_table()
+        assert table.keys == [episode_id]
+
+        second = json_store.create_episode("reflux", {"severity": 2})
+        assert set(json_store.episode_table().keys) == {episode_id, second}
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Test the event-hash idempotency index.
+Duplicate detection across minute buckets, TTL and size bounds, persistence.
+"""
+
+from datetime import datetime
+
+from data import json_store
+from data.idempotency import IdempotencyIndex, event_hash, submission_hashes
+
+
+class TestIdempotencyIndex:
+    """Test claims against the persisted hash index."""
+
+    def test_duplicates_within_ttl(self, tmp_path):
+        index = IdempotencyIndex(tmp_path / "hashes.json", ttl_seconds=120)
+        assert index.claim(["a"], now=1000.0)
+        assert not index.claim(["b", "a"], now=1030.0)
+        assert index.claim(["a"], now=1200.0)
+
+    def test_bounded(self, tmp_path):
+        index = IdempotencyIndex(tmp_path / "hashes.json", max_entries=3)
+        for i in range(5):
+            assert index.claim([str(i)], now=1000.0 + i)
+        assert len(index) == 3
+        assert index.claim(["0"], now=1010.0)
+
+    def test_persisted_and_released(self, tmp_path):
+        path = tmp_path / "hashes.json"
+        first = IdempotencyIndex(path)
+        assert first.claim(["a"])
+        second = IdempotencyIndex(path)
+        assert not second.claim(["a"])
+        second.release("a")
+        assert first.claim(["a"])
+
+    def test_previous_minute_bucket(self):
+        hashes = submission_hashes(" headache ", datetime(2025, 8, 10, 12, 1, 2))
+        assert hashes == [
+            event_hash("headache", datetime(2025, 8, 10, 12, 1)),
+            event_hash("headache", datetime(2025, 8, 10, 12, 0, 59)),
+        ]
+
+
+class TestClaimSubmission:
+    """Test submission claims through json_store."""
+
+    def test_retry_across_minute_boundary(self, json_store_dir):
+        key = json_store.claim_submission("headache 6/10", now=datetime(2025, 8, 10, 12, 0, 59))
+        assert key == event_hash("headache 6/10", datetime(2025, 8, 10, 12, 0))
+        assert json_store.claim_submission("headache 6/10", now=datetime(2025, 8, 10, 12, 1, 2)) is None
+        assert json_store.claim_submission("headache 6/10", user_id="bob") is not None
+
+    def test_release_allows_retry(self, json_store_dir):
+        key = json_store.claim_submission("took ibuprofen")
+        json_store.release_submission(key)
+        assert json_store.claim_submission("took ibuprofen") == key
+        assert (json_store_dir / "event_hashes.json").exists()
+
+    def test_append_event_uses_the_same_hash(self, json_store_dir):
+        json_store.append_event("took ibuprofen", {}, "intervention")
+        event = json_store.get_recent_events(limit=1)[0]
+        timestamp = datetime.fromisoformat(event["timestamp"])
+        assert event["event_hash"] == event_hash("took ibuprofen", timestamp)
+
+    def test_track_commits(self, json_store_dir):
+        with json_store.track_commits() as commits:
+            with json_store.transaction():
+                pass
+            assert commits == []
+            json_store.append_event("took ibuprofen", {"intent": "intervention"}, "intervention")
+        assert len(commits) == 1
+
+
+class _StubWorkflow:
+    """Stands in for the agno workflow; run() does what the test asks."""
+
+    def __init__(self, step):
+        self.step = step
+
+    def run(self, message, session_id=None):
+        self.step(message)
+        return type("RunResult", (), {"content": "ok"})()
+
+
+def _store_failure(message):
+    # process_and_log_step reports storage failures as an action, not an exception
+    pass
+
+
+def _crash(message):
+    raise RuntimeError("model unavailable")
+
+
+def _log(message):
+    json_store.append_event(message, {"intent": "observation"}, "observation")
+
+
+class TestWorkflowClaims:
+    """Test when the logger keeps a submission claimed."""
+
+    def _run(self, step, prompt="ate pizza"):
+        from healthlogger.workflow import HealthLoggerWorkflowWrapper
+        wrapper = HealthLoggerWorkflowWrapper.__new__(HealthLoggerWorkflowWrapper)
+        wrapper.workflow = _StubWorkflow(step)
+        return wrapper.run(prompt, user_id="alice")
+
+    def test_uncommitted_turns_release_the_claim(self, json_store_dir):
+        for step in (_store_failure, _crash):
+            assert not self._run(step).meta.get("duplicate")
+        assert not self._run(_log).meta.get("duplicate")
+
+    def test_committed_turn_keeps_the_claim(self, json_store_dir):
+        self._run(_log)
+        assert self._run(_log).meta["duplicate"]
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Test the segmented event log.
+Rotation, compression, and tail / since reads across segments.
+"""
+
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from core.timeutils import iso_to_epoch
+from data import json_store
+from data.event_log import EventLog
+from data.file_io import iter_lines_reverse, read_tail_lines
+
+START = datetime(2025, 8, 1)
+
+
+def _events(first, count):
+    return [
+        {"event_id": f"evt_{i}", "timestamp": (START + timedelta(minutes=i)).isoformat(), "user_text": "x" * 40}
+        for i in range(first, first + count)
+    ]
+
+
+def _ids(events):
+    return [int(event["event_id"][4:]) for event in events]
+
+
+class TestReverseReads:
+    """Test reading text files from the end."""
+
+    def test_small_blocks(self, tmp_path):
+        path = tmp_path / "log.jsonl"
+        path.write_text("first\n\nsecond line\nthird\n")
+        assert list(iter_lines_reverse(path, block_size=3)) == ["third", "second line", "first"]
+        assert read_tail_lines(path, 2) == ["second line", "third"]
+        assert list(iter_lines_reverse(tmp_path / "missing.jsonl")) == []
+
+
+class TestEventLog:
+    """Test rotation and reads across segments."""
+
+    @pytest.fixture(autouse=True)
+    def log(self, tmp_path):
+        self.path = tmp_path / "events.jsonl"
+        self.log = EventLog(self.path, max_segment_bytes=2000, max_segment_age=float("inf"),
+                            keep_uncompressed=1, index_stride=4)
+        for first in range(0, 100, 10):
+            self.log.append(_events(first, 10))
+
+    def test_rotates_and_compresses(self):
+        segments = json.loads(self.log.manifest_path.read_text())["segments"]
+        assert len(segments) > 2
+        assert all(segment["compressed"] for segment in segments[:-1])
+        assert not segments[-1]["compressed"] and segments[-1]["offsets"]
+        assert (self.path.parent / segments[0]["name"]).suffix == ".gz"
+        assert sum(segment["count"] for segment in segments) + len(self.path.read_text().splitlines()) == 100
+
+    def test_tail_and_iter_all(self):
+        assert _ids(self.log.tail(3)) == [99, 98, 97]
+        assert _ids(self.log.tail(1000)) == list(range(99, -1, -1))
+        assert _ids(self.log.iter_all()) == list(range(100))
+
+    def test_since(self):
+        for first in (0, 5, 33, 61, 95, 99):
+            since = iso_to_epoch((START + timedelta(minutes=first)).isoformat())
+            assert _ids(self.log.since(since)) == list(range(first, 100))
+        assert self.log.since(iso_to_epoch("2030-01-01T00:00:00")) == []
+
+    def test_age_rotation(self, tmp_path):
+        log = EventLog(tmp_path / "aged.jsonl", max_segment_age=86400)
+        log.append(_events(0, 2))
+        log.append(_events(2, 1))
+        assert len(json.loads(log.manifest_path.read_text())["segments"]) == 1
+        assert _ids(log.tail(10)) == [2, 1, 0]
+
+
+class TestStoreEvents:
+    """Test the json_store event readers."""
+
+    def test_recent_and_since(self, json_store_dir):
+        first = json_store.append_event("headache", {}, "create")
+        second = json_store.append_event("took ibuprofen", {}, "intervention")
+        assert [e["event_id"] for e in json_store.get_recent_events(limit=1)] == [second]
+        since = json_store.get_recent_events()[-1]["timestamp"]
+        assert [e["event_id"] for e in json_store.get_events_since(since)] == [first, second]
+        with pytest.raises(ValueError):
+            json_store.get_events_since("not a timestamp")
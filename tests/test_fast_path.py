@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Test the fast-path router.
+Keyword rules, the JSON intent model, hit-rate stats and training examples.
+"""
+
+import json
+
+import pytest
+
+from core.policies import FAST_PATH_MIN_CONFIDENCE
+from data import json_store
+from data.file_io import atomic_write_json
+from health_advisor.router import fast_path
+from health_advisor.router.fast_path import FastPathRouter, IntentModel, classify_rules
+from health_advisor.router.schema import RouterDecision
+
+
+def _intent(prompt, tmp_path):
+    match = FastPathRouter(tmp_path / "no_model.json").route(prompt)
+    return match and (match.decision.primary_intent, match.decision.secondary_intent)
+
+
+class TestRules:
+    """Test which messages the rules decide on their own."""
+
+    @pytest.mark.parametrize("prompt, expected", [
+        ("/resolve profile", ("control_action", None)),
+        ("Show my profile", ("profile_view", None)),
+        ("I have a migraine 6/10", ("log", None)),
+        ("I have a migraine 6/10, what should I do?", ("log", "coach")),
+        ("my lower back hurts a lot", ("log", None)),
+        ("when did I last go swimming?", ("recall", None)),
+        ("update my medication list to add sumatriptan", ("profile_update", None)),
+        ("what conditions do I have on file", ("profile_view", None)),
+    ])
+    def test_unambiguous(self, prompt, expected, tmp_path):
+        assert _intent(prompt, tmp_path) == expected
+
+    @pytest.mark.parametrize("prompt", [
+        "yes",
+        "help",
+        "it's getting worse",
+        "show me my history and what should I do",
+        "I have chest pain 8/10",
+        "I have a migraine, how many did I have this week?",
+        "Can you help me log that I had a migraine yesterday",
+        "I need help, my chest hurts and I cannot breathe",
+        "show me how to log my headache",
+        "when did I last have a migraine?",
+        "suggest something for dinner",
+    ])
+    def test_falls_through(self, prompt, tmp_path):
+        assert _intent(prompt, tmp_path) is None
+
+    def test_confidence_follows_match_strength(self):
+        assert classify_rules("/resolve").confidence == 1.0
+        opening = classify_rules("what should I do about work deadlines")
+        buried = classify_rules("so what should I do about work deadlines")
+        assert opening.confidence > buried.confidence
+        weak = classify_rules("please pull up my history")
+        assert weak.primary_intent == "recall" and weak.confidence < FAST_PATH_MIN_CONFIDENCE
+
+    def test_profile_action(self):
+        assert classify_rules("show my profile").profile_action == "view_profile"
+
+
+def _model_data():
+    # Two features; "pizza" points to log, "history" to recall
+    return {
+        "classes": ["log", "recall"],
+        "vocabulary": {"pizza": 0, "history": 1},
+        "idf": [1.0, 1.0],
+        "coef": [[-6.0, 6.0]],
+        "intercept": [0.0],
+        "ngram_max": 1,
+    }
+
+
+class TestModel:
+    """Test the model tier and hit-rate stats."""
+
+    def test_predict_proba(self):
+        model = IntentModel(_model_data())
+        assert model.predict_proba("History please")["recall"] > 0.99
+        assert model.predict_proba("unrelated words") == {"log": 0.5, "recall": 0.5}
+
+    def test_multiclass_softmax(self):
+        data = dict(_model_data(), classes=["coach", "log", "recall"],
+                    coef=[[0.0, 0.0], [5.0, 0.0], [0.0, 5.0]], intercept=[0.0, 0.0, 0.0])
+        probabilities = IntentModel(data).predict_proba("pizza")
+        assert max(probabilities, key=probabilities.get) == "log"
+        assert sum(probabilities.values()) == pytest.approx(1.0)
+
+    def test_router_tiers_and_stats(self, tmp_path):
+        model_path = tmp_path / "router_model.json"
+        router = FastPathRouter(model_path)
+        assert router.route("ate pizza for lunch") is None  # no model yet
+
+        atomic_write_json(model_path, _model_data())
+        assert router.route("ate pizza for lunch").source == "model"
+        assert router.route("/resolve").source == "rules"
+        assert router.route("the usual") is None  # model unsure
+
+        stats = router.stats.as_dict()
+        assert (stats["messages"], stats["rule_hits"], stats["model_hits"], stats["fallthrough"]) == (4, 1, 1, 2)
+        assert stats["hit_rate"] == 0.5
+
+
+class TestTraining:
+    """Test collecting examples from the event log."""
+
+    def test_recorded_decisions_label_messages(self, json_store_dir):
+        json_store.append_event("I have a migraine", {"intent": "episode_create"}, "create")
+        json_store.append_event("ate pizza", {"intent": "observation"}, "observation")
+        recall = RouterDecision(primary_intent="recall", confidence=0.95, rationale="asks about the past")
+        unsure = RouterDecision(primary_intent="coach", confidence=0.5, rationale="unclear")
+        assert fast_path.record_router_decision("how were my migraines lately", recall) is not None
+        assert fast_path.record_router_decision("hmm", unsure) is None
+
+        examples = dict(fast_path.training_examples([json_store.EVENTS_FILE]))
+        assert examples == {
+            "I have a migraine": "log",
+            "ate pizza": "log",
+            "how were my migraines lately": "recall",
+        }
+        assert [json.loads(line)["action"] for line in json_store.EVENTS_FILE.read_text().splitlines()][-1] == "route"
+
+    def test_train_requires_enough_examples(self, tmp_path):
+        if not fast_path.SKLEARN_AVAILABLE:
+            with pytest.raises(RuntimeError):
+                fast_path.train_model([("a", "log")], tmp_path / "model.json")
+            pytest.skip("scikit-learn not installed")
+        with pytest.raises(ValueError):
+            fast_path.train_model([("a", "log")], tmp_path / "model.json")
+
+    def test_trained_model_matches_sklearn(self, tmp_path):
+        if not fast_path.SKLEARN_AVAILABLE:
+            pytest.skip("scikit-learn not installed")
+        examples = [(f"my migraine is bad today {i}", "log") for i in range(20)]
+        examples += [(f"when did I last have a migraine {i}", "recall") for i in range(20)]
+        examples += [(f"what should I do for pain {i}", "coach") for i in range(20)]
+        model = fast_path.train_model(examples, tmp_path / "model.json")
+        reloaded = IntentModel(json.loads((tmp_path / "model.json").read_text()))
+        probabilities = reloaded.predict_proba("when did I last have a migraine")
+        assert max(probabilities, key=probabilities.get) == "recall"
+        assert model.classes == reloaded.classes
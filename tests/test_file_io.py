@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Test the shared locking and atomic write layer.
+Atomic replace, lock contention accounting, and no lost writes across processes.
+"""
+
+import json
+import multiprocessing
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from data import file_io, json_store
+
+
+def _log_observations(data_dir, count):
+    """Child process: point json_store at data_dir and log observations."""
+    data_dir = Path(data_dir)
+    json_store.DATA_DIR = data_dir
+    json_store.EPISODES_FILE = data_dir / "episodes.json"
+    json_store.OBSERVATIONS_FILE = data_dir / "observations.json"
+    json_store.INTERVENTIONS_FILE = data_dir / "interventions.json"
+    json_store.EVENTS_FILE = data_dir / "events.jsonl"
+    json_store.OPEN_INDEX_FILE = data_dir / "open_episodes.index.json"
+    json_store.DAILY_HISTORY_FILE = data_dir / "daily_history.json"
+    json_store._open_indexes = {}
+    for i in range(count):
+        json_store.save_observation("sleep", {"value": f"{i}h"})
+
+
+class TestFileIO:
+    """Test atomic writes and lock statistics."""
+
+    def setup_method(self):
+        self.tmp_dir = Path(tempfile.mkdtemp())
+        file_io.reset_lock_stats()
+
+    def teardown_method(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_atomic_write_leaves_no_temp_files(self):
+        target = self.tmp_dir / "episodes.json"
+        file_io.atomic_write_json(target, {"ep1": {"status": "open"}})
+        file_io.atomic_write_json(target, {"ep2": {"status": "open"}})
+
+        assert json.loads(target.read_text()) == {"ep2": {"status": "open"}}
+        assert not list(self.tmp_dir.glob("*.tmp"))
+
+    def test_lock_is_reentrant(self):
+        target = self.tmp_dir / "episodes.json"
+        with file_io.file_lock(target):
+            file_io.atomic_write_json(target, {})
+        assert file_io.get_lock_stats()["contended"] == 0
+
+    def test_contention_is_counted(self):
+        target = self.tmp_dir / "observations.json"
+        holding = threading.Event()
+
+        def hold_lock():
+            with file_io.file_lock(target):
+                holding.set()
+                time.sleep(0.1)
+
+        holder = threading.Thread(target=hold_lock)
+        holder.start()
+        holding.wait(timeout=5)
+        file_io.locked_append(target, "x\n")
+        holder.join()
+
+        stats = file_io.get_lock_stats()
+        assert stats["acquired"] == 2
+        assert stats["contended"] == 1
+        assert stats["wait_seconds"] > 0
+
+    def test_concurrent_writers_do_not_lose_records(self):
+        ctx = multiprocessing.get_context("fork")
+        workers = [ctx.Process(target=_log_observations, args=(str(self.tmp_dir), 10))
+                   for _ in range(4)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join(timeout=30)
+            assert worker.exitcode == 0
+
+        observations = json.loads((self.tmp_dir / "observations.json").read_text())
+        assert len(observations) == 40
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Test the json_store unit-of-work API.
+One flush per file on commit, read-your-writes inside, rollback on error.
+"""
+
+import json
+import os
+
+import pytest
+
+from data import json_store
+
+
+def _read(path):
+    return json.loads(path.read_text())
+
+
+@pytest.fixture
+def replace_calls(monkeypatch):
+    """Record the final paths passed to os.replace by json_store."""
+    calls = []
+    real_replace = os.replace
+
+    def recording_replace(src, dst):
+        calls.append(os.path.basename(dst))
+        return real_replace(src, dst)
+
+    monkeypatch.setattr(json_store.os, "replace", recording_replace)
+    return calls
+
+
+class TestTransaction:
+    """Test batched commits through the module-level write functions."""
+
+    @pytest.fixture(autouse=True)
+    def store(self, json_store_dir):
+        self.episode_id = json_store.create_episode("migraine", {"severity": 4, "notes": "started"})
+
+    def test_turn_writes_each_file_once(self, replace_calls):
+        with json_store.transaction():
+            json_store.update_episode(self.episode_id, {"severity": 7, "notes": "worse"})
+            json_store.add_intervention(self.episode_id, {"type": "ibuprofen", "dose": "400mg"})
+            json_store.add_intervention(self.episode_id, {"type": "rest"})
+            json_store.append_event("worse, took ibuprofen", {}, "update", episode_id=self.episode_id)
+
+        file_writes = [name for name in replace_calls if not name.endswith(".index.json")]
+        assert sorted(file_writes) == ["daily_history.json", "episodes.json", "interventions.json"]
+
+        episode = _read(json_store.EPISODES_FILE)[self.episode_id]
+        assert episode["max_severity"] == 7
+        assert [i["type"] for i in episode["interventions"]] == ["ibuprofen", "rest"]
+        assert len(_read(json_store.INTERVENTIONS_FILE)) == 2
+        assert len(json_store.EVENTS_FILE.read_text().splitlines()) == 1
+
+    def test_reads_see_uncommitted_writes(self):
+        with json_store.transaction():
+            new_id = json_store.create_episode("reflux", {"severity": 3})
+            assert json_store.update_episode(new_id, {"severity": 5})
+            assert json_store.get_episode_by_id(new_id)["current_severity"] == 5
+            # Nothing is on disk until the block exits
+            assert new_id not in _read(json_store.EPISODES_FILE)
+
+        assert _read(json_store.EPISODES_FILE)[new_id]["max_severity"] == 5
+
+    def test_error_rolls_back_every_file(self):
+        episodes_before = json_store.EPISODES_FILE.read_text()
+
+        with pytest.raises(RuntimeError):
+            with json_store.transaction():
+                json_store.update_episode(self.episode_id, {"severity": 9})
+                json_store.add_intervention(self.episode_id, {"type": "triptan"})
+                json_store.save_observation("sleep", {"value": "5h"})
+                raise RuntimeError("extraction failed")
+
+        assert json_store.EPISODES_FILE.read_text() == episodes_before
+        assert not json_store.INTERVENTIONS_FILE.exists() or _read(json_store.INTERVENTIONS_FILE) == []
+        assert not json_store.OBSERVATIONS_FILE.exists() or _read(json_store.OBSERVATIONS_FILE) == []
+        assert json_store.get_episode_by_id(self.episode_id)["current_severity"] == 4
+
+    def test_failed_staging_leaves_files_untouched(self, monkeypatch):
+        episodes_before = json_store.EPISODES_FILE.read_text()
+        real_stage = json_store._stage_json
+
+        def failing_stage(path, data):
+            if path == json_store.INTERVENTIONS_FILE:
+                raise OSError("disk full")
+            return real_stage(path, data)
+
+        monkeypatch.setattr(json_store, "_stage_json", failing_stage)
+        with pytest.raises(OSError):
+            with json_store.transaction():
+                json_store.update_episode(self.episode_id, {"severity": 8})
+                json_store.add_intervention(self.episode_id, {"type": "ice"})
+
+        assert json_store.EPISODES_FILE.read_text() == episodes_before
+        assert not list(json_store.DATA_DIR.glob("*.tmp"))
+
+    def test_index_updated_on_commit(self):
+        with json_store.transaction():
+            json_store.close_episode(self.episode_id)
+        assert json_store.fetch_open_episode_candidates() == []
+
+
+class TestWalTransaction:
+    """Test that WAL mode commits a turn as one log append."""
+
+    @pytest.fixture(autouse=True)
+    def wal_store(self, json_store_dir, monkeypatch):
+        monkeypatch.setattr(json_store, "STORAGE_MODE", "wal")
+
+    def test_turn_is_one_log_append(self):
+        episode_id = json_store.create_episode("migraine", {"severity": 4})
+        wal = json_store._get_episode_wal()
+        records_before = wal.pending_records()
+
+        with json_store.transaction():
+            json_store.update_episode(episode_id, {"severity": 6})
+            json_store.add_intervention(episode_id, {"type": "rest"})
+            # The live map is not touched before commit
+            assert wal.episodes[episode_id]["current_severity"] == 4
+
+        assert wal.pending_records() == records_before + 2
+        assert json_store.get_episode_by_id(episode_id)["interventions"][0]["type"] == "rest"
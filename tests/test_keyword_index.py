@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Test the inverted keyword index.
+Prefix and multi-word lookups, time filters, and in-place updates on commit.
+"""
+
+import pytest
+
+from core.timeutils import iso_to_epoch
+from data import json_store
+from data.keyword_index import KeywordIndex, build_episode_index, build_observation_index, tokenize
+
+
+class TestKeywordIndex:
+    """Test postings lookups."""
+
+    def setup_method(self):
+        self.index = build_observation_index([
+            {"observation_id": "obs_1", "timestamp": "2025-08-10T08:00:00", "notes": "Aged cheese and red wine"},
+            {"observation_id": "obs_2", "timestamp": "2025-08-20T08:00:00", "notes": "Cheeseburger for lunch"},
+            {"observation_id": "obs_3", "timestamp": "2025-08-21T08:00:00", "category": "sleep", "notes": "5h"},
+        ])
+
+    def test_tokenize(self):
+        assert tokenize("Red-wine, 2 glasses!") == ["red", "wine", "2", "glasses"]
+        assert tokenize(None) == []
+
+    def test_prefix_and_multi_word(self):
+        assert set(self.index.lookup("cheese")) == {"obs_1", "obs_2"}
+        assert set(self.index.lookup("CHEES")) == {"obs_1", "obs_2"}
+        assert set(self.index.lookup("red wine")) == {"obs_1"}
+        assert self.index.lookup("burger") == {}
+        assert set(self.index.lookup("sleep")) == {"obs_3"}
+
+    def test_time_filter(self):
+        start = iso_to_epoch("2025-08-15T00:00:00")
+        assert set(self.index.lookup("cheese", start_ts=start)) == {"obs_2"}
+        assert self.index.lookup("cheese", end_ts=start - 1) == {"obs_1": iso_to_epoch("2025-08-10T08:00:00")}
+
+    def test_readding_replaces_terms(self):
+        index = KeywordIndex()
+        index.add("a", {"tofu"}, 1.0)
+        index.add("a", {"tempeh"}, 2.0)
+        assert index.lookup("tofu") == {}
+        assert index.lookup("tempeh") == {"a": 2.0}
+        index.remove("a")
+        assert len(index) == 0 and index.postings == {}
+
+    def test_episode_terms(self):
+        index = build_episode_index({"ep_1": {
+            "started_at": "2025-08-10T09:00:00",
+            "notes_log": [{"ts": "2025-08-10T09:00:00", "text": "after chocolate"}],
+            "triggers": ["bright lights"],
+            "interventions": [{"type": "sumatriptan", "notes": "helped"}],
+        }})
+        for keyword in ("chocolate", "bright lights", "sumatriptan", "helped"):
+            assert set(index.lookup(keyword)) == {"ep_1"}
+
+
+class TestStoreSearch:
+    """Test keyword search through json_store, including incremental updates."""
+
+    @pytest.fixture(autouse=True)
+    def store(self, json_store_dir):
+        self.episode_id = json_store.create_episode(
+            "migraine", {"severity": 6, "notes": "started after red wine", "triggers": ["stress"]}
+        )
+
+    def test_search_episodes(self):
+        assert [ep["episode_id"] for ep in json_store.search_episodes_by_keyword("wine")] == [self.episode_id]
+        assert [ep["episode_id"] for ep in json_store.search_episodes_by_keyword("stress")] == [self.episode_id]
+        assert json_store.search_episodes_by_keyword("wine", start="2999-01-01T00:00:00") == []
+
+    def test_index_updated_in_place_on_commit(self):
+        index = json_store._episode_keyword_index()
+        json_store.update_episode(self.episode_id, {"notes": "skipped lunch", "triggers": ["fasting"]})
+        json_store.add_intervention(self.episode_id, {"type": "ibuprofen"})
+
+        assert json_store._episode_keyword_index() is index
+        for keyword in ("lunch", "fasting", "ibuprofen", "stress"):
+            assert set(index.lookup(keyword)) == {self.episode_id}
+        assert json_store.get_episode_by_id(self.episode_id)["triggers"] == ["stress", "fasting"]
+
+    def test_search_observations(self):
+        json_store.search_observations_by_keyword("tofu")
+        obs_id = json_store.save_observation("food", {"notes": "Tofu stir fry"})
+        assert set(json_store.search_observations_by_keyword("tofu")) == {obs_id}
+
+    def test_wal_mode(self, monkeypatch):
+        monkeypatch.setattr(json_store, "STORAGE_MODE", "wal")
+        episode_id = json_store.create_episode("reflux", {"severity": 3, "notes": "spicy dinner"})
+        assert [ep["episode_id"] for ep in json_store.search_episodes_by_keyword("spicy")] == [episode_id]
+        json_store.update_episode(episode_id, {"notes": "coffee"})
+        assert [ep["episode_id"] for ep in json_store.search_episodes_by_keyword("coffee")] == [episode_id]
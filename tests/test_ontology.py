@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Test the condition ontology.
+Matcher behaviour, family precedence, lookup tables and hot reload.
+"""
+
+import json
+
+import pytest
+
+from core import ontology
+from core.ontology import ConditionMatcher, find_condition_mentions, get_related_conditions, normalize_condition
+
+
+class TestConditionMatcher:
+    """Test mentions found by the matcher."""
+
+    def test_mentions_with_positions(self):
+        mentions = find_condition_mentions("Neck pain and a headache, lower back sore")
+        assert [(m.condition, m.synonym, m.start, m.end) for m in mentions] == [
+            ("neck_pain", "neck pain", 0, 9),
+            ("migraine", "headache", 16, 24),
+            ("back_pain", "lower back", 26, 36),
+            ("pain", "sore", 37, 41),
+        ]
+
+    def test_longest_match(self):
+        matcher = ConditionMatcher({"short": ["ache", "back"], "long": ["backache", "back pain"]})
+        assert [m.synonym for m in matcher.find_all("backache, back pain, back")] == ["backache", "back pain", "back"]
+
+    def test_word_start_only(self):
+        assert normalize_condition("sundown walk") is None
+        assert normalize_condition("bad headaches all week") == "migraine"
+        assert find_condition_mentions("") == []
+
+
+class TestNormalizeCondition:
+    """Test that normalization keeps the ontology's family precedence."""
+
+    def test_first_family_wins(self):
+        assert normalize_condition("neck pain with a headache") == "migraine"
+        assert normalize_condition("Lower back hurts") == "back_pain"
+        assert normalize_condition("toothache") == "pain"
+        assert normalize_condition("Acid reflux after dinner") == "reflux"
+        assert normalize_condition(None) is None
+
+    def test_related_conditions(self):
+        assert get_related_conditions("pain") == ["pain", "migraine", "back_pain", "neck_pain"]
+        assert get_related_conditions("heartburn") == ["reflux"]
+
+
+class TestOntologyFile:
+    """Test loading and hot-reloading the ontology data file."""
+
+    @pytest.fixture(autouse=True)
+    def ontology_file(self, tmp_path, monkeypatch):
+        self.path = tmp_path / "ontology_data.json"
+        self.data = json.loads(ontology.ONTOLOGY_FILE.read_text())
+        self.path.write_text(json.dumps(self.data))
+        monkeypatch.setattr(ontology, "ONTOLOGY_FILE", self.path)
+        monkeypatch.setattr(ontology, "_last_good_ontology", None)
+        monkeypatch.setattr(ontology, "_checked", None)
+        monkeypatch.setattr(ontology, "ONTOLOGY_RECHECK_SECONDS", 0.0)
+
+    def test_lookup_tables(self):
+        loaded = ontology.get_ontology()
+        assert loaded.version == self.data["version"]
+        assert loaded.synonym_families["headache"] == {"migraine"}
+        assert ontology.get_region_conditions("Chest") == ["reflux", "asthma"]
+        assert ontology.conditions_match("migraine", "headache")
+        assert not ontology.conditions_match("migraine", "reflux")
+        assert ontology.conditions_match("back_pain", "back_pain")
+
+    def test_hot_reload(self):
+        assert normalize_condition("vertigo spell") is None
+        self.data["version"] += 1
+        self.data["condition_families"]["vertigo"] = ["vertigo", "dizzy"]
+        self.path.write_text(json.dumps(self.data))
+
+        assert ontology.get_ontology().version == self.data["version"]
+        assert normalize_condition("vertigo spell") == "vertigo"
+        assert "vertigo" in ontology.CONDITION_FAMILIES
+
+    def test_rechecks_are_throttled(self, monkeypatch):
+        monkeypatch.setattr(ontology, "ONTOLOGY_RECHECK_SECONDS", 3600.0)
+        loaded = ontology.get_ontology()
+        self.data["version"] += 1
+        self.path.write_text(json.dumps(self.data))
+
+        stats = []
+        file_signature = ontology._file_signature
+        monkeypatch.setattr(ontology, "_file_signature", lambda path: stats.append(path) or file_signature(path))
+        assert normalize_condition("headache") == "migraine"
+        assert ontology.get_ontology() is loaded
+        assert stats == []
+
+        assert ontology.reload_ontology().version == self.data["version"]
+        assert stats == [self.path]
+
+    def test_keeps_last_good_version(self):
+        loaded = ontology.get_ontology()
+        self.path.write_text("{ not json")
+        assert ontology.get_ontology() is loaded
+        assert normalize_condition("headache") == "migraine"
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Test the open-episode index used for candidate lookup.
+Incremental maintenance on write, O(k) lookups and rebuild on external change.
+"""
+
+import json
+from datetime import datetime, timedelta
+
+from data import json_store
+from data.open_episode_index import OpenEpisodeIndex
+
+
+def _iso(hours_ago: float) -> str:
+    return (datetime.utcnow() - timedelta(hours=hours_ago)).isoformat()
+
+
+class TestOpenEpisodeIndex:
+    """Test the index structure on its own."""
+
+    def test_recent_is_newest_first_and_windowed(self, tmp_path):
+        index = OpenEpisodeIndex(tmp_path / "idx.json", [tmp_path / "episodes.json"])
+        for i, hours_ago in enumerate([30, 1, 5, 2]):
+            index.upsert({"episode_id": f"ep{i}", "condition": "migraine", "status": "open",
+                          "started_at": _iso(hours_ago), "last_updated_at": _iso(hours_ago)})
+
+        now = datetime.utcnow().timestamp()
+        assert [e["episode_id"] for e in index.recent(24, limit=5, now_epoch=now)] == ["ep1", "ep3", "ep2"]
+        assert [e["episode_id"] for e in index.recent(24, limit=2, now_epoch=now)] == ["ep1", "ep3"]
+
+    def test_closed_episodes_are_dropped(self, tmp_path):
+        index = OpenEpisodeIndex(tmp_path / "idx.json", [])
+        episode = {"episode_id": "ep1", "status": "open", "last_updated_at": _iso(1)}
+        index.upsert(episode)
+        index.upsert({**episode, "status": "closed"})
+        assert len(index) == 0 and index.open_episode_ids() == []
+
+
+class TestCandidateLookup:
+    """Test fetch_open_episode_candidates through the JSON store."""
+
+    def test_writes_maintain_the_index(self, json_store_dir):
+        older = json_store.create_episode("migraine", {"severity": 4}, now=_iso(3))
+        newer = json_store.create_episode("reflux", {"severity": 2}, now=_iso(2))
+        json_store.update_episode(older, {"severity": 6, "notes": "worse"}, now=_iso(1))
+
+        candidates = json_store.fetch_open_episode_candidates(window_hours=24)
+        assert [c.episode_id for c in candidates] == [older, newer]
+        assert candidates[0].salient == "severity 6; worse"
+
+        json_store.close_episode(older)
+        assert [c.episode_id for c in json_store.fetch_open_episode_candidates()] == [newer]
+
+        persisted = json.loads(json_store.OPEN_INDEX_FILE.read_text())
+        assert [e["episode_id"] for e in persisted["entries"]] == [newer]
+
+    def test_external_writes_trigger_rebuild(self, json_store_dir):
+        json_store.create_episode("migraine", {"severity": 4}, now=_iso(1))
+
+        # Another writer adds an open episode without touching the index
+        episodes = json.loads(json_store.EPISODES_FILE.read_text())
+        episodes["ep_external"] = {"episode_id": "ep_external", "condition": "asthma", "status": "open",
+                                   "started_at": _iso(0.5), "last_updated_at": _iso(0.5)}
+        json_store.EPISODES_FILE.write_text(json.dumps(episodes))
+
+        candidates = json_store.fetch_open_episode_candidates()
+        assert candidates[0].episode_id == "ep_external"
+        assert len(candidates) == 2
+
+
+class TestAutoCloseSweeper:
+    """Test closing episodes that exceeded MAX_EPISODE_DURATION_HOURS."""
+
+    def test_only_expired_episodes_are_closed(self, json_store_dir):
+        stale = json_store.create_episode("migraine", {"severity": 5}, now=_iso(80))
+        json_store.update_episode(stale, {"severity": 3}, now=_iso(70))
+        fresh = json_store.create_episode("reflux", {"severity": 2}, now=_iso(10))
+
+        assert json_store.sweep_expired_episodes(max_duration_hours=72) == [stale]
+
+        episode = json_store.get_episode_by_id(stale)
+        assert episode["status"] == "closed"
+        assert episode["close_reason"] == "max_duration"
+        assert episode["ended_at"] == episode["severity_points"][-1]["ts"]
+        assert json_store.get_episode_by_id(fresh)["status"] == "open"
+
+        # Nothing left to do on the next sweep
+        assert json_store.sweep_expired_episodes(max_duration_hours=72) == []
+
+    def test_one_commit_per_sweep(self, json_store_dir):
+        stale = [json_store.create_episode("migraine", {"severity": 5}, now=_iso(80 + i)) for i in range(5)]
+
+        with json_store.track_commits() as commits:
+            closed = json_store.sweep_expired_episodes(max_duration_hours=72)
+        assert sorted(closed) == sorted(stale)
+        assert len(commits) == 1
+        assert all(json_store.get_episode_by_id(episode_id)["status"] == "closed" for episode_id in stale)
+        assert json_store.fetch_open_episode_candidates() == []
+
+    def test_candidate_lookup_sweeps_lazily(self, json_store_dir):
+        stale = json_store.create_episode("migraine", {"severity": 5}, now=_iso(100))
+        json_store.update_episode(stale, {"severity": 6}, now=_iso(1))
+
+        assert json_store.fetch_open_episode_candidates() == []
+        assert json_store.get_episode_by_id(stale)["status"] == "closed"
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Test the JSON profile store.
+Per-user profile files, recent idempotency keys from the audit log tail,
+and batched multi-change updates.
+"""
+
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from profile_and_onboarding.schema import Condition, Medication, ProfileEvent, Routine, UserProfile
+from profile_and_onboarding.storage import JsonProfileStore, get_profile_store
+
+
+def _event(user_id, key, minutes_ago=0):
+    return ProfileEvent(
+        user_id=user_id, kind="update", entity="profile", source="chat", idempotency_key=key,
+        ts=datetime.now(timezone.utc) - timedelta(minutes=minutes_ago),
+    )
+
+
+class TestRecentKeys:
+    """Test the in-memory ring of recent idempotency keys."""
+
+    @pytest.fixture(autouse=True)
+    def store(self, tmp_path):
+        self.path = tmp_path
+        self.store = JsonProfileStore(tmp_path)
+
+    def test_window_and_user(self):
+        self.store.append_event(_event("alice", "old", minutes_ago=10))
+        self.store.append_event(_event("alice", "new", minutes_ago=1))
+        assert self.store._is_recent_duplicate("alice", "new")
+        assert not self.store._is_recent_duplicate("alice", "old")
+        assert not self.store._is_recent_duplicate("bob", "new")
+
+    def test_rebuilt_from_tail_and_synced(self):
+        for minutes_ago in range(30, 0, -1):
+            self.store.append_event(_event("alice", f"key_{minutes_ago}", minutes_ago=minutes_ago))
+        restarted = JsonProfileStore(self.path)
+        assert restarted._is_recent_duplicate("alice", "key_4")
+        assert not restarted._is_recent_duplicate("alice", "key_6")
+        assert sum(len(keys) for keys in restarted._recent_keys["alice"].values()) <= 5
+
+        # Lines written by another store are picked up from the saved offset
+        self.store.append_event(_event("alice", "from_other_worker"))
+        assert restarted._is_recent_duplicate("alice", "from_other_worker")
+
+    def test_save_profile_checks_logged_keys(self):
+        self.store.save_profile(UserProfile(user_id="alice"), "chat")
+        logged = json.loads(self.store.events_file.read_text().splitlines()[-1])
+        assert self.store._is_recent_duplicate("alice", logged["idempotency_key"])
+
+
+class TestBatch:
+    """Test coalesced multi-change profile updates."""
+
+    @pytest.fixture(autouse=True)
+    def store(self, tmp_path, monkeypatch):
+        self.store = JsonProfileStore(tmp_path)
+        self.writes = []
+        save = self.store._write_profile
+        monkeypatch.setattr(self.store, "_write_profile", lambda *a: (self.writes.append(a), save(*a)))
+
+    def _audit(self):
+        return [json.loads(line) for line in self.store.events_file.read_text().splitlines()]
+
+    def test_one_save_and_one_append(self, monkeypatch):
+        appends = []
+        append = self.store._append_events
+        monkeypatch.setattr(self.store, "_append_events", lambda events: (appends.append(len(events)), append(events)))
+        with self.store.batch("alice", source="chat"):
+            self.store.add_or_update_medication("alice", Medication(name="Topiramate", type="preventative"), "chat")
+            self.store.add_or_update_condition("alice", Condition(name="migraine"), "chat")
+            self.store.add_or_update_routine("alice", Routine(category="sleep", pattern="11pm-7am"), "chat")
+            self.store.deactivate_medication("alice", "topiramate", "chat")
+
+        assert len(self.writes) == 1 and appends == [5]
+        assert [(e["entity"], e["kind"]) for e in self._audit()] == [
+            ("profile", "create"), ("medication", "add"), ("condition", "add"),
+            ("routine", "add"), ("medication", "deactivate"),
+        ]
+        profile = JsonProfileStore(self.store.storage_path).get_profile("alice")
+        assert [m.status for m in profile.medications] == ["inactive"]
+        assert [c.name for c in profile.conditions] == ["migraine"]
+
+    def test_error_discards_changes(self):
+        with pytest.raises(RuntimeError):
+            with self.store.batch("alice", source="chat"):
+                self.store.add_or_update_condition("alice", Condition(name="migraine"), "chat")
+                raise RuntimeError("boom")
+        assert self.writes == [] and self.store.get_profile("alice") is None
+        assert not self.store.events_file.exists()
+
+    def test_single_user(self):
+        with self.store.batch("alice", source="chat"):
+            with pytest.raises(ValueError):
+                with self.store.batch("bob", source="chat"):
+                    pass
+
+
+class TestProfileFiles:
+    """Test per-user profile files and the shared store."""
+
+    def test_saves_touch_only_their_user(self, tmp_path):
+        store = JsonProfileStore(tmp_path)
+        store.save_profile(UserProfile(user_id="alice"), "chat")
+        store.add_or_update_condition("bob", Condition(name="migraine"), "chat")
+        assert json.loads(store.profile_path("alice").read_text())["user_id"] == "alice"
+        assert store.profile_path("bob") == tmp_path / "users" / "bob" / "profile.json"
+        assert [c.name for c in store.get_profile("bob").conditions] == ["migraine"]
+        assert store.get_profile("carol") is None
+        assert not store.legacy_profile_file.exists()
+
+    def test_migrates_from_user_profiles_json(self, tmp_path):
+        legacy = {"alice": UserProfile(user_id="alice", conditions=[Condition(name="reflux")]).model_dump(mode="json")}
+        (tmp_path / "user_profiles.json").write_text(json.dumps(legacy))
+        store = JsonProfileStore(tmp_path)
+        assert [c.name for c in store.get_profile("alice").conditions] == ["reflux"]
+        assert store.profile_path("alice").exists()
+
+        store.add_or_update_condition("alice", Condition(name="migraine"), "chat")
+        assert [c.name for c in JsonProfileStore(tmp_path).get_profile("alice").conditions] == ["reflux", "migraine"]
+
+    def test_shared_store(self, tmp_path):
+        assert get_profile_store(tmp_path) is get_profile_store(tmp_path)
+        assert get_profile_store(tmp_path) is not get_profile_store(tmp_path / "other")
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Test the SQLite storage backend.
+Interface round-trips, indexed range queries and the JSON importer.
+"""
+
+import json
+import shutil
+import sqlite3
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+from data.sqlite_store import SqliteHealthStorage, import_json_data
+
+
+class TestSqliteHealthStorage:
+    """Test the HealthDataStorage implementation."""
+
+    def setup_method(self):
+        self.tmp_dir = Path(tempfile.mkdtemp())
+        self.storage = SqliteHealthStorage(self.tmp_dir / "health.db")
+
+    def teardown_method(self):
+        self.storage.close()
+        shutil.rmtree(self.tmp_dir)
+
+    def test_uses_wal_and_indexes(self):
+        mode = self.storage._conn.execute("PRAGMA journal_mode").fetchone()[0]
+        assert mode == "wal"
+        indexes = {row[1] for row in self.storage._conn.execute(
+            "SELECT * FROM sqlite_master WHERE type = 'index'")}
+        assert {"idx_episodes_condition_started", "idx_episodes_status_updated",
+                "idx_observations_timestamp"} <= indexes
+
+    def test_episode_lifecycle(self):
+        now = datetime.utcnow().isoformat()
+        episode_id = self.storage.create_episode("migraine", now, 5, notes="left temple")
+        assert self.storage.update_episode(episode_id, severity=8, notes="worse")
+        assert self.storage.add_intervention(episode_id, "ibuprofen", dosage="400mg")
+
+        episode = self.storage.get_episode_by_id(episode_id)
+        assert episode["max_severity"] == 8
+        assert [n["text"] for n in episode["notes_log"]] == ["left temple", "worse"]
+        assert self.storage.get_episode_interventions(episode_id)[0]["type"] == "ibuprofen"
+
+        assert self.storage.find_latest_open_episode("migraine")["episode_id"] == episode_id
+        assert self.storage.close_episode(episode_id)
+        assert self.storage.find_latest_open_episode("migraine") is None
+        assert self.storage.fetch_open_episode_candidates() == []
+
+    def test_range_queries(self):
+        base = datetime(2025, 1, 1, 12, 0)
+        for day in range(10):
+            self.storage.create_episode("migraine" if day % 2 else "reflux",
+                                        (base + timedelta(days=day)).isoformat(), 4)
+            self.storage.save_observation((base + timedelta(days=day)).isoformat(), "diet", "cheese")
+
+        start = (base + timedelta(days=2)).isoformat()
+        end = (base + timedelta(days=5)).isoformat()
+        assert len(self.storage.get_episodes_in_range(start, end)) == 4
+        assert len(self.storage.get_episodes_in_range(start, end, condition="migraine")) == 2
+        assert len(self.storage.get_observations_in_range(start, end)) == 4
+
+    def test_timezone_suffixes_are_normalized(self):
+        self.storage.save_observation("2025-01-01T12:00:00Z", "sleep", "7h")
+        found = self.storage.get_observations_in_range("2025-01-01T00:00:00", "2025-01-01T23:59:59")
+        assert len(found) == 1
+
+    def test_keyword_search_and_stats(self):
+        episode_id = self.storage.create_episode("migraine", datetime.utcnow().isoformat(), 6,
+                                                 notes="after eating aged cheese")
+        assert [e["episode_id"] for e in self.storage.search_episodes_by_keyword("Cheese")] == [episode_id]
+        assert self.storage.append_event("create", {"text": "x"}, episode_id)
+        assert self.storage.get_recent_events(limit=1)[0]["episode_id"] == episode_id
+
+        stats = self.storage.get_storage_stats()
+        assert stats["episodes"] == 1 and stats["open_episodes"] == 1 and stats["events"] == 1
+
+    def test_keyword_search_skips_key_names(self):
+        episode_id = self.storage.create_episode("reflux", datetime.utcnow().isoformat(), 3,
+                                                 notes="after coffee")
+        self.storage.add_intervention(episode_id, "antacid", notes="50% better")
+
+        def found(keyword):
+            return [e["episode_id"] for e in self.storage.search_episodes_by_keyword(keyword)]
+
+        assert found("severity") == [] and found("notes") == [] and found("text") == []
+        assert found("coffee") == found("Reflux") == found("antacid") == [episode_id]
+        assert found("50%") == [episode_id] and found("%") == [episode_id] and found("_") == []
+
+    def test_backup(self):
+        self.storage.create_episode("migraine", datetime.utcnow().isoformat(), 6)
+        backup_path = self.tmp_dir / "backup.db"
+        assert self.storage.backup_data(str(backup_path))
+        conn = sqlite3.connect(str(backup_path))
+        assert conn.execute("SELECT COUNT(*) FROM episodes").fetchone()[0] == 1
+        conn.close()
+
+
+class TestJsonImporter:
+    """Test the one-shot import from the JSON data files."""
+
+    def setup_method(self):
+        self.tmp_dir = Path(tempfile.mkdtemp())
+        (self.tmp_dir / "episodes.json").write_text(json.dumps({
+            "ep_1": {"episode_id": "ep_1", "condition": "migraine", "started_at": "2025-08-10T09:00:00",
+                     "status": "open", "current_severity": 6, "max_severity": 6,
+                     "notes_log": [], "interventions": [], "last_updated_at": "2025-08-10T09:00:00"}
+        }))
+        (self.tmp_dir / "observations.json").write_text(json.dumps([
+            {"observation_id": "obs_1", "timestamp": "2025-08-10T08:00:00", "category": "diet", "notes": "tofu"}
+        ]))
+        (self.tmp_dir / "interventions.json").write_text(json.dumps([
+            {"intervention_id": "int_1", "episode_id": "ep_1", "timestamp": "2025-08-10T09:30:00", "type": "rest"}
+        ]))
+        (self.tmp_dir / "events.jsonl").write_text(
+            json.dumps({"event_id": "evt_1", "timestamp": "2025-08-10T09:00:00", "action": "create"}) + "\n"
+        )
+        self.storage = SqliteHealthStorage(self.tmp_dir / "health.db")
+
+    def teardown_method(self):
+        self.storage.close()
+        shutil.rmtree(self.tmp_dir)
+
+    def test_import_is_repeatable(self):
+        expected = {"episodes": 1, "observations": 1, "interventions": 1, "events": 1}
+        assert import_json_data(self.storage, self.tmp_dir) == expected
+        assert import_json_data(self.storage, self.tmp_dir) == expected
+
+        stats = self.storage.get_storage_stats()
+        assert stats["episodes"] == 1 and stats["observations"] == 1
+        assert self.storage.get_episode_interventions("ep_1")[0]["type"] == "rest"
+
+    def test_partitioned_tree(self):
+        alice_dir = self.tmp_dir / "users" / "alice"
+        alice_dir.mkdir(parents=True)
+        shutil.copy(self.tmp_dir / "observations.json", alice_dir / "observations.json")
+
+        with pytest.raises(ValueError, match="alice"):
+            import_json_data(self.storage, self.tmp_dir)
+        with pytest.raises(ValueError):
+            import_json_data(self.storage, self.tmp_dir, user_id="bob")
+        counts = import_json_data(self.storage, self.tmp_dir, user_id="alice")
+        assert (counts["observations"], counts["episodes"]) == (1, 0)
+        assert import_json_data(self.storage, self.tmp_dir, shared_only=True)["episodes"] == 1
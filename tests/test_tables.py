@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Test the time-sorted episode and observation tables.
+Bisect range slices, per-condition sub-tables, and reuse per data version.
+"""
+
+import json
+import shutil
+import tempfile
+from pathlib import Path
+
+from core.timeutils import iso_to_epoch
+from data.file_io import atomic_write_json
+from data.tables import build_episode_table, build_observation_table, load_episode_table
+
+
+EPISODES = {
+    "ep_3": {"condition": "migraine", "started_at": "2025-08-12T09:00:00"},
+    "ep_1": {"condition": "migraine", "started_at": "2025-08-10T09:00:00"},
+    "ep_2": {"condition": "reflux", "started_at": "2025-08-11T09:00:00Z"},
+    "ep_bad": {"condition": "migraine", "started_at": "not a date"},
+}
+
+
+class TestTables:
+    """Test table construction and range queries."""
+
+    def test_episodes_sorted_and_unparseable_skipped(self):
+        table = build_episode_table(EPISODES)
+        assert table.keys == ["ep_1", "ep_2", "ep_3"]
+        assert list(table.ts) == sorted(table.ts)
+
+    def test_range_bounds(self):
+        table = build_episode_table(EPISODES)
+        start = iso_to_epoch("2025-08-10T09:00:00")
+        end = iso_to_epoch("2025-08-12T09:00:00")
+        assert [key for key, _, _ in table.between(start, end)] == ["ep_1", "ep_2", "ep_3"]
+        assert table.count_between(start, end, inclusive_end=False) == 2
+        assert table.between(end + 1, end + 2) == []
+
+    def test_condition_sub_tables(self):
+        table = build_episode_table(EPISODES)
+        start, end = iso_to_epoch("2025-08-01T00:00:00"), iso_to_epoch("2025-09-01T00:00:00")
+        assert [key for key, _, _ in table.for_condition("migraine").between(start, end)] == ["ep_1", "ep_3"]
+        assert len(table.for_condition("unknown")) == 0
+        rows = table.between_conditions(["reflux", "migraine"], start, end)
+        assert [key for key, _, _ in rows] == ["ep_1", "ep_2", "ep_3"]
+
+    def test_observation_table(self):
+        table = build_observation_table([
+            {"observation_id": "obs_2", "timestamp": "2025-08-11T08:00:00"},
+            {"observation_id": "obs_1", "timestamp": "2025-08-10T08:00:00"},
+            {"observation_id": "obs_x"},
+        ])
+        assert table.keys == ["obs_1", "obs_2"]
+
+
+class TestTableCaching:
+    """Test that tables are built once per file version."""
+
+    def setup_method(self):
+        self.tmp_dir = Path(tempfile.mkdtemp())
+        self.path = self.tmp_dir / "episodes.json"
+        self.path.write_text(json.dumps(EPISODES))
+
+    def teardown_method(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_reused_until_file_changes(self):
+        first = load_episode_table(self.path)
+        assert load_episode_table(self.path) is first
+
+        atomic_write_json(self.path, {"ep_9": {"condition": "reflux", "started_at": "2025-08-20T09:00:00"}})
+        rebuilt = load_episode_table(self.path)
+        assert rebuilt is not first
+        assert rebuilt.keys == ["ep_9"]
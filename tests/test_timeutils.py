@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Test the natural-language time-range parser.
+Grammar coverage, user timezones and memoization.
+"""
+
+from datetime import datetime
+
+import pytest
+
+from core.timeutils import parse_natural_time_range, parse_time_expression
+
+NOW = datetime(2025, 8, 20, 15, 30)  # a Wednesday, UTC
+
+
+def _range(query, tz=None):
+    start, end, label = parse_natural_time_range(query, tz, now=NOW)
+    return start.isoformat(), end.isoformat(), label
+
+
+class TestGrammar:
+    """Test the phrases the recall agent sees."""
+
+    @pytest.mark.parametrize("query, start, end, label", [
+        ("last week", "2025-08-13T15:30:00", "2025-08-20T15:30:00", "the last 7 days"),
+        ("past month", "2025-07-21T15:30:00", "2025-08-20T15:30:00", "the last 30 days"),
+        ("last 14 days", "2025-08-06T15:30:00", "2025-08-20T15:30:00", "the last 14 days"),
+        ("over the past two weeks", "2025-08-06T15:30:00", "2025-08-20T15:30:00", "the last 2 weeks"),
+        ("last couple of weeks", "2025-08-06T15:30:00", "2025-08-20T15:30:00", "the last 2 weeks"),
+        ("past few days", "2025-08-17T15:30:00", "2025-08-20T15:30:00", "the last 3 days"),
+        ("a couple of days ago", "2025-08-18T00:00:00", "2025-08-18T23:59:59.999999", "August 18, 2025"),
+        ("yesterday", "2025-08-19T00:00:00", "2025-08-19T23:59:59.999999", "yesterday"),
+        ("since August 1st", "2025-08-01T00:00:00", "2025-08-20T15:30:00", "since August 1, 2025"),
+        ("since march", "2025-03-01T00:00:00", "2025-08-20T15:30:00", "since March 1, 2025"),
+        ("in July", "2025-07-01T00:00:00", "2025-07-31T23:59:59.999999", "July 2025"),
+        ("on Monday", "2025-08-18T00:00:00", "2025-08-18T23:59:59.999999", "Monday, August 18, 2025"),
+        ("last wednesday", "2025-08-13T00:00:00", "2025-08-13T23:59:59.999999", "Wednesday, August 13, 2025"),
+        ("between Aug 1 and Aug 5", "2025-08-01T00:00:00", "2025-08-05T23:59:59.999999",
+         "August 1, 2025 to August 5, 2025"),
+        ("2 days ago", "2025-08-18T00:00:00", "2025-08-18T23:59:59.999999", "August 18, 2025"),
+        ("this month", "2025-08-01T00:00:00", "2025-08-20T15:30:00", "this month"),
+    ])
+    def test_phrases(self, query, start, end, label):
+        assert _range(query) == (start, end, label)
+
+    def test_dates_without_year_are_in_the_past(self):
+        assert _range("on Aug 25")[0] == "2024-08-25T00:00:00"
+        assert _range("1 December 2024")[0] == "2024-12-01T00:00:00"
+        assert _range("8/3")[0] == "2025-08-03T00:00:00"
+
+    def test_default_and_ambiguous_words(self):
+        assert _range("what happened")[2] == "the last 7 days (default range)"
+        assert _range("may I see my migraines")[2] == "the last 7 days (default range)"
+        assert _range("on February 30")[2] == "the last 7 days (default range)"
+
+    @pytest.mark.parametrize("query", [
+        "migraines rated 8/10",
+        "headaches 7/10 or worse",
+        "how many migraines rated 8/10 last month",
+    ])
+    def test_scores_are_not_dates(self, query):
+        assert parse_time_expression(query).dates == ()
+
+    def test_cued_slash_dates(self):
+        assert _range("headaches since 8/10")[0] == "2025-08-10T00:00:00"
+        assert _range("pain from 8/1 to 8/5")[:2] == ("2025-08-01T00:00:00", "2025-08-05T23:59:59.999999")
+        assert _range("migraines 8/10/25")[0] == "2025-08-10T00:00:00"
+
+
+class TestTimezones:
+    """Test day boundaries in the user's timezone."""
+
+    def test_local_midnights(self):
+        assert _range("yesterday", "America/New_York")[:2] == ("2025-08-19T04:00:00", "2025-08-20T03:59:59.999999")
+        assert _range("today", "Asia/Tokyo")[0] == "2025-08-20T15:00:00"
+
+    def test_unknown_zone_falls_back_to_utc(self):
+        assert _range("yesterday", "Mars/Olympus") == _range("yesterday")
+
+
+class TestMemoization:
+    """Test that parses are shared across calls."""
+
+    def test_cached_per_query(self):
+        parse_time_expression.cache_clear()
+        parse_natural_time_range("last 14 days", now=NOW)
+        parse_natural_time_range("last 14 days", "Europe/Paris")
+        assert parse_time_expression.cache_info().hits == 1
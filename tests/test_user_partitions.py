@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Test per-user partitioning of the JSON store.
+Each user's writes land in their own directory and never touch another's.
+"""
+
+import json
+
+import pytest
+
+from data import json_store
+
+
+def _read(path):
+    return json.loads(path.read_text())
+
+
+class TestUserPartitions:
+    """Test user scopes and the user_id keyword."""
+
+    @pytest.fixture(autouse=True)
+    def store(self, json_store_dir):
+        self.data_dir = json_store_dir
+
+    def test_users_write_to_their_own_files(self):
+        alice_episode = json_store.create_episode("migraine", {"severity": 5}, user_id="alice")
+        with json_store.user_scope("bob"):
+            bob_episode = json_store.create_episode("reflux", {"severity": 2})
+            json_store.save_observation("diet", {"notes": "coffee"})
+
+        alice_dir = self.data_dir / "users" / "alice"
+        bob_dir = self.data_dir / "users" / "bob"
+        assert list(_read(alice_dir / "episodes.json")) == [alice_episode]
+        assert list(_read(bob_dir / "episodes.json")) == [bob_episode]
+        assert _read(alice_dir / "observations.json") == []
+        assert len(_read(bob_dir / "observations.json")) == 1
+        assert not json_store.EPISODES_FILE.exists()
+
+    def test_reads_are_scoped(self):
+        episode_id = json_store.create_episode("migraine", {"severity": 5, "notes": "red wine"}, user_id="alice")
+        assert json_store.get_episode_by_id(episode_id, user_id="alice") is not None
+        assert json_store.get_episode_by_id(episode_id, user_id="bob") is None
+        assert json_store.get_episode_by_id(episode_id) is None
+        assert json_store.search_episodes_by_keyword("wine", user_id="bob") == []
+        assert len(json_store.fetch_open_episode_candidates(user_id="alice")) == 1
+        assert json_store.fetch_open_episode_candidates(user_id="bob") == []
+
+    def test_default_is_shared_directory(self):
+        json_store.create_episode("migraine", {"severity": 5})
+        assert len(_read(json_store.EPISODES_FILE)) == 1
+        assert json_store.user_data_dir() == self.data_dir
+
+    def test_transaction_commits_to_its_user(self):
+        with json_store.user_scope("alice"):
+            with json_store.transaction():
+                episode_id = json_store.create_episode("migraine", {"severity": 4})
+                json_store.add_intervention(episode_id, {"type": "rest"})
+                json_store.append_event("headache, resting", {}, "create", episode_id=episode_id)
+                with pytest.raises(ValueError):
+                    json_store.save_observation("diet", {"notes": "tofu"}, user_id="bob")
+        alice_dir = self.data_dir / "users" / "alice"
+        assert len(_read(alice_dir / "interventions.json")) == 1
+        assert len((alice_dir / "events.jsonl").read_text().splitlines()) == 1
+        assert not (self.data_dir / "users" / "bob").exists()
+
+    def test_user_ids_cannot_escape_the_partition(self):
+        path = json_store.user_data_dir("../../etc")
+        assert path.parent == self.data_dir / "users"
+        assert json_store.user_data_dir("..").name == "_"
+
+    def test_wal_mode_keeps_a_log_per_user(self, monkeypatch):
+        monkeypatch.setattr(json_store, "STORAGE_MODE", "wal")
+        alice_episode = json_store.create_episode("migraine", {"severity": 5}, user_id="alice")
+        bob_episode = json_store.create_episode("migraine", {"severity": 3}, user_id="bob")
+        json_store.update_episode(alice_episode, {"severity": 8}, user_id="alice")
+
+        assert json_store.get_episode_by_id(alice_episode, user_id="alice")["max_severity"] == 8
+        assert json_store.get_episode_by_id(alice_episode, user_id="bob") is None
+        assert json_store.get_episode_by_id(bob_episode, user_id="bob")["max_severity"] == 3
+        assert len(json_store._episode_wals) == 2
+
+    def test_daily_history_per_user(self):
+        json_store.create_episode("migraine", {"severity": 6}, now="2025-08-10T09:00:00", user_id="alice")
+        history = _read(self.data_dir / "users" / "alice" / "daily_history.json")
+        assert [(r["date"], r["max_pain"]) for r in history] == [("2025-08-10", 6)]
+        assert not json_store.DAILY_HISTORY_FILE.exists()
+
+    def test_partition_users(self):
+        assert json_store.partition_users() == [None]
+        json_store.create_episode("migraine", {"severity": 6}, user_id="bob")
+        json_store.create_episode("migraine", {"severity": 2}, user_id="alice")
+        assert json_store.partition_users() == [None, "alice", "bob"]
+
+    def test_observation_keyword_index_per_user(self):
+        alice_obs = json_store.save_observation("diet", {"notes": "aged cheese"}, user_id="alice")
+        json_store.save_observation("diet", {"notes": "cheese pizza"})
+        assert set(json_store.observation_keyword_index(user_id="alice").lookup("cheese")) == {alice_obs}
+        assert len(json_store.observation_keyword_index().lookup("cheese")) == 1